@@ -7,10 +7,15 @@
 # 选择合适的正交表
 # 根据正交表把变量的值映射到表中，设计测试用例数据集
 # 本文参考如上步骤，使用Python实现了使用正交表自动设计测试用例的完整流程。
+# 正交表库首次使用时编译为二进制索引（OED/ts723_Designs.index.npz + rows.npy），之后按索引查询，不再逐行解析文本。
+# 正交表库中没有合适的设计时，按有限域构造（Bose / Bush、子空间分配、列合并、直积）生成最小的均衡正交表。
 
 from itertools import groupby
 from collections import OrderedDict
 import os
+import math
+import itertools
+import numpy as np
 
 
 def dataSplit(data):
@@ -28,69 +33,471 @@ def dataSplit(data):
     return ds
 
 
+def parseDesigns(OAFile):
+    """
+    逐行解析 SAS 正交表文件，返回按文件顺序排列的 [(key, dict(pos, n, mk, data)), ...]
+    key 如 '2^4 4^1 n=8'，data 为各行原始字符串
+    """
+    designs = {}
+    with open(OAFile, ) as f:
+        # 定义临时变量
+        key = ''
+        value = []
+        pos = 0
+
+        for i in f:
+            i = i.strip()
+            if 'n=' in i:
+                if key and value:
+                    designs[key] = dict(pos=pos,
+                                        n=int(key.split('n=')[1].strip()),
+                                        mk=[[int(mk.split('^')[0]), int(mk.split('^')[1])] for mk in
+                                            key.split('n=')[0].strip().split(' ')],
+                                        data=value)
+                key = ' '.join([k for k in i.split(' ') if k])
+                value = []
+                pos += 1
+            elif i:
+                value.append(i)
+
+        designs[key] = dict(pos=pos,
+                            n=int(key.split('n=')[1].strip()),
+                            mk=[[int(mk.split('^')[0]), int(mk.split('^')[1])] for mk in
+                                key.split('n=')[0].strip().split(' ')],
+                            data=value)
+    return sorted(designs.items(), key=lambda i: i[1]['pos'])
+
+
+def compileDesigns(OAFile):
+    """
+    将正交表库编译为二进制索引（只在正交表文件更新后执行一次）：
+        ts723_Designs.rows.npy  全部正交表各行的水平值（uint8），按文件顺序首尾相接，可内存映射
+        ts723_Designs.index.npz 各正交表的 key、n、首个因素的 m 与 k、在 rows 中的起始位置与行列数，
+                                全部列的水平数 levels（首尾相接，第 i 个正交表从 level_start[i] 起 ncols[i] 列），
+                                divisible：各正交表中水平数为 a 的整数倍的列数（第 a 列，第 0 列为列数）
+    索引只含数值与字符串数组，加载时不再逐表构造 Python 对象；目录不可写时只返回内存中的索引
+    """
+    designs = parseDesigns(OAFile)
+    tables = [np.array(dataSplit(d), dtype=np.uint8) for _, d in designs]
+    levels = np.concatenate([np.repeat(*np.array(d['mk']).T) for _, d in designs]).astype(np.uint8)
+    ncols = np.array([t.shape[1] for t in tables])
+    level_start = np.cumsum(ncols) - ncols
+    # 水平数为 a 的整数倍的列：全部列首尾相接后按正交表分段求和
+    multiples = levels[None, :] % np.arange(1, int(levels.max()) + 1)[:, None] == 0
+    divisible = np.add.reduceat(np.vstack([np.ones_like(levels, dtype=bool), multiples]), level_start, axis=1).T
+    index = dict(keys=np.array([key for key, _ in designs]),
+                 n=np.array([d['n'] for _, d in designs]),
+                 m=np.array([d['mk'][0][0] for _, d in designs]),
+                 k=np.array([d['mk'][0][1] for _, d in designs]),
+                 start=np.cumsum([0] + [t.size for t in tables])[:-1],
+                 nrows=np.array([t.shape[0] for t in tables]),
+                 ncols=ncols,
+                 levels=levels,
+                 level_start=level_start,
+                 divisible=divisible)
+    rows = np.concatenate([t.ravel() for t in tables])
+    base = os.path.splitext(OAFile)[0]
+    try:
+        np.savez(base + '.index.tmp.npz', **index)
+        np.save(base + '.rows.tmp.npy', rows)
+        os.replace(base + '.rows.tmp.npy', base + '.rows.npy')
+        os.replace(base + '.index.tmp.npz', base + '.index.npz')
+    except OSError:
+        pass
+    index['rows'] = rows
+    return index
+
+
+# 已加载的正交表索引 {正交表文件: (文件修改时间, 索引)}，同一进程内多次构造 OAT 时直接复用
+compiled_designs = {}
+
+
+def loadDesigns(OAFile):
+    """
+    加载正交表索引：进程内缓存 → 磁盘上的编译索引（不早于正交表文件、且含全部字段时）→ 重新编译
+    返回的索引另含 selected：已查询的水平组合 → 最终正交表（get 的结果缓存）
+    """
+    stamp = os.path.getmtime(OAFile)
+    cached = compiled_designs.get(OAFile)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    base = os.path.splitext(OAFile)[0]
+    index = None
+    if all(os.path.isfile(path) and os.path.getmtime(path) >= stamp for path in (base + '.index.npz', base + '.rows.npy')):
+        with np.load(base + '.index.npz') as data:
+            # 旧版本编译的索引缺少 levels / divisible 时重新编译
+            if {'levels', 'level_start', 'divisible'} <= set(data.files):
+                index = {name: data[name] for name in data.files}
+                index['rows'] = np.load(base + '.rows.npy', mmap_mode='r')
+    if index is None:
+        index = compileDesigns(OAFile)
+
+    index['selected'] = {}
+    compiled_designs[OAFile] = (stamp, index)
+    return index
+
+
+def factorize(n):
+    """质因数分解，返回 {p: e}"""
+    factors = {}
+    p = 2
+    while p * p <= n:
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+        p += 1
+    if n > 1:
+        factors[n] = factors.get(n, 0) + 1
+    return factors
+
+
+# 已构造的有限域 {q: (加法表, 乘法表)}
+galois_fields = {}
+
+
+def galoisField(q):
+    """
+    有限域 GF(q)（q = p^f 为素数幂）的加法表与乘法表（q×q 数组）
+    元素编号 0..q-1 的 p 进制各位为多项式基下的系数，编号 0、1 即域中的 0、1
+    """
+    if q in galois_fields:
+        return galois_fields[q]
+    factors = factorize(q)
+    if len(factors) != 1:
+        raise ValueError(f'GF({q}) does not exist: {q} is not a prime power')
+    (p, f), = factors.items()
+    elements = np.arange(q)
+    if f == 1:
+        add = (elements[:, None] + elements[None, :]) % p
+        mul = (elements[:, None] * elements[None, :]) % p
+    else:
+        weights = p ** np.arange(f)
+        digits = elements[:, None] // weights % p
+        add = (digits[:, None, :] + digits[None, :, :]) % p @ weights
+        # 本原元的幂表 exp 与对数表 log，乘法为对数相加
+        exp = primitivePowers(p, f)
+        log = np.zeros(q, dtype=int)
+        log[exp] = np.arange(q - 1)
+        mul = exp[(log[:, None] + log[None, :]) % (q - 1)]
+        mul[0, :] = 0
+        mul[:, 0] = 0
+    galois_fields[q] = (add, mul)
+    return add, mul
+
+
+def primitivePowers(p, f):
+    """
+    搜索 GF(p) 上的 f 次本原多项式 x^f + c_(f-1) x^(f-1) + ... + c_0，
+    返回 x 的各次幂 x^0..x^(p^f-2) 的元素编号（两两不同且 x^(p^f-1) = 1 即为本原）
+    """
+    q = p ** f
+    weights = p ** np.arange(f)
+    for coefficients in itertools.product(range(p), repeat=f):
+        if coefficients[0] == 0:
+            continue
+        power = np.eye(f, dtype=int)[0]
+        exp = []
+        for _ in range(q - 1):
+            exp.append(int(power @ weights))
+            # 乘以 x: 系数上移一位，溢出的 x^f 项按多项式化简
+            power = np.roll(power, 1)
+            top, power[0] = power[0], 0
+            power = (power - top * np.array(coefficients)) % p
+        if power @ weights == 1 and len(set(exp)) == q - 1:
+            return np.array(exp)
+    raise ValueError(f'No primitive polynomial of degree {f} over GF({p})')
+
+
+def allVectors(q, t):
+    """GF(q)^t 的全部向量 (q^t, t)，末位变化最快"""
+    return np.indices((q,) * t).reshape(t, -1).T
+
+
+def projectivePoints(q, t):
+    """射影空间 PG(t-1, q) 的全部点: 首个非零坐标为 1 的 GF(q)^t 向量 ((q^t-1)/(q-1), t)"""
+    vectors = allVectors(q, t)
+    nonzero = vectors != 0
+    first = vectors[np.arange(len(vectors)), nonzero.argmax(axis=1)]
+    return vectors[first == 1]
+
+
+def innerProducts(q, X, V):
+    """X 各行 (N, t) 与 V 各行 (M, t) 在 GF(q) 上的内积 (N, M)"""
+    add, mul = galoisField(q)
+    values = mul[X[:, :1], V[None, :, 0]]
+    for i in range(1, X.shape[1]):
+        values = add[values, mul[X[:, i:i + 1], V[None, :, i]]]
+    return values
+
+
+def boseArray(q, t=2):
+    """
+    Bose 构造（t > 2 时为 Rao-Hamming 推广）: OA(q^t, (q^t-1)/(q-1), q, 2)
+    行为 GF(q)^t 的全部向量，列为 PG(t-1, q) 的各点，取值为两者内积
+    """
+    return innerProducts(q, allVectors(q, t), projectivePoints(q, t))
+
+
+def bushArray(q, t):
+    """
+    Bush 构造: 强度为 t 的 OA(q^t, q+1, q, t)，要求 t <= q
+    行为次数小于 t 的多项式（系数向量），列为多项式在各域元素处的取值，最后一列为最高次系数
+    """
+    if t > q:
+        raise ValueError(f'Bush construction requires strength t <= q, got t={t}, q={q}')
+    add, mul = galoisField(q)
+    powers = np.ones((q, t), dtype=int)
+    for i in range(1, t):
+        powers[:, i] = mul[powers[:, i - 1], np.arange(q)]
+    X = allVectors(q, t)
+    return np.hstack([innerProducts(q, X, powers), X[:, -1:]])
+
+
+def findFlat(q, points, owner, used, d, budget):
+    """
+    在未使用的射影点中深度优先搜索一个 d 维子空间（其全部点均未使用），返回该子空间全部点的编号（首 d 个为基）
+    owner: 非零向量编码 → 射影点编号；budget: 剩余可尝试的候选数（耗尽时放弃）
+    """
+    weights = q ** np.arange(points.shape[1])
+    size = (q ** d - 1) // (q - 1)
+
+    def extend(basis, members, start):
+        if len(basis) == d:
+            return basis + [i for i in members if i not in basis]
+        for i in range(start, len(points)):
+            if used[i] or i in members:
+                continue
+            if budget[0] <= 0:
+                return None
+            budget[0] -= 1
+            candidate = basis + [i]
+            span = innerProducts(q, allVectors(q, len(candidate))[1:], points[candidate].T)
+            span_members = set(owner[span @ weights].tolist())
+            if not used[list(span_members)].any():
+                found = extend(candidate, span_members, i + 1)
+                if found is not None:
+                    return found
+        return None
+
+    found = extend([], set(), 0)
+    return found if found is not None and len(found) == size else None
+
+
+def primeDesign(p, exponents, f, t):
+    """
+    单个素数 p 的分量: 在 GF(p^f)^t 的 Bose 正交表中为各因素（p^e 水平）分配互不相交的 d 维子空间（d = ceil(e/f)），
+    子空间的 d 个基列组合为 q^d 水平后合并（collapse）为 p^e 水平；分配失败返回 None
+    """
+    q = p ** f
+    add, mul = galoisField(q)
+    points = projectivePoints(q, t)
+    dims = [-(-e // f) for e in exponents]
+    if sum((q ** d - 1) // (q - 1) for d in dims) > len(points):
+        return None
+    # 任意非零向量编码 → 所在射影点编号
+    owner = np.zeros(q ** t, dtype=int)
+    owner[mul[np.arange(1, q)[:, None, None], points[None, :, :]] @ (q ** np.arange(t))] = np.arange(len(points))
+    used = np.zeros(len(points), dtype=bool)
+    budget = [20000]
+    bases = [None] * len(exponents)
+    # 维数大的因素先分配
+    for i in sorted(range(len(exponents)), key=lambda i: -dims[i]):
+        flat = findFlat(q, points, owner, used, dims[i], budget)
+        if flat is None:
+            return None
+        used[flat] = True
+        bases[i] = flat[:dims[i]]
+    X = allVectors(q, t)
+    columns = []
+    for e, d, basis in zip(exponents, dims, bases):
+        values = innerProducts(q, X, points[basis])
+        columns.append((values @ (q ** np.arange(d))) % (p ** e))
+    return np.stack(columns, axis=1)
+
+
+def primeComponent(p, exponents):
+    """
+    单个素数 p 的分量中行数最少的设计: 在域的次数 f = max(e)..1 与维数 t 上搜索
+    f = max(e) 时每个因素占一列，必定成功；较小的 f 以子空间分配换取更少的行数
+    返回 (N_p, len(exponents)) 数组，e = 0 的列为 0
+    """
+    active = [i for i, e in enumerate(exponents) if e]
+    best = None
+    for f in range(max(exponents), 0, -1):
+        q = p ** f
+        t = 1
+        while best is None or q ** t < len(best):
+            design = primeDesign(p, [exponents[i] for i in active], f, t)
+            if design is not None:
+                best = design
+                break
+            t += 1
+    component = np.zeros((len(best), len(exponents)), dtype=int)
+    component[:, active] = best
+    return component
+
+
+# 已构造的正交表 {(水平数, 强度): 只读数组}
+constructed_designs = {}
+
+
+def constructDesign(levels, strength=2):
+    """
+    按各因素水平数构造均衡正交表（正交表库中没有合适的设计时使用）
+    strength=2: 按素数分解水平数，各素数分量分别构造（Bose + 子空间分配 + 列合并）后取直积，
+                合数水平（如 6 = 2×3）由各分量的列组合而成
+    strength>2: 各水平数须为同一素数的幂，取 q = p^f（q >= 最大水平且 q+1 >= 因素数）做 Bush 构造后合并列
+    返回 (N, len(levels)) 只读数组，列顺序与 levels 一致；构造结果经 checkOrthogonal 校验
+    """
+    key = (tuple(int(level) for level in levels), strength)
+    if key in constructed_designs:
+        return constructed_designs[key]
+    levels = key[0]
+    if min(levels) < 1:
+        raise ValueError(f'Factor levels must be positive integers, got {list(levels)}')
+
+    primes = sorted(set(p for level in levels for p in factorize(level)))
+    if strength > 2:
+        if len(primes) != 1:
+            raise ValueError(f'Strength-{strength} construction requires all levels to be powers of one prime, got {list(levels)}')
+        p = primes[0]
+        q = p ** max(factorize(level)[p] for level in levels)
+        while q + 1 < len(levels) or q < strength:
+            q *= p
+        design = bushArray(q, strength)[:, :len(levels)] % np.array(levels)
+    else:
+        design = np.zeros((1, len(levels)), dtype=int)
+        for p in primes:
+            exponents = [factorize(level).get(p, 0) for level in levels]
+            component = primeComponent(p, exponents)
+            # 直积: 已有设计的每行重复 N_p 次，与分量各行组合（混合进制）
+            design = (np.repeat(design, len(component), axis=0) * p ** np.array(exponents)
+                      + np.tile(component, (len(design), 1)))
+    if not checkOrthogonal(design, levels, strength):
+        raise RuntimeError(f'Constructed design for levels {list(levels)} is not orthogonal')
+    design.flags.writeable = False
+    constructed_designs[key] = design
+    return design
+
+
+def pairMultiple(levels):
+    """均衡的强度 2 正交表行数必为各水平数及任意两因素水平数之积的公倍数"""
+    multiple = 1
+    for i, a in enumerate(levels):
+        multiple = math.lcm(multiple, a, *[a * b for b in levels[i + 1:]])
+    return multiple
+
+
+def minimumRuns(levels):
+    """强度 2 均衡正交表的行数下界：不小于 Rao 界 1 + Σ(水平数 - 1) 的最小 pairMultiple 倍数"""
+    multiple = pairMultiple(levels)
+    return -(-(1 + sum(level - 1 for level in levels)) // multiple) * multiple
+
+
+def checkOrthogonal(design, levels, strength=2):
+    """
+    正交性校验: 任意 strength 列中全部水平组合的出现次数相同（同时保证各列均衡）
+    """
+    design = np.asarray(design)
+    levels = np.asarray(levels)
+    if design.ndim != 2 or design.shape[1] != len(levels) or (design < 0).any() or (design >= levels).any():
+        return False
+    runs = len(design)
+    if strength == 2 and len(levels) >= 2:
+        # 全部列对一次计数：各列对的水平组合编码加上各自的偏移后合并 bincount
+        first, second = np.triu_indices(len(levels), 1)
+        sizes = levels[first] * levels[second]
+        if (runs % sizes).any():
+            return False
+        offsets = np.cumsum(sizes) - sizes
+        codes = design[:, first] * levels[second] + design[:, second] + offsets
+        counts = np.bincount(codes.ravel(), minlength=int(sizes.sum()))
+        return bool((counts == np.repeat(runs // sizes, sizes)).all())
+    for columns in itertools.combinations(range(len(levels)), min(strength, len(levels))):
+        shape = levels[list(columns)]
+        size = int(np.prod(shape))
+        if runs % size:
+            return False
+        counts = np.bincount(np.ravel_multi_index(design[:, columns].T, shape), minlength=size)
+        if (counts != runs // size).any():
+            return False
+    return True
+
+
 class OAT(object):
     def __init__(self, OAFile=os.path.split(os.path.realpath(__file__))[0] + '/OED/ts723_Designs.txt'):
         """
-        初始化解析构造正交表对象，数据来源：http://support.sas.com/techsup/technote/ts723_Designs.txt
+        初始化正交表对象，数据来源：http://support.sas.com/techsup/technote/ts723_Designs.txt
+        正交表文件首次使用时编译为二进制索引（见 compileDesigns），之后直接加载
         """
-        self.data = {}
-
-        # 解析正交表文件数据
-        with open(OAFile, ) as f:
-            # 定义临时变量
-            key = ''
-            value = []
-            pos = 0
-
-            for i in f:
-                i = i.strip()
-                if 'n=' in i:
-                    if key and value:
-                        self.data[key] = dict(pos=pos,
-                                              n=int(key.split('n=')[1].strip()),
-                                              mk=[[int(mk.split('^')[0]), int(mk.split('^')[1])] for mk in
-                                                  key.split('n=')[0].strip().split(' ')],
-                                              data=value)
-                    key = ' '.join([k for k in i.split(' ') if k])
-                    value = []
-                    pos += 1
-                elif i:
-                    value.append(i)
-
-            self.data[key] = dict(pos=pos,
-                                  n=int(key.split('n=')[1].strip()),
-                                  mk=[[int(mk.split('^')[0]), int(mk.split('^')[1])] for mk in
-                                      key.split('n=')[0].strip().split(' ')],
-                                  data=value)
-        self.data = sorted(self.data.items(), key=lambda i: i[1]['pos'])
+        self.index = loadDesigns(OAFile)
 
     def get(self, mk):
         """
         传入参数：mk列表，如[(2,3)],[(5,5),(2,1)]
 
-        1. 计算m,n,k
-        m=max(m1,m2,m3,…)
-        k=(k1+k2+k3+…)
-        n=k1*(m1-1)+k2*(m2-1)+…kx*x-1)+1
+        1. 计算各因素水平数（按 m 升序展开，与 genSets 中参数的排列顺序一致）
 
-       2. 查询正交表
-        这里简单处理，只返回满足>=m,n,k条件的n最小数据，未做复杂的数组包含校验
+        2. 查询或构造正交表
+        正交表库中的设计需能为每个因素选出一列：水平数相同，或为其整数倍（合并列，如 4 水平列取模得 2 水平列，仍均衡）
+        库中没有合适的设计、或其行数高于下界（minimumRuns）时，再按 constructDesign 构造最小的均衡正交表，
+        二者取行数较少者（行数相同时取正交表库中的设计）；结果按水平组合缓存，重复查询不再查找或构造
+        返回的正交表恰为 k 列、各列水平数与请求一致，不再出现超出水平范围（None）的取值
         """
         mk = sorted(mk, key=lambda i: i[0])
+        levels = tuple(m for m, k in mk for _ in range(k))
 
-        m = max([i[0] for i in mk])
-        k = sum([i[1] for i in mk])
-        n = sum([i[1] * (i[0] - 1) for i in mk]) + 1
-        query_key = ' '.join(['^'.join([str(j) for j in i]) for i in mk])
-
-        for data in self.data:
-            # 先查询是否有完全匹配的正交表数据
-            if query_key in data[0]:
-                return dataSplit(data[1])
-            # 否则返回满足>=m,n,k条件的n最小数据
-            elif data[1]['n'] >= n and data[1]['mk'][0][0] >= m and data[1]['mk'][0][1] >= k:
-                return dataSplit(data[1])
-        # 无结果
+        selected = self.index['selected']
+        if levels not in selected:
+            # 正交表库中的设计已达到行数下界时不再构造；未找到或可能有更小的构造时才调用 constructDesign
+            design = self.fromTable(levels)
+            if design is None or len(design) > minimumRuns(levels):
+                constructed = constructDesign(levels)
+                if design is None or len(constructed) < len(design):
+                    design = constructed
+            design = np.array(design)
+            design.flags.writeable = False
+            selected[levels] = design
+        return selected[levels].tolist()
+
+    def fromTable(self, levels, max_runs=None):
+        """
+        在正交表库中查找行数最少（不超过 max_runs）且可按列选取、合并得到所需水平的正交表，没有时返回 None
+        水平数互素的因素可共用一列（如 6 水平列取模 2、模 3 得到相互正交的 2、3 水平列），只要其乘积整除该列水平数
+        候选先按必要条件向量化筛选：行数为各水平数及任意两因素水平数之积的倍数，
+        且对每个水平数 a > 1，水平数为 a 的倍数的列不少于水平数为 a 的倍数的因素（这些因素不互素，不能共用一列）
+        """
+        index = self.index
+        runs = index['n']
+        divisible = index['divisible']
+        if max(levels) >= divisible.shape[1]:
+            return None
+        mask = runs % pairMultiple(levels) == 0
+        for a in set(levels) - {1}:
+            mask &= divisible[:, a] >= sum(level % a == 0 for level in levels)
+        if max_runs is not None:
+            mask &= runs <= max_runs
+        candidates = np.flatnonzero(mask)
+        for pos in candidates[np.argsort(runs[candidates], kind='stable')]:
+            first = index['level_start'][pos]
+            column_levels = index['levels'][first:first + index['ncols'][pos]].astype(int)
+            # 各列已分配因素的水平数之积（1 为空闲列）
+            hosted = np.ones(len(column_levels), dtype=int)
+            columns = [0] * len(levels)
+            # 水平数大的因素先选列：优先空闲列中水平数最小（相同或最小整数倍）的列，其次与已分配因素互素的共用列
+            for i in sorted(range(len(levels)), key=lambda i: -levels[i]):
+                fits = np.flatnonzero((column_levels % (hosted * levels[i]) == 0) & (np.gcd(hosted, levels[i]) == 1))
+                if not len(fits):
+                    break
+                columns[i] = fits[np.lexsort((column_levels[fits], hosted[fits] > 1))[0]]
+                hosted[columns[i]] *= levels[i]
+            else:
+                start, nrows, ncols = index['start'][pos], index['nrows'][pos], index['ncols'][pos]
+                table = np.asarray(index['rows'][start:start + nrows * ncols]).reshape(nrows, ncols)
+                design = table[:, columns] % np.array(levels)
+                if checkOrthogonal(design, levels):
+                    return design
         return None
 
     def genSets(self, params, mode=0, num=1):
@@ -0,0 +1,284 @@
+# ============================================================
+# 文件名称: RsoftArchive.py
+# 模块功能: 研究打包归档（单个带目录表的压缩文件），分析时按成员随机读取，无需解压
+# 功能概述:
+#   - pack_study: 将研究目录（Sim / Scan 子目录、OptimizeN、OEDsim 等）及同名前缀的研究文件
+#     （_manifest.jsonl、_store.npz、_result.txt、_metrics.npz 等）打包为 {路径}.zip
+#     （标准 zip 格式，任何解压工具都可还原原目录结构）；默认只打包 .mon 与结果表格，场文件按 fields 选择
+#   - 目录表 toc.json: 各成员大小与压缩后大小、按扩展名的文件数、包内的研究（含清单的目录）
+#   - 原目录不存在而存在归档时，RsoftData / load_study / ResultStore 通过 study_files 自动从归档读取
+#     （zip 中央目录即索引，按成员随机读取，只解压用到的成员）
+#   - 命令行: python RsoftArchive.py pack 研究路径 [--fields *.fld,*.pcs] [--remove]
+#             python RsoftArchive.py list 研究路径
+#             python RsoftArchive.py unpack 研究路径
+# 依赖模块: os, io, json, glob, fnmatch, shutil, threading, zipfile, numpy, RsoftMon
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import io
+import sys
+import json
+import time
+import glob
+import fnmatch
+import shutil
+import threading
+import zipfile
+import numpy as np
+from RsoftMon import *
+
+archive_suffix = ".zip"
+
+# 默认打包的文件: 监视器结果、研究清单与结果存储、结果表格、预览图、ind 文件
+study_patterns = ("*.mon", "*.jsonl", "*.json", "*.npz", "*.txt", "*.ind", "*.png")
+
+# 研究目录外的研究文件（{研究路径}{后缀}）
+study_suffixes = ("_manifest.jsonl", "_store.npz", "_store.jsonl", "_result.txt", "_metrics.npz", "_records.npz", "_live.json",
+                  "_samples.jsonl", "_preview.png", "_result.png", "_outputs.zip")
+
+# 已压缩的格式直接存储，不再压缩
+stored_patterns = ("*.png", "*.zip", "*.gz")
+
+
+# ============================================================
+# 类名: LooseFiles
+# 功能: 未打包研究的文件访问（直接读取磁盘文件），与 StudyArchive 接口相同
+# ============================================================
+class LooseFiles:
+    def isfile(self, path):
+        return os.path.isfile(path)
+
+    def getmtime(self, path):
+        return os.path.getmtime(path)
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def open_text(self, path):
+        return open(path, "r")
+
+    def load_npz(self, path):
+        with np.load(path) as data:
+            return {name: data[name] for name in data.files}
+
+    def glob(self, pattern):
+        return glob.glob(pattern)
+
+    def last_record(self, path):
+        return last_record(path)
+
+    def read_trace(self, path, cache=True):
+        return read_trace(path, cache)
+
+    def trace_shape(self, path):
+        return trace_shape(path)
+
+
+loose_files = LooseFiles()
+
+
+# ============================================================
+# 类名: StudyArchive
+# 功能: 研究归档的只读随机访问（按原文件路径访问对应成员）
+# 属性:
+#   path  - 归档文件路径
+#   root  - 归档对应的原目录路径（成员名相对其上级目录）
+#   toc   - 目录表（toc.json）
+#   reads - 已解析的 .mon 成员数（同 RecordCache.reads）
+# ============================================================
+class StudyArchive:
+    def __init__(self, path, root=None):
+        self.path = path
+        self.root = root if root is not None else path[:-len(archive_suffix)]
+        self.base = os.path.dirname(self.root)
+        self.zip = zipfile.ZipFile(path)
+        self.names = set(self.zip.namelist())
+        self.lock = threading.Lock()
+        self.mtime = os.path.getmtime(path)
+        self.records = {}
+        self.reads = 0
+        self.toc = json.loads(self.zip.read("toc.json")) if "toc.json" in self.names else {}
+
+    # === 原文件路径 → 成员名 ===
+    def member(self, path):
+        return os.path.relpath(path, self.base).replace(os.sep, "/")
+
+    def isfile(self, path):
+        return self.member(path) in self.names
+
+    # 成员的修改时间统一取归档文件的修改时间（归档内容不再变化）
+    def getmtime(self, path):
+        return self.mtime
+
+    # === 读取一个成员（只解压该成员）===
+    def read(self, path):
+        with self.lock:
+            return self.zip.read(self.member(path))
+
+    def open_text(self, path):
+        return io.StringIO(self.read(path).decode())
+
+    def load_npz(self, path):
+        with np.load(io.BytesIO(self.read(path))) as data:
+            return {name: data[name] for name in data.files}
+
+    # === 按通配符匹配成员（同 glob.glob，* 不跨目录）===
+    def glob(self, pattern):
+        pattern = self.member(pattern)
+        depth = pattern.count("/")
+        return [os.path.join(self.base, *name.split("/")) for name in sorted(self.names)
+                if name.count("/") == depth and fnmatch.fnmatchcase(name, pattern)]
+
+    # === 最后一条记录（解析结果缓存）===
+    def last_record(self, path):
+        values = self.records.get(path)
+        if values is None:
+            last_line = self.read(path).rstrip().rsplit(b"\n", 1)[-1].decode()
+            values = [float(value) for value in last_line.split()]
+            self.records[path] = values
+            self.reads += 1
+        return values
+
+    # === RecordCache 接口（RsoftData.output 使用）===
+    def record(self, path):
+        return self.last_record(path)
+
+    def save(self):
+        pass
+
+    def read_trace(self, path, cache=True):
+        return np.loadtxt(io.BytesIO(self.read(path)), ndmin=2)
+
+    def trace_shape(self, path):
+        data = self.read(path).rstrip(b"\n")
+        return data.count(b"\n") + 1 if data else 0, len(self.last_record(path))
+
+    def close(self):
+        self.zip.close()
+
+
+# === 已打开的归档 {归档路径: StudyArchive}（归档文件被替换时重新打开）===
+open_archives = {}
+
+
+# === 研究的文件访问对象 ===
+# 函数名: study_files
+# 参数:
+#   run_path : 研究结果目录
+# 返回:
+#   files    : 研究目录存在时为 loose_files；目录不存在而其自身或上级目录已打包时为对应的 StudyArchive
+def study_files(run_path):
+    if os.path.exists(run_path):
+        return loose_files
+    path = os.path.normpath(os.path.abspath(run_path))
+    while True:
+        archive_path = path + archive_suffix
+        if os.path.isfile(archive_path):
+            archive = open_archives.get(archive_path)
+            if archive is None or archive.mtime != os.path.getmtime(archive_path):
+                archive = StudyArchive(archive_path)
+                open_archives[archive_path] = archive
+            return archive
+        parent = os.path.dirname(path)
+        if parent == path or os.path.isdir(path):
+            return loose_files
+        path = parent
+
+
+# === 打包研究 ===
+# 函数名: pack_study
+# 参数:
+#   path   : 研究目录（Scan 子目录、OptimizeN、OEDsim 目录等）
+#   fields : 额外打包的文件通配符（如 ("*.fld", "*.pcs")，"*" 为全部文件）
+#   remove : 打包完成后删除原目录及已打包的同名前缀研究文件（未选中的场文件随目录一并删除）
+# 返回:
+#   archive_path : 归档路径 {path}.zip
+def pack_study(path, fields=(), remove=False):
+    path = os.path.normpath(path)
+    if not os.path.isdir(path):
+        raise FileNotFoundError(f"No study directory at {path}")
+    archive_path = path + archive_suffix
+    base = os.path.dirname(path)
+    patterns = study_patterns + tuple(fields)
+
+    def selected(name):
+        return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+    # 目录内的文件 + 目录外同名前缀的研究文件（{path}_manifest.jsonl 等）
+    files = []
+    for directory, subdirectories, names in os.walk(path):
+        subdirectories.sort()
+        files += [os.path.join(directory, name) for name in sorted(names) if selected(name)]
+    siblings = [path + suffix for suffix in study_suffixes if os.path.isfile(path + suffix) and selected(os.path.basename(path + suffix))]
+
+    temp_path = archive_path + ".tmp"
+    members = {}
+    counts = {}
+    with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for file in files + siblings:
+            name = os.path.relpath(file, base).replace(os.sep, "/")
+            stored = any(fnmatch.fnmatch(name, pattern) for pattern in stored_patterns)
+            archive.write(file, name, zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED)
+            info = archive.getinfo(name)
+            members[name] = [info.file_size, info.compress_size]
+            extension = os.path.splitext(name)[1] or name
+            counts[extension] = counts.get(extension, 0) + 1
+        toc = {
+            "root": os.path.basename(path),
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "files": len(members),
+            "size": sum(size for size, _ in members.values()),
+            "compressed": sum(size for _, size in members.values()),
+            "extensions": counts,
+            "studies": sorted(name[:-len("_manifest.jsonl")] for name in members if name.endswith("_manifest.jsonl")),
+            "members": members,
+        }
+        archive.writestr("toc.json", json.dumps(toc, indent=1))
+    os.replace(temp_path, archive_path)
+    open_archives.pop(os.path.abspath(archive_path), None)
+
+    if remove:
+        shutil.rmtree(path)
+        for sibling in siblings:
+            os.remove(sibling)
+    return archive_path
+
+
+# === 解包研究（还原原目录结构）===
+# 参数:
+#   path    : 研究目录（归档为 {path}.zip）
+#   members : 只解出这些原文件路径（None 为全部）
+# 返回:
+#   paths   : 解出的文件路径列表
+def unpack_study(path, members=None):
+    path = os.path.normpath(path)
+    archive = StudyArchive(path + archive_suffix, path)
+    names = [archive.member(member) for member in members] if members is not None else sorted(archive.names - {"toc.json"})
+    with archive.lock:
+        paths = [archive.zip.extract(name, archive.base) for name in names]
+    archive.close()
+    return paths
+
+
+# === 命令行入口 ===
+def main(argv):
+    command, path = argv[0], argv[1]
+    if command == "pack":
+        fields = argv[argv.index("--fields") + 1].split(",") if "--fields" in argv else ()
+        archive_path = pack_study(path, fields, remove="--remove" in argv)
+        toc = StudyArchive(archive_path).toc
+        print(f"{archive_path}: {toc['files']} 个文件，{toc['size'] / 2 ** 20:.1f} MB → {os.path.getsize(archive_path) / 2 ** 20:.1f} MB")
+    elif command == "list":
+        toc = StudyArchive(os.path.normpath(path) + archive_suffix).toc
+        print(json.dumps({key: value for key, value in toc.items() if key != "members"}, indent=2, ensure_ascii=False))
+    elif command == "unpack":
+        print(f"解出 {len(unpack_study(path))} 个文件")
+    else:
+        raise ValueError(f"unknown command: {command}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,284 @@
+# ============================================================
+# 文件名称: RsoftArray.py
+# 模块功能: 带轴名的 N 维结果数组，可从任意 Sim / Scan / OEDsim 研究加载
+# 功能概述:
+#   - 轴: 每个扫描 symbol、wave、输出端口 port（完整功率曲线另有 z 轴），每轴附坐标值
+#   - sel / isel 按坐标值或位置选择、切片；max / min / mean / sum 等按轴名归约（忽略 nan）
+#   - argmin / argmax 返回最优点的坐标值（如各 wave 最坏情况下 Lb 的最优取值）
+#   - 完整功率曲线写入 {run_path}_traces.npy 并以内存映射方式打开，切片时只读取所需部分
+#   - 已打包的研究（见 RsoftArchive）从归档中按成员读取，曲线缓存 .npy 写在归档旁
+# 使用示例:
+#   power = load_study(run_path)                        # 轴: Lta, wave, port
+#   IL = power.apply(loss_db).max("port")               # 各点最大插入损耗
+#   IL.max("wave").argmin("Lta")                        # 波长最坏情况下的最优 Lta
+#   traces = load_study(run_path, traces=True)          # 轴: Lta, wave, z, port（memmap）
+#   traces.sel(Lta=300, wave=1.55).values               # 只读取一条曲线
+# 依赖模块: os, json, numpy, RsoftMon, RsoftStore
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import json
+from collections import OrderedDict
+import numpy as np
+from RsoftMon import *
+from RsoftStore import *
+
+
+# ============================================================
+# 类名: LabeledArray
+# 功能: 数据数组（ndarray 或 memmap）+ 有序轴名及坐标
+# 属性:
+#   data   - 数据数组
+#   coords - OrderedDict{轴名: 坐标数组}，顺序与 data 的维度一致
+#   cases  - 可选，{symbol: 各 test 的取值}（非全因子研究的 test 轴说明）
+# ============================================================
+class LabeledArray:
+    def __init__(self, data, coords, cases=None):
+        self.data = data
+        self.coords = OrderedDict((name, np.asarray(values)) for name, values in coords.items())
+        self.cases = cases or {}
+        if tuple(len(values) for values in self.coords.values()) != self.data.shape:
+            raise ValueError(f"Axes {self.dims} do not match data shape {self.data.shape}")
+
+    @property
+    def dims(self):
+        return tuple(self.coords)
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    # === 读取为内存中的 ndarray ===
+    @property
+    def values(self):
+        return np.asarray(self.data)
+
+    def __repr__(self):
+        axes = ", ".join(f"{name}: {len(values)}" for name, values in self.coords.items())
+        return f"LabeledArray({axes})"
+
+    def axis(self, name):
+        if name not in self.coords:
+            raise KeyError(f"No axis '{name}', available axes: {self.dims}")
+        return self.dims.index(name)
+
+    # === 坐标值 → 位置（数值坐标取最接近的点，slice 按坐标闭区间）===
+    def locate(self, name, value):
+        coords = self.coords[name]
+        if isinstance(value, slice):
+            inside = np.ones(len(coords), dtype=bool)
+            if value.start is not None:
+                inside &= coords >= value.start
+            if value.stop is not None:
+                inside &= coords <= value.stop
+            positions = np.nonzero(inside)[0]
+            return slice(positions[0], positions[-1] + 1) if len(positions) else slice(0, 0)
+        if isinstance(value, (list, tuple, np.ndarray)):
+            return [self.locate(name, v) for v in value]
+        if coords.dtype.kind in "fiu":
+            return int(np.argmin(np.abs(coords - float(value))))
+        matches = np.nonzero(coords == value)[0]
+        if not len(matches):
+            raise KeyError(f"{name}={value} not in coordinates")
+        return int(matches[0])
+
+    # === 按位置选择（整数去掉该轴，slice 为视图，列表为拷贝）===
+    # 函数名: isel
+    # 参数:
+    #   **positions : 轴名=整数 / slice / 位置列表
+    # 返回:
+    #   LabeledArray（全部为整数时仍返回 0 维 LabeledArray，可用 .values 取值）
+    def isel(self, **positions):
+        basic = [slice(None)] * len(self.dims)
+        lists = {}
+        for name, position in positions.items():
+            if isinstance(position, list):
+                lists[name] = position
+            else:
+                basic[self.axis(name)] = position
+        data = self.data[tuple(basic)]
+        coords = OrderedDict((name, values[basic[i]]) for i, (name, values) in enumerate(self.coords.items())
+                             if not isinstance(basic[i], (int, np.integer)))
+        for name, position in lists.items():
+            data = np.take(data, position, axis=list(coords).index(name))
+            coords[name] = coords[name][position]
+        return LabeledArray(data, coords, self.cases)
+
+    # === 按坐标值选择 ===
+    # 示例: power.sel(Lta=300, wave=[1.31, 1.55], port=1)、power.sel(Lta=slice(200, 600))
+    def sel(self, **selectors):
+        return self.isel(**{name: self.locate(name, value) for name, value in selectors.items()})
+
+    # === 沿一个或多个轴归约（func 为 numpy 归约函数，如 np.nanmax）===
+    def reduce(self, func, *names):
+        names = names or self.dims
+        axes = tuple(self.axis(name) for name in names)
+        data = func(self.values, axis=axes)
+        coords = OrderedDict((name, values) for name, values in self.coords.items() if name not in names)
+        return LabeledArray(np.asarray(data), coords, self.cases)
+
+    def max(self, *names):
+        return self.reduce(np.nanmax, *names)
+
+    def min(self, *names):
+        return self.reduce(np.nanmin, *names)
+
+    def mean(self, *names):
+        return self.reduce(np.nanmean, *names)
+
+    def sum(self, *names):
+        return self.reduce(np.nansum, *names)
+
+    # === 沿一个轴取最优点的坐标值 ===
+    def argmin(self, name):
+        return self.arg(np.nanargmin, name)
+
+    def argmax(self, name):
+        return self.arg(np.nanargmax, name)
+
+    def arg(self, func, name):
+        positions = func(self.values, axis=self.axis(name))
+        coords = OrderedDict((n, values) for n, values in self.coords.items() if n != name)
+        return LabeledArray(self.coords[name][positions], coords, self.cases)
+
+    # === 逐元素变换（如 loss_db）===
+    def apply(self, func):
+        return LabeledArray(func(self.values), self.coords, self.cases)
+
+    # === 调整轴顺序 ===
+    def transpose(self, *names):
+        order = [self.axis(name) for name in names]
+        return LabeledArray(np.transpose(self.data, order), OrderedDict((name, self.coords[name]) for name in names), self.cases)
+
+
+# === 研究的任务清单（优先研究清单，其次结果存储）===
+def study_index(run_path):
+    index = read_manifest(run_path)
+    store = ResultStore(run_path)
+    if index is None and store.exists():
+        index = store.load()
+    if index is None:
+        raise FileNotFoundError(f"No manifest or result store for {run_path}")
+    return index, store if store.exists() else None
+
+
+# === 由任务清单确定轴: 各 symbol 构成全因子时每个 symbol 一轴，否则（OEDsim）合并为 test 轴 ===
+# 返回:
+#   coords    : OrderedDict{轴名: 坐标}（不含 port / z）
+#   positions : (n_job, n_axis) 每个任务在各轴上的位置
+#   cases     : test 轴对应的各 symbol 取值（全因子时为空）
+def study_axes(index):
+    names = [str(name) for name in index["names"]]
+    values, overrides = index["values"], index["overrides"]
+
+    # 数值列按数值排序，含非数值（如材料名）时按字符串
+    def column(k):
+        return values[:, k] if not np.isnan(values[:, k]).any() else overrides[:, k]
+
+    def unique(k):
+        return np.unique(column(k), return_inverse=True)
+
+    if not names:
+        return OrderedDict(), np.zeros((len(index["prefix"]), 0), dtype=int), {}
+    wave = [k for k, name in enumerate(names) if name == "wave"]
+    others = [k for k, name in enumerate(names) if name != "wave"]
+    axes = [(names[k], *unique(k)) for k in others]
+    combos = {tuple(overrides[r, others]) for r in range(len(overrides))}
+    cases = {}
+    if len(others) > 1 and len(combos) < np.prod([len(coords) for _, coords, _ in axes]):
+        # 非全因子: 按前缀顺序为每个参数组合编号
+        keys = np.array(["_".join(key) for key in overrides[:, others]])
+        _, key_row = np.unique(keys, return_inverse=True)
+        position = np.empty(len(keys), dtype=int)
+        position[np.argsort(index["prefix"], kind="stable")] = np.arange(len(keys))
+        first = np.full(key_row.max() + 1, len(keys))
+        np.minimum.at(first, key_row, position)
+        test = np.argsort(np.argsort(first))[key_row]
+        for k in others:
+            cases[names[k]] = np.empty(len(first), dtype=column(k).dtype)
+            cases[names[k]][test] = column(k)
+        axes = [("test", np.arange(1, len(first) + 1), test)]
+    if wave:
+        axes.append(("wave", *unique(wave[0])))
+    coords = OrderedDict((name, coords) for name, coords, _ in axes)
+    positions = np.column_stack([position for _, _, position in axes])
+    return coords, positions, cases
+
+
+# === 从研究目录加载带轴名的结果数组 ===
+# 函数名: load_study
+# 参数:
+#   run_path : 研究结果目录（Sim 运行目录、Scan 子目录、OEDsim 子目录等，需有清单或结果存储）
+#   traces   : False 返回输出功率（轴 ..., port）；True 返回完整功率曲线（轴 ..., z, port，memmap）
+# 返回:
+#   LabeledArray，未完成的仿真点为 nan
+def load_study(run_path, traces=False):
+    index, store = study_index(run_path)
+    coords, positions, cases = study_axes(index)
+    prefixes = [str(prefix) for prefix in index["prefix"]]
+    columns = store.load() if store is not None else {"prefix": []}
+    store_row = {str(prefix): k for k, prefix in enumerate(columns["prefix"])}
+    mon_paths = [os.path.join(run_path, str(mon)) for mon in index["mon"]]
+    files = study_files(run_path)
+    shape = tuple(len(values) for values in coords.values())
+    cell = [tuple(position) for position in positions]
+
+    if not traces:
+        power = {}
+        for k, prefix in enumerate(prefixes):
+            if prefix in store_row and not np.isnan(columns["power"][store_row[prefix]]).all():
+                power[k] = columns["power"][store_row[prefix]]
+            elif files.isfile(mon_paths[k]):
+                power[k] = np.array(files.last_record(mon_paths[k])[1:])
+        n_out = max([len(values) for values in power.values()] + [0])
+        data = np.full(shape + (n_out,), np.nan)
+        for k, values in power.items():
+            data[cell[k] + (slice(0, len(values)),)] = values
+        coords["port"] = np.arange(1, n_out + 1)
+        return LabeledArray(data, coords, cases)
+
+    # === 完整功率曲线: 写入 .npy 后以 memmap 打开（清单 / 存储未更新时直接复用）===
+    npy_path = run_path + "_traces.npy"
+    axes_path = run_path + "_traces.json"
+    sources = [path for path in (run_path + "_manifest.jsonl", store.npz_path if store else None, store.log_path if store else None)
+               if path and files.isfile(path)]
+    if not (os.path.isfile(npy_path) and os.path.isfile(axes_path)
+            and os.path.getmtime(npy_path) >= max(files.getmtime(path) for path in sources)):
+        os.makedirs(os.path.dirname(os.path.abspath(npy_path)), exist_ok=True)
+
+        packed = "trace_offset" in columns
+
+        def trace_of(k):
+            if packed and prefixes[k] in store_row:
+                return store.trace(store_row[prefixes[k]])
+            return files.read_trace(mon_paths[k], cache=False) if files.isfile(mon_paths[k]) else None
+
+        # 第一遍只统计各曲线行数与列数，第二遍逐条写入，内存中同时只有一条曲线
+        if packed:
+            offset = columns["trace_offset"]
+            sizes = {k: (offset[store_row[p] + 1] - offset[store_row[p]], columns["trace_data"].shape[1])
+                     for k, p in enumerate(prefixes) if p in store_row}
+        else:
+            sizes = {k: files.trace_shape(path) for k, path in enumerate(mon_paths) if files.isfile(path)}
+        nz = max([size[0] for size in sizes.values()] + [0])
+        n_out = max([size[1] - 1 for size in sizes.values()] + [0])
+        longest = max(sizes, key=lambda k: sizes[k][0], default=None)
+        z = trace_of(longest)[:, 0] if longest is not None else np.zeros(0)
+        data = np.lib.format.open_memmap(npy_path, mode="w+", dtype=float, shape=shape + (int(nz), int(n_out)))
+        data[...] = np.nan
+        for k in range(len(prefixes)):
+            trace = trace_of(k)
+            if trace is not None:
+                data[cell[k] + (slice(0, len(trace)), slice(0, trace.shape[1] - 1))] = trace[:, 1:]
+        data.flush()
+        del data
+        with open(axes_path, "w") as f:
+            json.dump({"z": z.tolist(), "port": list(range(1, n_out + 1))}, f)
+
+    with open(axes_path, "r") as f:
+        extra = json.load(f)
+    coords["z"] = np.array(extra["z"])
+    coords["port"] = np.array(extra["port"])
+    return LabeledArray(np.load(npy_path, mmap_mode="r"), coords, cases)
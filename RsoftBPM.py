@@ -0,0 +1,320 @@
+# ============================================================
+# 文件名称: RsoftBPM.py
+# 模块功能: 纯 NumPy 的二维标量光束传播法（分步 FFT-BPM）参考引擎，离线替代 bsimw32 进行预筛
+# 功能概述:
+#   - 读取 RsoftCad 生成的 .ind（直波导段、渐变段、弧形段、pathway、monitor、launch_field）
+#   - 逐步光栅化为 x 方向折射率切片；三维设计按 RsoftEIM 的平板有效折射率自动降为二维
+#   - 计算模式、高斯或场文件（RsoftMode 写出）光源入射，宽角谱传播子 + 相位屏分步传播，对波长批量向量化
+#   - 按 RsoftData.output 读取的格式写出 .mon 文件（每行: z 监视器1 监视器2 ...）
+# 使用方式（与 bsimw32 命令行一致）:
+#   python RsoftBPM.py test.ind prefix=Lta(100)_wave(1.55) Lta=100 wave=1.55
+#   RsoftSimulation(..., solver=bpm_command)  # 作为任意仿真类型的求解器后端
+#   python RsoftBPM.py test.ind jobs=batch_0001.jobs   # 批量求解，任务文件每行一个任务的参数
+# 说明: 近似物理模型（标量、二维、无偏振），用于趋势预筛，不替代 RSoft 的最终验证
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import sys
+import numpy as np
+from RsoftInd import *
+from RsoftEIM import slab_neff, slab_table
+from RsoftMode import read_field
+
+# 作为 RsoftSimulation 求解器后端的命令前缀
+bpm_command = f'"{sys.executable}" "{os.path.abspath(__file__)}"'
+
+
+# ============================================================
+# 类名: BPMDesign
+# 功能: 在给定 symbol 覆盖下解析 .ind 几何（段端点、宽度、渐变、弧形）与各段芯层折射率差
+# ============================================================
+class BPMDesign:
+    def __init__(self, ind, overrides=None):
+        self.ind = ind
+        self.table = ind.evaluate(overrides)
+        self.segments = {segment["number"]: segment for segment in ind.segments}
+        self.points = {}  # {(段号, "begin"/"end"): (x, z)}
+
+    # === 解析一个坐标表达式，如 "0 rel end segment 5" ===
+    def coordinate(self, number, vertex, axis):
+        expr = self.segments[number].get(f"{vertex}.{axis}", "0")
+        words = expr.split()
+        if "rel" in words:
+            i = words.index("rel")
+            offset = " ".join(w for w in words[:i] if w != "deg")
+            ref_vertex, ref_number = words[i + 1], int(words[i + 3])
+            ref = self.point(ref_number, ref_vertex)
+            base = ref[0] if axis == "x" else ref[1] if axis == "z" else 0.0
+            if "deg" in words[:i] and axis == "x":
+                # 角度模式: x 由 z 方向长度与角度确定
+                z_begin = self.point(number, "begin")[1] if vertex == "end" else base
+                z_here = self.coordinate(number, vertex, "z")
+                return base + (z_here - z_begin) * np.tan(np.radians(float(self.table.value(offset))))
+            return base + float(self.table.value(offset))
+        return float(self.table.value(expr))
+
+    # === 段端点坐标 (x, z)，弧形段的终点由半径与角度推算 ===
+    def point(self, number, vertex):
+        key = (number, vertex)
+        if key not in self.points:
+            segment = self.segments[number]
+            if vertex == "end" and segment.get("position_taper") == "TAPER_ARC":
+                xb, zb = self.point(number, "begin")
+                radius, iangle, fangle = self.arc(number)
+                sign = 1 if fangle >= iangle else -1
+                self.points[key] = (xb + sign * radius * (np.cos(iangle) - np.cos(fangle)),
+                                    zb + sign * radius * (np.sin(fangle) - np.sin(iangle)))
+            else:
+                self.points[key] = (self.coordinate(number, vertex, "x"), self.coordinate(number, vertex, "z"))
+        return self.points[key]
+
+    def arc(self, number):
+        segment = self.segments[number]
+        return (float(self.table.value(segment["arc_radius"])),
+                np.radians(float(self.table.value(segment["arc_iangle"]))),
+                np.radians(float(self.table.value(segment["arc_fangle"]))))
+
+    # === 段在 z 数组上的中心位置与宽度（向量化）===
+    # 返回: xc, width, t（t 为段内归一化位置 0~1）
+    def profile(self, number, z):
+        segment = self.segments[number]
+        xb, zb = self.point(number, "begin")
+        xe, ze = self.point(number, "end")
+        t = np.clip((z - zb) / (ze - zb), 0, 1) if ze != zb else np.zeros_like(z)
+        if segment.get("position_taper") == "TAPER_ARC":
+            radius, iangle, fangle = self.arc(number)
+            sign = 1 if fangle >= iangle else -1
+            sin_angle = np.clip(np.sin(iangle) + sign * (z - zb) / radius, -1, 1)
+            xc = xb + sign * radius * (np.cos(iangle) - np.sqrt(1 - sin_angle ** 2))
+        else:
+            xc = xb + (xe - xb) * t
+        wb = float(self.table.value(segment.get("begin.width", "width")))
+        we = float(self.table.value(segment.get("end.width", segment.get("begin.width", "width"))))
+        taper = segment.get("width_taper", "TAPER_LINEAR")
+        if taper == "TAPER_QUADRATIC":
+            width = wb + (we - wb) * t ** 2
+        elif taper == "TAPER_EXPONENTIAL" and wb > 0 and we > 0:
+            width = wb * (we / wb) ** t
+        else:
+            width = wb + (we - wb) * t
+        return xc, width, t
+
+    # === 段两端的芯层折射率差（按波长向量化，三维设计按平板有效折射率降维）===
+    # 返回: delta_begin, delta_end（形状均为 (n_wave,)）
+    def core_delta(self, number, tables):
+        segment = self.segments[number]
+        deltas = []
+        for vertex in ("begin", "end"):
+            delta_expr = segment.get(f"{vertex}.delta", segment.get("begin.delta", "delta"))
+            n_clad = np.array([table["background_index"] for table in tables])
+            n_core = n_clad + np.array([float(table.value(delta_expr)) for table in tables])
+            if self.ind.dimension == 3:
+                height_expr = segment.get(f"{vertex}.height", segment.get("begin.height", "height"))
+                thickness = np.array([float(table.value(height_expr)) for table in tables])
+                wave = np.array([table["free_space_wavelength"] for table in tables])
+                n_core = slab_table(n_core, n_clad, thickness, wave)
+            deltas.append(n_core - n_clad)
+        return deltas[0], deltas[1]
+
+    # === pathway 在 z 数组上的中心与宽度（取覆盖该 z 的段）===
+    def pathway_profile(self, pathway, z):
+        xc, width = np.full_like(z, np.nan), np.full_like(z, np.nan)
+        for number in self.ind.pathways[pathway - 1]:
+            zb, ze = self.point(number, "begin")[1], self.point(number, "end")[1]
+            inside = (z >= min(zb, ze)) & (z <= max(zb, ze))
+            seg_xc, seg_width, _ = self.profile(number, z[inside])
+            xc[inside], width[inside] = seg_xc, seg_width
+        # pathway 范围之外沿用最近端点
+        valid = ~np.isnan(xc)
+        if valid.any():
+            xc = np.interp(z, z[valid], xc[valid])
+            width = np.interp(z, z[valid], width[valid])
+        return xc, width
+
+
+# === 对称平板基模场分布（对波长向量化，功率归一化）===
+# 参数:
+#   x       : 相对波导中心的横向坐标 (nx,)
+#   width   : 芯层宽度（标量）
+#   n_core, n_clad, wave : (n_wave,) 数组
+#   neff    : 预先求得的有效折射率 (n_wave,)，None 时现场求解
+# 返回:
+#   field   : (n_wave, nx) 实数场
+def slab_mode(x, width, n_core, n_clad, wave, dx, neff=None):
+    if neff is None:
+        neff = slab_neff(n_core, n_clad, width, wave)
+    k0 = 2 * np.pi / wave
+    kappa = (k0 * np.sqrt(np.maximum(n_core ** 2 - neff ** 2, 0)))[:, None]
+    gamma = (k0 * np.sqrt(np.maximum(neff ** 2 - n_clad ** 2, 0)))[:, None]
+    a = width / 2
+    field = np.where(np.abs(x) <= a, np.cos(kappa * x), np.cos(kappa * a) * np.exp(-gamma * (np.abs(x) - a)))
+    return field / np.sqrt(np.sum(field ** 2, axis=1, keepdims=True) * dx)
+
+
+# === 批量传播一个设计（同一组 symbol，多个波长）===
+# 函数名: simulate
+# 参数:
+#   ind_file  : .ind 文件路径
+#   overrides : {symbol: value}（不含 wave）
+#   waves     : 波长列表，None 时使用 ind 文件中的 wave
+# 返回:
+#   z         : (nz,) 监视器 z 坐标
+#   monitors  : (n_wave, nz, n_monitor) 监视器数值
+def simulate(ind_file, overrides=None, waves=None):
+    ind = load_ind(ind_file)
+    overrides = dict(overrides or {})
+    if waves is None:
+        waves = [overrides.pop("wave", ind.evaluate(overrides)["wave"])]
+    tables = [ind.evaluate({**overrides, "wave": wave}) for wave in waves]
+    design = BPMDesign(ind, {**overrides, "wave": waves[0]})
+    table = design.table
+    wave = np.array([t["free_space_wavelength"] for t in tables], dtype=float)
+    n_clad = np.array([t["background_index"] for t in tables], dtype=float)
+    k0 = 2 * np.pi / wave
+
+    # === 计算窗口与网格 ===
+    numbers = list(design.segments)
+    ends = [design.point(n, v) for n in numbers for v in ("begin", "end")]
+    z_min, z_max = min(p[1] for p in ends), max(p[1] for p in ends)
+    dx = float(table["grid_size"]) if "grid_size" in table else 0.1
+    dz = float(table["step_size"]) if "step_size" in table else 1.0
+    max_width = max(float(np.max(design.profile(n, np.array([design.point(n, "begin")[1], design.point(n, "end")[1]]))[1])) for n in numbers)
+    x_min = float(table["domain_min"]) if "domain_min" in table else min(p[0] for p in ends) - max_width - 10
+    x_max = float(table["domain_max"]) if "domain_max" in table else max(p[0] for p in ends) + max_width + 10
+    nx = int(np.ceil((x_max - x_min) / dx / 2)) * 2
+    x = x_min + dx * np.arange(nx)
+    nz = max(int(np.ceil((z_max - z_min) / dz)), 1)
+    z = z_min + dz * np.arange(1, nz + 1)
+    z_mid = z - dz / 2
+
+    # === 预计算各段在其 z 范围内的中心、宽度与芯层折射率差 ===
+    active = [[] for _ in range(nz)]
+    for number in numbers:
+        zb, ze = sorted((design.point(number, "begin")[1], design.point(number, "end")[1]))
+        steps = np.nonzero((z_mid >= zb) & (z_mid <= ze))[0]
+        if len(steps) == 0:
+            continue
+        xc, width, t = design.profile(number, z_mid[steps])
+        delta_begin, delta_end = design.core_delta(number, tables)
+        for k, step in enumerate(steps):
+            active[step].append((xc[k], width[k], delta_begin + (delta_end - delta_begin) * t[k]))
+
+    # === 传播子与吸收边界 ===
+    kx = 2 * np.pi * np.fft.fftfreq(nx, dx)
+    k_ref = (k0 * n_clad)[:, None]
+    propagator = np.exp(1j * (np.sqrt((k_ref ** 2 - kx ** 2).astype(complex)) - k_ref) * dz)
+    edge = 0.1 * (x_max - x_min)
+    distance = np.maximum(np.maximum(x_min + edge - x, x - (x_max - edge)), 0) / edge
+    absorber = np.exp(-0.5 * distance ** 4)
+
+    # === 光源 ===
+    launch = ind.launches[0] if ind.launches else {}
+    launch_pathway = int(launch.get("launch_pathway", 1))
+    first = ind.pathways[launch_pathway - 1][0]
+    x0, _ = design.point(first, "begin")
+    x0 += float(table.value(launch.get("launch_position", "0")))
+    _, width0, _ = design.profile(first, np.array([design.point(first, "begin")[1]]))
+    delta0, _ = design.core_delta(first, tables)
+    launch_kind = launch.get("launch_type", table["launch_type"] if "launch_type" in table else "LAUNCH_COMPMODE")
+    if launch_kind == "LAUNCH_GAUSSIAN":
+        launch_width = float(table.value(launch.get("launch_width", str(width0[0]))))
+        field = np.exp(-((x - x0) / (launch_width / 2)) ** 2)[None, :].repeat(len(waves), axis=0)
+        field = field / np.sqrt(np.sum(field ** 2, axis=1, keepdims=True) * dx)
+    elif launch_kind in ("LAUNCH_COMPMODE", "LAUNCH_WGMODE"):
+        field = slab_mode(x - x0, width0[0], n_clad + delta0, n_clad, wave, dx)
+    elif launch_kind == "LAUNCH_FILE":
+        # RsoftMode 写出的场文件（以发射段中心为原点）；二维截面场取 y = 0 行
+        launch_file = str(table.value(launch["launch_file"]))
+        if not os.path.isabs(launch_file):
+            launch_file = os.path.join(os.path.dirname(os.path.abspath(ind_file)), launch_file)
+        fx, fy, profile = read_field(launch_file)
+        if fy is not None:
+            profile = profile[np.argmin(np.abs(fy))]
+        profile = np.interp(x - x0, fx, profile.real, left=0, right=0) + 1j * np.interp(x - x0, fx, profile.imag, left=0, right=0)
+        field = profile[None, :].repeat(len(waves), axis=0)
+        field = field / np.sqrt(np.sum(np.abs(field) ** 2, axis=1, keepdims=True) * dx)
+    else:
+        raise ValueError(f"RsoftBPM does not support {launch_kind}")
+    field = field.astype(complex)
+
+    # === 监视器: pathway 中心、宽度及各步局部基模有效折射率（一次向量化求解）===
+    monitor_types, monitor_paths = [], []
+    for monitor in ind.monitors:
+        pathway = int(monitor.get("pathway", 1))
+        path_xc, path_width = design.pathway_profile(pathway, z)
+        path_neff = slab_neff((n_clad + delta0)[None, :], n_clad[None, :], path_width[:, None], wave[None, :])
+        monitor_types.append(monitor.get("monitor_type", "MONITOR_TOTAL_POWER"))
+        monitor_paths.append((path_xc, path_width, path_neff))
+    monitors = np.zeros((len(waves), nz, len(ind.monitors)))
+
+    # === 逐步传播 ===
+    for step in range(nz):
+        dn = np.zeros((len(waves), nx))
+        for xc, width, delta in active[step]:
+            # 亚像素平滑: 网格单元被芯层覆盖的比例
+            fill = np.clip((width / 2 - np.abs(x - xc)) / dx + 0.5, 0, 1)
+            dn = np.maximum(dn, delta[:, None] * fill[None, :])
+        field = np.fft.ifft(np.fft.fft(field * np.exp(1j * k0[:, None] * dn * dz), axis=1) * propagator, axis=1) * absorber
+
+        for m, (kind, (path_xc, path_width, path_neff)) in enumerate(zip(monitor_types, monitor_paths)):
+            if kind == "MONITOR_TOTAL_POWER":
+                monitors[:, step, m] = np.sum(np.abs(field) ** 2, axis=1) * dx
+            elif kind == "MONITOR_WG_POWER":
+                inside = np.abs(x - path_xc[step]) <= path_width[step] / 2
+                monitors[:, step, m] = np.sum(np.abs(field[:, inside]) ** 2, axis=1) * dx
+            elif kind == "MONITOR_FIELD_NEFF":
+                monitors[:, step, m] = path_neff[step]
+            else:
+                mode = slab_mode(x - path_xc[step], path_width[step], n_clad + delta0, n_clad, wave, dx, path_neff[step])
+                overlap = np.sum(field * mode, axis=1) * dx
+                monitors[:, step, m] = np.degrees(np.angle(overlap)) if kind.endswith("PHASE") else np.abs(overlap) ** 2
+    return z, monitors
+
+
+# === 写出 .mon 文件（每行: z 监视器1 监视器2 ...）===
+def write_mon(path, z, values):
+    np.savetxt(path, np.column_stack([z, values]), fmt="%.6g")
+
+
+# === 运行一组任务（symbol 仅 wave 不同的任务合并为一次批量传播）===
+# 函数名: run_jobs
+# 参数:
+#   ind_file : .ind 文件路径
+#   jobs     : [(prefix, {symbol: value}), ...]
+#   work_dir : 输出目录
+# 返回: 无（写出 {prefix}.mon）
+def run_jobs(ind_file, jobs, work_dir="."):
+    groups = OrderedDict()
+    for prefix, overrides in jobs:
+        overrides = dict(overrides)
+        wave = overrides.pop("wave", None)
+        groups.setdefault(tuple(sorted(overrides.items())), []).append((prefix, wave))
+    for key, members in groups.items():
+        overrides = dict(key)
+        waves = [wave for _, wave in members]
+        if None in waves:
+            waves = [overrides.get("wave", load_ind(ind_file).evaluate(overrides)["wave"])] * len(waves)
+        unique_waves = list(dict.fromkeys(waves))
+        z, monitors = simulate(ind_file, overrides, [float(w) for w in unique_waves])
+        for prefix, wave in zip((p for p, _ in members), waves):
+            write_mon(os.path.join(work_dir, f"{prefix}.mon"), z, monitors[unique_waves.index(wave)])
+
+
+# === 命令行入口（参数格式与 bsimw32 相同）===
+# 批量求解: jobs=任务文件，每行为一个任务的参数（prefix=... symbol=value ...），
+# 一次进程启动、一次设计解析完成全部任务，仅 wave 不同的任务合并为一次批量传播
+def main(argv):
+    ind_file = argv[0]
+    prefix, overrides = parse_overrides(argv[1:])
+    if "jobs" in overrides:
+        with open(overrides.pop("jobs"), "r") as f:
+            jobs = [parse_overrides(line.split()) for line in f if line.strip()]
+        run_jobs(ind_file, [(job_prefix, {**overrides, **job_overrides}) for job_prefix, job_overrides in jobs], os.getcwd())
+        return
+    run_jobs(ind_file, [(prefix or os.path.splitext(os.path.basename(ind_file))[0], overrides)], os.getcwd())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
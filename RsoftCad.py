@@ -112,7 +112,7 @@ class RsoftCad:
     def __init__(self, file_path=str, file_name=str, dimension=int, free_space_wavelength=float, background_material=str, Delta=float, width=float):
         if not os.path.exists(file_path):
             os.makedirs(file_path)  # 若目录不存在则递归创建
-        self.file = file_path + "\\" + file_name + ".ind"  # 构造完整路径
+        self.file = os.path.join(file_path, file_name + ".ind")  # 构造完整路径
         open(self.file, "w").close()  # 创建空文件
         print(f"{self.file}创建成功")
         self.Rsoftfile = open(self.file, "r+")  # 打开文件用于读写
@@ -217,7 +217,7 @@ class RsoftCad:
         current_path = os.getcwd()
 
         # === 构造材料库文件路径，例如: RsoftMaterial\Dielectrics.mlb ===
-        material_file = current_path + "\\RsoftMaterial\\" + material_class + ".mlb"
+        material_file = os.path.join(current_path, "RsoftMaterial", material_class + ".mlb")
 
         # === 初始化变量，准备读取目标材料段落 ===
         material_start_lines = []  # 存放所有材料块起始行号（匹配 'material n'）
@@ -450,10 +450,11 @@ class RsoftCad:
     # 参数:
     #   pathway     - 发射器路径编号
     #   launch_type - 发射类型，如 Computed_Mode, Gaussian 等
+    #   launch_file - launch_type.File 时的场文件名，或 "$symbol" 引用（配合 RsoftMode.launch_hook 按任务覆盖）
     # 返回:
     #   光源编号
     # ------------------------------------------------------------
-    def add_launch(self, pathway, launch_type):
+    def add_launch(self, pathway, launch_type, launch_file=None):
         self.Rsoftfile.seek(self.launch_marker_line)
         remaining_content = self.Rsoftfile.read()
         self.Rsoftfile.seek(self.launch_marker_line)
@@ -461,6 +462,8 @@ class RsoftCad:
         self.Rsoftfile.write(f"launch_field {self.launch_num}\n")
         self.Rsoftfile.write(f"\tlaunch_pathway = {pathway}\n")
         self.Rsoftfile.write(f"\tlaunch_type = {launch_type}\n")
+        if launch_file is not None:
+            self.Rsoftfile.write(f"\tlaunch_file = {launch_file}\n")
         self.Rsoftfile.write("end launch_field\n\n")
 
         # 第一个 launch 默认写入 symbol 表
@@ -3,20 +3,44 @@
 # 模块功能: 用于读取并分析 RSoft 仿真（.mon）结果
 # 功能概述:
 #   - 自动识别仿真或扫描（Sim / Scan）结果
-#   - 计算 IL / EL / UL / WDL 等性能指标矩阵
+#   - 计算 IL / EL / UL / WDL 等性能指标矩阵（NumPy 数组 (rows, cols, n_out) 上的向量化归约）
+#   - 优化目标 mean 默认为 (ELmax + WDLmax + ULmax) / 3，可由 FOM 表达式替换（见 RsoftFOM）
+#   - 指标保持全精度，仅在写表时保留四位小数
 #   - 输出表格至 txt 文件，生成性能图像 PNG 文件
-# 依赖模块: os, glob, re, math, matplotlib, tabulate
+#   - 惰性模式（lazy=True）: 指标按需计算并缓存，表格与图像仅在调用 report() / plot_all() 时生成
+#   - 增量分析: .mon 最后记录按 (修改时间, 大小) 缓存于 _records.npz，未变化的行复用 _metrics.npz 中上次的指标
+#   - 已打包的研究（原目录不存在，见 RsoftArchive）直接从归档中按成员读取，无需解压
+# 依赖模块: os, re, numpy, matplotlib, tabulate, RsoftMon, RsoftStore, RsoftArchive, RsoftArray, RsoftFOM
 # 作者单位: 中南大学机电工程学院 郑煜教授课题组
 # 撰写作者: 2022届硕士研究生 万强伟
 # 联系方式: 1025459384@qq.com
 # ============================================================
 
 import os
-import glob
 import re
-from math import *
+import numpy as np
+from RsoftMon import *
+from RsoftArchive import study_files, loose_files
+from RsoftStore import *
+from RsoftArray import *
+from RsoftFOM import *
 from tabulate import tabulate
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+# === 功率比转换为损耗 dB（-10log(P)），功率为 0 时为 inf ===
+def loss_db(ratio):
+    with np.errstate(divide="ignore"):
+        return -10 * np.log10(ratio)
+
+
+# === 指标属性 → 计算该属性的方法（惰性模式下首次访问时计算）===
+metric_methods = {f"{name}_matrix": name for name in
+                  ["output", "IL", "EL", "UL", "WDL", "ILmax_n", "ILmax", "ELmax", "ULmax", "WDLmax", "mean"]}
+metric_methods.update({"n_out": "output", "store_rows": "output", "records": "output", "min_mean": "mean", "min_symbol": "mean"})
+
+# === 增量分析中按行复用的指标（顺序即计算顺序，mean 最后）===
+metric_names = ["IL", "EL", "UL", "WDL", "ILmax_n", "ILmax", "ELmax", "ULmax", "WDLmax", "mean"]
+
 
 class RsoftData:
     # ------------------------------------------------------------
@@ -24,12 +48,93 @@ class RsoftData:
     # 功能: 初始化数据对象，识别结果类型、提取性能指标、输出表格与图像
     # 参数:
     #   file_path - 仿真文件（.mon文件）所在路径，通常为仿真目录或 Scan 子目录
+    #               （存在 {file_path}_manifest.jsonl / _store.npz 时按清单索引并从结果存储加载）
+    #   fom       - 品质因数表达式（None 时为默认 mean 定义），结果存入 mean_matrix 并用于选取最优点
+    #   lazy      - True 时只建立索引，指标在首次访问时计算并缓存，结果表格与图像需调用 report() / plot_all() 生成
     # ------------------------------------------------------------
-    def __init__(self, file_path=str):
+    def __init__(self, file_path=str, fom=None, lazy=False):
         self.file_path = file_path
+        self.fom = fom or default_fom
+        self.result_path = self.file_path + "_result.txt"
+        # 文件访问: 磁盘文件或研究归档
+        self.files = study_files(self.file_path)
+
+        # === 构建仿真矩阵: 研究清单 → 结果存储 → .mon 文件名解析（兼容无清单的旧目录） ===
+        self.store = ResultStore(self.file_path)
+        if not (self.store.exists() and len(self.store.load().get("prefix", [])) > 0):
+            self.store = None
+        index = read_manifest(self.file_path)
+        if index is None and self.store is not None:
+            index = self.store.load()
+        if index is not None:
+            self.load_index(index)
+        else:
+            self.prefix_matrix = None
+            self.load_mon()
+
+        if not lazy:
+            self.report()
+            if self.rows * self.cols > 1:
+                self.plot_all()
+
+
+    # === 惰性计算: 指标属性尚不存在时调用对应方法计算（结果保存为属性，之后直接读取）===
+    # 先读取输出功率（增量分析时会同时复用上次分析中未变化行的指标）
+    def __getattr__(self, name):
+        method = metric_methods.get(name)
+        if method is None:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        if "output_matrix" not in self.__dict__:
+            self.output()
+        if name not in self.__dict__:
+            getattr(self, method)()
+        return self.__dict__[name]
+
+
+    # === 写出结果表格 ===
+    # 函数名: report
+    # 功能: 将各性能矩阵与最优点写入 file_path_result.txt（未计算的指标在此时计算）
+    # 参数: 无
+    # 返回:
+    #   result_path : 结果文件路径
+    def report(self):
+        # === 创建输出文件：file_path_result.txt（已打包的研究写在归档旁）===
+        if self.files is not loose_files:
+            os.makedirs(os.path.dirname(os.path.abspath(self.result_path)), exist_ok=True)
+        with open(self.result_path, "w") as self.resultfile:
+            print(f"{self.result_path} 创建成功")
+
+            # === 性能矩阵["output", "IL", "EL", "UL"]写入 ===
+            for name in ["output", "IL", "EL", "UL"]:
+                self.print_matrix(getattr(self, f"{name}_matrix"), name)
+
+            # === 性能矩阵"WDL"写入 ===
+            if self.rows * self.cols > 1:
+                self.print_matrix(self.WDL_matrix, "WDL")
+
+            # === 性能矩阵"ILmax_n"写入 ===
+            self.print_matrix(self.ILmax_n_matrix, "ILmax_n")
+
+            # === 性能矩阵["ILmax", "ELmax", "ULmax", "WDLmax", "mean"]写入 ===
+            if self.rows * self.cols > 1:
+                for name in ["ILmax", "ELmax", "ULmax", "WDLmax", "mean"]:
+                    self.print_matrix(getattr(self, f"{name}_matrix"), name)
+
+                # 找出最优点并写入
+                if self.fom != default_fom:
+                    self.resultfile.write(f"fom={self.fom}\n")
+                self.resultfile.write(f"{self.symbol1}={self.min_symbol},min_mean={round(self.min_mean[0], 4)}\n")
+                self.save_metrics()
+        return self.result_path
 
-        # === 查找所有 .mon 文件（RSoft仿真结果） ===
-        mon_path_list = glob.glob(os.path.join(self.file_path, "*.mon"))
+
+    # === 由 .mon 文件名构建仿真矩阵 ===
+    # 函数名: load_mon
+    # 功能: 遍历目录下 .mon 文件，按 name(value) 文件名解析行列参数
+    # 参数: 无
+    # 返回: 无（结果存入 self.mon_path_matrix / rows / cols 等）
+    def load_mon(self):
+        mon_path_list = self.files.glob(os.path.join(self.file_path, "*.mon"))
 
         if len(mon_path_list) == 1:
             # 仅有一个 .mon 文件 → 单次仿真
@@ -62,38 +167,46 @@ class RsoftData:
                 for i in range(self.rows)
             ]
 
-        # === 创建输出文件：file_path_result.txt ===
-        self.result_path = self.file_path + "_result.txt"
-        open(self.result_path, "w").close()
-        print(f"{self.result_path} 创建成功")
-        self.resultfile = open(self.result_path, "r+")
-
-        # === 性能矩阵["output", "IL", "EL", "UL"]计算并写入 ===
-        matrix_names = ["output", "IL", "EL", "UL"]
-        for name in matrix_names:
-            getattr(self, name)()  # 调用 self.output(), self.IL(), ...
-            self.print_matrix(getattr(self, f"{name}_matrix"), name)
-
-        # === 性能矩阵"WDL"计算并写入 ===
-        if len(mon_path_list) > 1:
-            self.WDL()
-            self.print_matrix(self.WDL_matrix, "WDL")
-
-        # === 性能矩阵"ILmax_n"计算并写入 ===
-        self.ILmax_n()
-        self.print_matrix(self.ILmax_n_matrix, "ILmax_n")
-
-        # === 性能矩阵["ILmax", "ELmax", "ULmax", "WDLmax", "mean"]计算并写入 ===
-        if len(mon_path_list) > 1:
-            matrix_names = ["ILmax", "ELmax", "ULmax", "WDLmax", "mean"]
-            for name in matrix_names:
-                getattr(self, name)()
-                self.print_matrix(getattr(self, f"{name}_matrix"), name)
 
-            # 找出最优点并写入
-            self.resultfile.write(f"{self.symbol1}={self.min_symbol},min_mean={self.min_mean[0]}\n")
-            # 作图并保存
-            self.plot_all()
+    # === 由研究清单（或结果存储）的 前缀 → symbol 取值 构建仿真矩阵 ===
+    # 函数名: load_index
+    # 功能:
+    #   - 最后一个任务 symbol（通常为 wave）为列，其余 symbol 为行，按取值直接索引定位
+    #   - 行 symbol 只有一个时按数值排序；多个时（OEDsim）按前缀顺序编号为 test 1..N
+    # 参数:
+    #   columns : {"prefix", "names", "overrides", "values", "mon"} 列字典
+    # 返回: 无（结果存入 self.prefix_matrix / mon_path_matrix，未提交的位置为 None）
+    def load_index(self, columns):
+        n = len(columns["prefix"])
+        names = [str(name) for name in columns["names"]]
+        if n == 1 or not names:
+            self.rows, self.cols = 1, 1
+            self.row_index = np.zeros((1, 1), dtype=int)
+        else:
+            values = columns["values"]
+            self.symbol2 = names[-1]
+            unique_value2, col = np.unique(values[:, -1], return_inverse=True)
+            if len(names) == 2:
+                self.symbol1 = names[0]
+                unique_value1, row = np.unique(values[:, 0], return_inverse=True)
+            else:
+                self.symbol1 = "test"
+                keys = np.array(["_".join(key) for key in columns["overrides"][:, :-1]])
+                _, key_row = np.unique(keys, return_inverse=True)
+                # 每个参数组合按其首个前缀的字典序编号
+                position = np.empty(n, dtype=int)
+                position[np.argsort(columns["prefix"], kind="stable")] = np.arange(n)
+                first = np.full(key_row.max() + 1, n)
+                np.minimum.at(first, key_row, position)
+                row = np.argsort(np.argsort(first))[key_row]
+                unique_value1 = np.arange(1, len(first) + 1, dtype=float)
+            self.unique_value1, self.unique_value2 = unique_value1.tolist(), unique_value2.tolist()
+            self.rows, self.cols = len(self.unique_value1), len(self.unique_value2)
+            self.row_index = np.full((self.rows, self.cols), -1)
+            self.row_index[row, col] = np.arange(n)
+        self.prefix_matrix = [[str(columns["prefix"][k]) if k >= 0 else None for k in self.row_index[i]] for i in range(self.rows)]
+        self.mon_path_matrix = [[os.path.join(self.file_path, str(columns["mon"][k])) if k >= 0 else None
+                                 for k in self.row_index[i]] for i in range(self.rows)]
 
     # === 返回最小值供optimize输出 ===
     def get_min_symbol(self):
@@ -111,6 +224,8 @@ class RsoftData:
     def print_matrix(self, matrix, matrix_name):
         # 写入矩阵名
         self.resultfile.write(f"{matrix_name}:\n")
+        # 损耗指标仅在输出时保留四位小数（output 为原始功率，不取整）
+        matrix = (np.asarray(matrix) if matrix_name == "output" else np.round(matrix, 4)).tolist()
         rows, cols = len(matrix), len(matrix[0])
 
         # 单点仿真：直接写入一个数
@@ -140,29 +255,131 @@ class RsoftData:
 
     # === 提取每个 .mon 文件的输出功率值 ===
     # 函数名: output
-    # 功能: 提取每个仿真结果文件的最后一行输出值（输出功率），组成二维矩阵
+    # 功能: 提取每个仿真结果文件的最后一行输出值（输出功率），组成 (rows, cols, n_out) 数组
     # 参数: 无
     # 返回: 无（结果存储在 self.output_matrix）
     def output(self):
-        # 初始化 output_matrix 为 rows×cols 空矩阵
-        self.output_matrix = [[None for _ in range(self.cols)] for _ in range(self.rows)]
+        # 各文件最后一条记录的磁盘缓存，只读取新增或修改时间 / 大小变化的 .mon（归档内容不变，由归档对象缓存）
+        self.records = RecordCache(self.file_path + "_records.npz") if self.files is loose_files else self.files
+        if self.prefix_matrix is not None:
+            self.output_matrix = self.indexed_output()
+            self.n_out = self.output_matrix.shape[2]
+        else:
+            output_matrix = [[None for _ in range(self.cols)] for _ in range(self.rows)]
 
-        for i in range(self.rows):
-            for j in range(self.cols):
-                mon_path = self.mon_path_matrix[i][j]
-                with open(mon_path, "r") as file:
-                    # 读取文件最后一行
-                    last_line = None
-                    for line in file:
-                        last_line = line.strip()
+            for i in range(self.rows):
+                for j in range(self.cols):
+                    # 从文件末尾读取最后一行，忽略第一个数字（仿真位置）
+                    output_matrix[i][j] = self.records.record(self.mon_path_matrix[i][j])[1:]
 
-                # 拆分成数字，忽略第一个数字（仿真位置）
-                values = last_line.split()
-                output = [float(value) for value in values[1:]]
+            self.output_matrix = np.array(output_matrix, dtype=float)
+            # 记录输出端口数
+            self.n_out = self.output_matrix.shape[2]
+        self.records.save()
+        self.reuse_metrics()
 
-                # 记录输出端口数
-                self.n_out = len(output)
-                self.output_matrix[i][j] = output
+
+    # === 增量分析: 与上次分析结果（{file_path}_metrics.npz）对比，只重新计算输出功率变化或新增的行 ===
+    # 函数名: reuse_metrics
+    # 功能:
+    #   - 列（wave）、端口数与 FOM 均未变化时，按 symbol1 取值对齐上次的行
+    #   - 输出功率完全相同的行直接复制上次的各指标，其余行在子矩阵上计算后写回
+    # 参数: 无
+    # 返回: 无（各指标矩阵与最优点直接写入属性；无可复用结果时不做处理，由各指标方法按需计算）
+    def reuse_metrics(self):
+        metrics_path = self.file_path + "_metrics.npz"
+        if self.rows * self.cols <= 1 or not self.files.isfile(metrics_path):
+            return
+        previous = self.files.load_npz(metrics_path)
+        if (previous["output"].shape[1:] != self.output_matrix.shape[1:] or str(previous["fom"]) != self.fom
+                or not np.array_equal(previous["unique_value2"], self.unique_value2)):
+            return
+        lookup = {value: k for k, value in enumerate(previous["unique_value1"].tolist())}
+        source = np.array([lookup.get(value, -1) for value in self.unique_value1])
+        same = source >= 0
+        old, new = previous["output"][source[same]], self.output_matrix[same]
+        same[same] = ((old == new) | (np.isnan(old) & np.isnan(new))).all(axis=(1, 2))
+
+        changed = np.nonzero(~same)[0]
+        view = self.metric_view(changed) if len(changed) else None
+        for name in metric_names:
+            matrix = np.empty((self.rows,) + previous[name].shape[1:])
+            matrix[same] = previous[name][source[same]]
+            if view is not None:
+                matrix[changed] = getattr(view, f"{name}_matrix")
+            setattr(self, f"{name}_matrix", matrix)
+        self.select_best()
+
+
+    # === 在部分行上计算全部指标（增量分析用）===
+    def metric_view(self, rows):
+        view = RsoftData.__new__(RsoftData)
+        view.__dict__.update(output_matrix=self.output_matrix[rows], rows=len(rows), cols=self.cols, n_out=self.n_out,
+                             symbol1=self.symbol1, symbol2=self.symbol2, fom=self.fom,
+                             unique_value1=[self.unique_value1[i] for i in rows], unique_value2=self.unique_value2)
+        for name in metric_names[:-1]:
+            getattr(view, name)()
+        view.mean_matrix = evaluate_fom(view.fom, view.fom_namespace(), view.output_matrix.shape)
+        return view
+
+
+    # === 保存本次分析结果，供下次增量分析（已打包的研究不再变化，不保存）===
+    def save_metrics(self):
+        if self.files is not loose_files:
+            return
+        metrics = {name: getattr(self, f"{name}_matrix") for name in metric_names}
+        temp_path = self.file_path + "_metrics.tmp.npz"
+        np.savez(temp_path, output=self.output_matrix, fom=np.array(self.fom), unique_value1=np.array(self.unique_value1, dtype=float),
+                 unique_value2=np.array(self.unique_value2, dtype=float), **metrics)
+        os.replace(temp_path, self.file_path + "_metrics.npz")
+
+
+    # === 按前缀取各仿真点输出功率: 结果存储中已有的直接取出，其余读取已存在的 .mon，尚未完成的为 nan ===
+    def indexed_output(self):
+        store_rows = np.full((self.rows, self.cols), -1)
+        power = np.zeros((0, 0))
+        if self.store is not None:
+            columns = self.store.load()
+            lookup = {str(prefix): k for k, prefix in enumerate(columns["prefix"])}
+            store_rows = np.array([[lookup.get(prefix, -1) for prefix in row] for row in self.prefix_matrix])
+            power = columns["power"]
+        pending = {}
+        for i, j in zip(*np.nonzero(store_rows < 0)):
+            mon_path = self.mon_path_matrix[i][j]
+            if mon_path is not None and self.files.isfile(mon_path):
+                pending[i, j] = self.records.record(mon_path)[1:]
+        n_out = max([power.shape[1]] + [len(values) for values in pending.values()])
+        output_matrix = np.full((self.rows, self.cols, n_out), np.nan)
+        found = store_rows >= 0
+        output_matrix[found, :power.shape[1]] = power[store_rows[found]]
+        for (i, j), values in pending.items():
+            output_matrix[i, j, :len(values)] = values
+        self.store_rows = store_rows
+        return output_matrix
+
+
+    # === 读取某个仿真点的完整功率曲线 ===
+    # 函数名: trace
+    # 功能: 返回第 i 行、第 j 列仿真点的功率随传播距离变化（用于功率-z 作图、收敛检查）
+    # 参数:
+    #   i, j : 行（symbol1）与列（symbol2）索引
+    # 返回:
+    #   z (nz,), power (nz, n_out)
+    def trace(self, i=0, j=0):
+        if self.prefix_matrix is not None and self.store_rows[i, j] >= 0:
+            trace = self.store.trace(self.store_rows[i, j])
+        else:
+            trace = self.files.read_trace(self.mon_path_matrix[i][j])
+        return trace[:, 0], trace[:, 1:]
+
+
+    # === 以带轴名的 N 维数组返回本研究结果（见 RsoftArray.load_study）===
+    # 参数:
+    #   traces : True 时返回完整功率曲线（memmap）
+    # 返回:
+    #   LabeledArray
+    def labeled(self, traces=False):
+        return load_study(self.file_path, traces)
 
 
     # === 计算插入损耗 IL（-10log(P)) ===
@@ -171,15 +388,8 @@ class RsoftData:
     # 参数: 无
     # 返回: 无（结果存储在 self.IL_matrix）
     def IL(self):
-        self.IL_matrix = [[None for _ in range(self.cols)] for _ in range(self.rows)]
-
-        for i in range(self.rows):
-            for j in range(self.cols):
-                IL = [None for _ in range(self.n_out)]
-                for n in range(self.n_out):
-                    # IL = -10 * log10(Pout)
-                    IL[n] = round(-10 * log10(self.output_matrix[i][j][n]), 4)
-                self.IL_matrix[i][j] = IL
+        # IL = -10 * log10(Pout)，逐端口
+        self.IL_matrix = loss_db(self.output_matrix)
 
 
     # === 计算每点仿真的最大插入损耗 ILmax_n（每个仿真点多个输出端口中的最大值）===
@@ -188,12 +398,8 @@ class RsoftData:
     # 参数: 无
     # 返回: 无（结果存入 self.ILmax_n_matrix）
     def ILmax_n(self):
-        self.ILmax_n_matrix = [[None for _ in range(self.cols)] for _ in range(self.rows)]
-        for i in range(self.rows):
-            for j in range(self.cols):
-                # 提取当前点所有输出端口的 IL，计算其最大值
-                ILmax_n = round(max(self.IL_matrix[i][j]), 4)
-                self.ILmax_n_matrix[i][j] = ILmax_n
+        # 每个仿真点所有输出端口 IL 的最大值
+        self.ILmax_n_matrix = self.IL_matrix.max(axis=2)
 
 
     # === 计算每行（wave）下的最大 ILmax 值 ===
@@ -202,11 +408,8 @@ class RsoftData:
     # 参数: 无
     # 返回: 无（结果存入 self.ILmax_matrix）
     def ILmax(self):
-        self.ILmax_matrix = [[None for _ in range(1)] for _ in range(self.rows)]
-        for i in range(self.rows):
-            # 每行中最大 ILmax_n 值
-            ILmax = round(max(self.ILmax_n_matrix[i]), 4)
-            self.ILmax_matrix[i][0] = ILmax
+        # 每行中最大 ILmax_n 值
+        self.ILmax_matrix = self.ILmax_n_matrix.max(axis=1, keepdims=True)
 
     # === 计算总损耗 EL（-10log(ΣP)) ===
     # 函数名: EL
@@ -214,12 +417,8 @@ class RsoftData:
     # 参数: 无
     # 返回: 无（结果存储在 self.EL_matrix）
     def EL(self):
-        self.EL_matrix = [[None for _ in range(self.cols)] for _ in range(self.rows)]
-
-        for i in range(self.rows):
-            for j in range(self.cols):
-                # EL = -10 * log10(ΣPout)
-                self.EL_matrix[i][j] = round(-10 * log10(sum(self.output_matrix[i][j])), 4)
+        # EL = -10 * log10(ΣPout)
+        self.EL_matrix = loss_db(self.output_matrix.sum(axis=2))
 
 
     # === 计算每行的最大总损耗 ELmax ===
@@ -230,15 +429,8 @@ class RsoftData:
     # 参数: 无
     # 返回: 无（结果存入 self.ELmax_matrix，尺寸为 rows × 1）
     def ELmax(self):
-        # 初始化 ELmax_matrix：行为参数 symbol1，列为 1
-        self.ELmax_matrix = [[None for _ in range(1)] for _ in range(self.rows)]
-
-        for i in range(self.rows):
-            for j in range(1):
-                # 提取该行所有波长下的 EL 值（如 EL[i][0], EL[i][1], ...）
-                ELmax = round(max(self.EL_matrix[i]), 4)  # 保留四位有效数字
-                self.ELmax_matrix[i][j] = ELmax
-
+        # 该行所有波长下 EL 的最大值
+        self.ELmax_matrix = self.EL_matrix.max(axis=1, keepdims=True)
 
 
     # === 计算不均匀性损耗 UL（-10log(min/max)) ===
@@ -247,14 +439,8 @@ class RsoftData:
     # 参数: 无
     # 返回: 无（结果存储在 self.UL_matrix）
     def UL(self):
-        self.UL_matrix = [[None for _ in range(self.cols)] for _ in range(self.rows)]
-
-        for i in range(self.rows):
-            for j in range(self.cols):
-                # UL = -10 * log10(min(P) / max(P))
-                Pmin = min(self.output_matrix[i][j])
-                Pmax = max(self.output_matrix[i][j])
-                self.UL_matrix[i][j] = round(-10 * log10(Pmin / Pmax), 4)
+        # UL = -10 * log10(min(P) / max(P))，在端口维上归约
+        self.UL_matrix = loss_db(self.output_matrix.min(axis=2) / self.output_matrix.max(axis=2))
 
 
     # === 计算每行（一个参数设置）下的最大 UL 值 ===
@@ -263,10 +449,7 @@ class RsoftData:
     # 参数: 无
     # 返回: 无（结果存入 self.ULmax_matrix）
     def ULmax(self):
-        self.ULmax_matrix = [[None for _ in range(1)] for _ in range(self.rows)]
-        for i in range(self.rows):
-            ULmax = round(max(self.UL_matrix[i]), 4)
-            self.ULmax_matrix[i][0] = ULmax
+        self.ULmax_matrix = self.UL_matrix.max(axis=1, keepdims=True)
 
 
     # === 计算波长依赖损耗 WDL（每个输出端口）===
@@ -275,16 +458,8 @@ class RsoftData:
     # 参数: 无
     # 返回: 无（结果存入 self.WDL_matrix）
     def WDL(self):
-        self.WDL_matrix = [[None for _ in range(self.n_out)] for _ in range(self.rows)]
-        n_output = [None for _ in range(self.cols)]
-
-        for i in range(self.rows):
-            for n in range(self.n_out):
-                # 提取每列的相同端口输出值（不同波长）
-                for j in range(self.cols):
-                    n_output[j] = self.output_matrix[i][j][n]
-                # WDL = -10 * log10(Pmin / Pmax)
-                self.WDL_matrix[i][n] = round(-10 * log10(min(n_output) / max(n_output)), 4)
+        # WDL = -10 * log10(Pmin / Pmax)，在波长维上归约，结果为 rows × n_out
+        self.WDL_matrix = loss_db(self.output_matrix.min(axis=1) / self.output_matrix.max(axis=1))
 
 
     # === 计算每行的最大波长相关损耗 WDLmax ===
@@ -293,13 +468,10 @@ class RsoftData:
     # 参数: 无
     # 返回: 无（结果存入 self.WDLmax_matrix）
     def WDLmax(self):
-        self.WDLmax_matrix = [[None for _ in range(1)] for _ in range(self.rows)]
-        for i in range(self.rows):
-            WDLmax = round(max(self.WDL_matrix[i]), 4)
-            self.WDLmax_matrix[i][0] = WDLmax
+        self.WDLmax_matrix = self.WDL_matrix.max(axis=1, keepdims=True)
 
 
-    # === 计算平均性能指标 mean = (ELmax + ULmax + WDLmax) / 3 ===
+    # === 计算平均性能指标 mean = (ELmax + ULmax + WDLmax) / 3（或自定义 FOM 表达式）===
     # 函数名: mean
     # 功能:
     #   - 综合评估某参数设置下的性能
@@ -307,22 +479,51 @@ class RsoftData:
     # 参数: 无
     # 返回: 无（结果存入 self.mean_matrix）
     def mean(self):
-        self.mean_matrix = [[None for _ in range(1)] for _ in range(self.rows)]
-        for i in range(self.rows):
-            # 取三项性能指标平均值
-            mean = round(
-                (self.ELmax_matrix[i][0] + self.WDLmax_matrix[i][0] + self.ULmax_matrix[i][0]) / 3, 4
-            )
-            self.mean_matrix[i][0] = mean
+        # 默认取三项性能指标平均值，自定义 FOM 时按表达式计算（wave 与端口上取最坏情况）
+        self.mean_matrix = evaluate_fom(self.fom, self.fom_namespace(), self.output_matrix.shape)
+        self.select_best()
+
 
+    # === 按 mean 选出最优点 ===
+    # 函数名: select_best
+    # 参数: 无
+    # 返回: 无（结果存入 self.min_mean / self.min_symbol）
+    def select_best(self):
         # 找出最小 mean 值
-        self.min_mean = min(self.mean_matrix)
-        min_index = self.mean_matrix.index(self.min_mean)
+        # 未完成的仿真点 mean 为 nan，不参与比较
+        min_index = int(np.nanargmin(self.mean_matrix[:, 0]))
+        self.min_mean = [float(self.mean_matrix[min_index, 0])]
         # 记录对应 symbol1 参数值（用于优化结果输出）
         self.min_symbol = self.unique_value1[min_index]
 
 
 
+    # === FOM 表达式可用的变量（均为 (rows, cols, n_out) 可广播数组）===
+    # 函数名: fom_namespace
+    # 返回:
+    #   namespace : {变量名: 数组}，变量说明见 RsoftFOM
+    def fom_namespace(self):
+        namespace = {
+            "P": self.output_matrix,
+            "IL": self.IL_matrix,
+            "ILmax_n": self.ILmax_n_matrix[:, :, None],
+            "EL": self.EL_matrix[:, :, None],
+            "UL": self.UL_matrix[:, :, None],
+            "WDL": self.WDL_matrix[:, None, :],
+            "ILmax": self.ILmax_matrix[:, :, None],
+            "ELmax": self.ELmax_matrix[:, :, None],
+            "ULmax": self.ULmax_matrix[:, :, None],
+            "WDLmax": self.WDLmax_matrix[:, :, None],
+            "wave": np.array(self.unique_value2, dtype=float)[None, :, None],
+            "port": np.arange(1, self.n_out + 1)[None, None, :],
+        }
+        # symbol1 / symbol2 取值也可按名称引用（如 "ELmax + 0.001 * Lta"）
+        for symbol, values, shape in ((self.symbol1, self.unique_value1, (-1, 1, 1)), (self.symbol2, self.unique_value2, (1, -1, 1))):
+            if symbol.isidentifier() and symbol not in namespace and symbol not in fom_functions:
+                namespace[symbol] = np.array(values, dtype=float).reshape(shape)
+        return namespace
+
+
     # === 绘图：性能 vs 扫描参数 ===
     # 函数名: plot_symbol_vs_wave
     # 功能: 对 EL / UL / ILmax_n / WDL 等性能在不同参数或波长下的趋势进行可视化
@@ -406,10 +607,15 @@ class RsoftData:
     # === 总览绘图 ===
     # 函数名: plot_all
     # 功能: 输出所有重要指标的变化趋势图，共6幅子图（2×3）生成 2x3 大图，按照 1 2 5 | 3 4 6 的顺序
-    # 参数: 无
-    # 返回: 无
-    def plot_all(self):
-        fig, axes = plt.subplots(2, 3, figsize=(24, 12))
+    #       （直接使用 Figure 对象而非 pyplot，保存后释放，不在全局图像列表中累积，可在后台线程 / 进程中调用）
+    # 参数:
+    #   dpi       : 分辨率（默认 600；预览图见 RsoftPlot）
+    #   save_path : 图像路径（默认 file_path_result.png）
+    # 返回:
+    #   save_path
+    def plot_all(self, dpi=600, save_path=None):
+        fig = Figure(figsize=(24, 12))
+        axes = fig.subplots(2, 3)
         self.plot_symbol_vs_wave(axes[0, 0], "ILmax_n", self.ILmax_n_matrix)
         self.plot_symbol_vs_wave(axes[0, 1], "EL", self.EL_matrix)
         self.plot_symbol_vs_wave(axes[1, 0], "UL", self.UL_matrix)
@@ -417,7 +623,18 @@ class RsoftData:
         self.plot_ILmax(axes[0, 2])       # 单独的 ILmax 曲线
         self.plot_maxmatrix(axes[1, 2])   # 所有 max 指标对比
 
-        plt.tight_layout()
-        save_path = self.file_path + "_result.png"
-        plt.savefig(save_path, dpi=600, bbox_inches="tight")
+        fig.tight_layout()
+        save_path = save_path or self.file_path + "_result.png"
+        fig.savefig(save_path, dpi=dpi, bbox_inches="tight")
+        fig.clear()
         print(f"性能图像已保存到: {save_path}")
+        return save_path
+
+
+    # === 作图所需数据的轻量副本（仅含坐标与指标矩阵，可序列化后交给绘图进程）===
+    def plot_view(self):
+        view = RsoftData.__new__(RsoftData)
+        names = ["file_path", "symbol1", "unique_value1", "unique_value2"] + \
+                [f"{name}_matrix" for name in ["ILmax_n", "EL", "UL", "WDL", "ILmax", "ELmax", "ULmax", "WDLmax", "mean"]]
+        view.__dict__.update({name: getattr(self, name) for name in names})
+        return view
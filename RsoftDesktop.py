@@ -0,0 +1,185 @@
+# ============================================================
+# 文件名称: RsoftDesktop.py
+# 模块功能: 求解器运行期间的桌面交互后端（RSoft 窗口最小化、许可证 Query 弹窗处理）
+# 功能概述:
+#   - HeadlessDesktop: 无操作后端，用于离线求解器（RsoftBPM）、Linux 与无人值守的批量运行
+#   - WindowsDesktop : 每个调度器一个共享的监视线程，通过 WinEvent 钩子在窗口出现时立即处理
+#                      （无需每个任务各自轮询 FindWindow，也无需等待固定时间后再最小化）
+#   - 钩子不可用时退化为同一线程内按间隔枚举窗口，线程数仍保持为 1
+#   - make_desktop: 按求解器与运行环境自动选择后端
+# 依赖模块: os, threading, ctypes, win32gui / win32con / pyautogui（仅 WindowsDesktop）
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import threading
+import ctypes
+
+# 窗口控制依赖仅在 Windows + RSoft 环境可用，离线求解器（如 RsoftBPM）不需要
+try:
+    import win32gui
+    import win32con
+    import pyautogui
+except ImportError:
+    win32gui = win32con = pyautogui = None
+
+# === WinEvent 常量 ===
+EVENT_OBJECT_SHOW = 0x8002
+EVENT_OBJECT_NAMECHANGE = 0x800C
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+OBJID_WINDOW = 0
+WM_QUIT = 0x0012
+
+
+# ============================================================
+# 类名: HeadlessDesktop
+# 功能: 无操作后端（不创建线程，不访问窗口）
+# ============================================================
+class HeadlessDesktop:
+    # === 任务启动前调用 ===
+    def job_started(self):
+        pass
+
+    # === 调度器结束时调用 ===
+    def close(self):
+        pass
+
+
+# ============================================================
+# 类名: WindowsDesktop
+# 功能: 共享的 RSoft 窗口监视线程（首个任务启动时创建，close 后下一个任务会重新创建）
+# 属性:
+#   minimize      - 是否最小化标题包含 minimize_title 的仿真窗口
+#   query_title   - 许可证弹窗标题（完整匹配）
+#   query_click   - 弹窗内“否”按钮相对窗口左上角的坐标
+#   interval      - 钩子不可用时枚举窗口的间隔（秒）
+#   clicked / minimized - 已处理的弹窗数与窗口数
+# ============================================================
+class WindowsDesktop:
+    def __init__(self, minimize=True, minimize_title="Computation", query_title="Query", query_click=(410, 523), interval=2.0):
+        self.minimize = minimize
+        self.minimize_title = minimize_title
+        self.query_title = query_title
+        self.query_click = query_click
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.thread = None
+        self.thread_id = None
+        self.ready = threading.Event()
+        self.stopped = threading.Event()
+        self.clicked = 0
+        self.minimized = 0
+
+    # === 任务启动前调用: 确保监视线程已运行且钩子已安装（之后出现的窗口都能收到事件）===
+    def job_started(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.ready.clear()
+                self.stopped.clear()
+                self.thread = threading.Thread(target=self.watch, daemon=True)
+                self.thread.start()
+        self.ready.wait()
+
+    # === 停止监视线程 ===
+    def close(self):
+        with self.lock:
+            thread, self.thread = self.thread, None
+        if thread is None:
+            return
+        self.stopped.set()
+        if self.thread_id is not None:
+            ctypes.windll.user32.PostThreadMessageW(self.thread_id, WM_QUIT, 0, 0)
+        thread.join()
+
+    # === 处理一个窗口（出错时只打印，不中断监视线程）===
+    def safe_handle(self, hwnd):
+        try:
+            self.handle(hwnd)
+        except Exception as e:
+            print(f"窗口处理失败: {e}")
+        return True
+
+    # === 处理一个窗口: Query 弹窗点击“否”，仿真窗口最小化 ===
+    def handle(self, hwnd):
+        if not win32gui.IsWindowVisible(hwnd):
+            return
+        title = win32gui.GetWindowText(hwnd)
+        if title == self.query_title:
+            # 获取窗口左上角坐标
+            left, top, _, _ = win32gui.GetWindowRect(hwnd)
+            abs_x, abs_y = left + self.query_click[0], top + self.query_click[1]
+            pyautogui.moveTo(abs_x, abs_y)
+            pyautogui.click()
+            self.clicked += 1
+            print(f"点击窗口 '{title}' 内相对坐标 {self.query_click} 的‘否’，屏幕坐标 ({abs_x}, {abs_y})")
+        elif self.minimize and self.minimize_title in title and not win32gui.IsIconic(hwnd):
+            win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
+            self.minimized += 1
+
+    # === 枚举全部顶层窗口（启动时处理已存在的窗口，钩子不可用时定期调用）===
+    def sweep(self):
+        win32gui.EnumWindows(lambda hwnd, _: self.safe_handle(hwnd), None)
+
+    # === 监视线程: 安装 WinEvent 钩子并运行消息循环 ===
+    def watch(self):
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        self.thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        procedure_type = ctypes.WINFUNCTYPE(None, ctypes.c_void_p, ctypes.c_ulong, ctypes.c_void_p, ctypes.c_long,
+                                            ctypes.c_long, ctypes.c_ulong, ctypes.c_ulong)
+
+        def on_event(hook, event, hwnd, id_object, id_child, thread, timestamp):
+            if hwnd and id_object == OBJID_WINDOW:
+                self.safe_handle(hwnd)
+
+        # 回调对象须在钩子存续期间保持引用
+        procedure = procedure_type(on_event)
+        flags = WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+        events = (EVENT_OBJECT_SHOW, EVENT_OBJECT_NAMECHANGE)
+        # 钩子安装或首次枚举出错时不结束监视线程（否则每个新任务都会重启线程），改为定期枚举
+        hooks = []
+        try:
+            for event in events:
+                hooks.append(user32.SetWinEventHook(event, event, 0, procedure, 0, 0, flags))
+            self.sweep()
+        except Exception as error:
+            print(f"窗口监视初始化失败: {error}")
+        finally:
+            # 无论钩子是否安装成功都放行等待中的任务
+            self.ready.set()
+
+        if len(hooks) == len(events) and all(hooks):
+            message = wintypes.MSG()
+            while user32.GetMessageW(ctypes.byref(message), 0, 0, 0) > 0:
+                user32.TranslateMessage(ctypes.byref(message))
+                user32.DispatchMessageW(ctypes.byref(message))
+        else:
+            print("WinEvent 钩子不可用，改为定期枚举窗口")
+            while not self.stopped.wait(self.interval):
+                self.sweep()
+        for hook in hooks:
+            if hook:
+                user32.UnhookWinEvent(hook)
+        self.thread_id = None
+
+
+# === 按求解器与运行环境选择桌面交互后端 ===
+# 函数名: make_desktop
+# 参数:
+#   desktop  : "auto" / "headless" / "windows"，或已创建的后端对象
+#   solver   : 求解器命令（只有 bsimw32 会创建 RSoft 窗口）
+#   minimize : 是否最小化仿真窗口
+# 返回:
+#   backend  : 具有 job_started() 与 close() 方法的后端对象
+def make_desktop(desktop="auto", solver="bsimw32", minimize=True):
+    if not isinstance(desktop, str):
+        return desktop
+    if desktop == "auto":
+        desktop = "windows" if solver == "bsimw32" and os.name == "nt" and win32gui is not None else "headless"
+    if desktop == "windows":
+        return WindowsDesktop(minimize=minimize)
+    if desktop == "headless":
+        return HeadlessDesktop()
+    raise ValueError(f"unknown desktop backend: {desktop}")
@@ -0,0 +1,186 @@
+# ============================================================
+# 文件名称: RsoftEIM.py
+# 模块功能: 三维设计的有效折射率法（EIM）降维，生成二维伴随 .ind 文件用于快速预筛
+# 功能概述:
+#   - 对每种波导高度 / 芯层折射率求解垂直方向对称平板波导的基模有效折射率
+#   - 平板求解对波长向量化（二分法解色散方程），结果按截面参数缓存
+#   - 写出 dimension = 2 的伴随文件，保留全部 symbol，芯层折射率差替换为 delta_eim{k}
+#   - 为每个仿真任务按其 symbol 覆盖值计算对应的 delta_eim{k}（供 RsoftSimulation 追加到命令）
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import re
+import numpy as np
+from RsoftInd import *
+
+
+# === 对称平板波导导模有效折射率（对所有输入广播向量化）===
+# 函数名: slab_neff
+# 功能: 二分法求解 u·tan(u - mπ/2) = r·w，u² + w² = V²，r = 1 (TE) 或 ncore²/nclad² (TM)
+# 参数:
+#   n_core, n_clad : 芯层 / 包层折射率（标量或数组）
+#   thickness      : 芯层厚度（µm）
+#   wave           : 自由空间波长（µm）
+#   order          : 模式阶数（0 为基模）
+#   pol            : "TE" 或 "TM"
+# 返回:
+#   neff           : 有效折射率数组，截止的模式为 nan
+def slab_neff(n_core, n_clad, thickness, wave, order=0, pol="TE", iterations=60):
+    n_core, n_clad, thickness, wave = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (n_core, n_clad, thickness, wave)))
+    k0a = np.pi * thickness / wave
+    V = k0a * np.sqrt(n_core ** 2 - n_clad ** 2)
+    ratio = np.ones_like(V) if pol == "TE" else n_core ** 2 / n_clad ** 2
+
+    lo = np.full_like(V, order * np.pi / 2)
+    hi = np.minimum(lo + np.pi / 2 * (1 - 1e-12), V)
+    guided = V > lo
+    for _ in range(iterations):
+        u = (lo + hi) / 2
+        f = u * np.tan(u - order * np.pi / 2) - ratio * np.sqrt(np.maximum(V ** 2 - u ** 2, 0))
+        lo = np.where(f < 0, u, lo)
+        hi = np.where(f < 0, hi, u)
+    u = (lo + hi) / 2
+    neff = np.sqrt(n_core ** 2 - (u / k0a) ** 2)
+    return np.where(guided, neff, np.nan)
+
+
+# === 平板有效折射率缓存 {(n_core, n_clad, thickness, wave): neff} ===
+slab_cache = {}
+
+def slab_key(n_core, n_clad, thickness, wave):
+    return (round(float(n_core), 12), round(float(n_clad), 12), round(float(thickness), 9), round(float(wave), 9))
+
+
+# === 批量求解并写入缓存（只求解缓存中缺失的截面）===
+# 函数名: slab_table
+# 参数:
+#   n_core, n_clad, thickness, wave : 等长一维数组（或可广播的标量）
+# 返回:
+#   neff : 与输入等长的有效折射率数组
+def slab_table(n_core, n_clad, thickness, wave):
+    n_core, n_clad, thickness, wave = (np.ravel(v) for v in np.broadcast_arrays(n_core, n_clad, thickness, wave))
+    keys = [slab_key(*params) for params in zip(n_core, n_clad, thickness, wave)]
+    missing = [i for i, key in enumerate(keys) if key not in slab_cache]
+    if missing:
+        solved = slab_neff(n_core[missing], n_clad[missing], thickness[missing], wave[missing])
+        for i, neff in zip(missing, solved):
+            slab_cache[keys[i]] = float(neff)
+    return np.array([slab_cache[key] for key in keys])
+
+
+# ============================================================
+# 类名: RsoftEIM
+# 功能: 由三维 .ind 生成二维有效折射率伴随文件，并为仿真任务提供 delta_eim 覆盖值
+# 伴随文件约定:
+#   delta_3d      - 原三维 delta 表达式
+#   eim_height{k} - 第 k 组截面的高度表达式
+#   eim_core{k}   - 第 k 组截面的芯层折射率差表达式（相对 background_index）
+#   delta_eim{k}  - 第 k 组的二维折射率差（平板 neff - background_index）
+# ============================================================
+class RsoftEIM:
+    # ------------------------------------------------------------
+    # 构造函数: __init__
+    # 参数:
+    #   ind_file  - 三维 .ind 文件路径
+    #   wave_list - 需要预先批量求解的波长列表（可选）
+    # ------------------------------------------------------------
+    def __init__(self, ind_file=str, wave_list=None):
+        self.ind_file = ind_file
+        self.file_2d = os.path.splitext(ind_file)[0] + "_2d.ind"
+        ind = load_ind(ind_file)
+        if ind.dimension != 3:
+            raise ValueError(f"{ind_file} is not a 3D design")
+        self.write_2d(ind)
+        print(f"{self.file_2d}创建成功")
+        if wave_list is not None:
+            self.prepare(wave_list)
+
+    # === 写出二维伴随文件 ===
+    def write_2d(self, ind):
+        # 按 (高度表达式, 芯层折射率差表达式) 分组，begin / end 分别归组
+        groups = OrderedDict()
+        segment_groups = {}
+        for segment in ind.segments:
+            begin_height = segment.get("begin.height", "height")
+            begin_delta = segment.get("begin.delta", "delta")
+            ends = [(begin_height, begin_delta),
+                    (segment.get("end.height", begin_height), segment.get("end.delta", begin_delta))]
+            segment_groups[segment["number"]] = [groups.setdefault(end, len(groups) + 1) for end in ends]
+        if not groups:
+            groups[("height", "delta")] = 1
+        self.groups = len(groups)
+
+        with open(self.ind_file, "r") as f:
+            lines = f.read().splitlines()
+
+        reference = ind.evaluate()
+        output = []
+        stack = []  # 当前所在块，顶层为空
+        for line in lines:
+            text = line.strip()
+            key = text.split("=", 1)[0].strip() if "=" in text else None
+            if not stack and key == "dimension":
+                output.append("dimension = 2")
+            elif not stack and key == "delta":
+                delta_expr = text.split("=", 1)[1].strip()
+                output.append(f"delta_3d = {delta_expr}")
+                for (height_expr, delta_3d_expr), k in groups.items():
+                    # 伴随文件中 delta 已被替换，芯层表达式改为引用 delta_3d
+                    core_expr = re.sub(r"(?<![.$\w])delta(?!\w)", "delta_3d", delta_3d_expr)
+                    neff = slab_table(reference["background_index"] + reference.value(delta_3d_expr), reference["background_index"],
+                                      reference.value(height_expr), reference["free_space_wavelength"])[0]
+                    output.append(f"eim_height{k} = {height_expr}")
+                    output.append(f"eim_core{k} = {core_expr}")
+                    output.append(f"delta_eim{k} = {round(float(neff - reference['background_index']), 10)}")
+                output.append("delta = delta_eim1" if self.groups == 1 else f"delta = {delta_expr}")
+            elif stack and stack[-1] == "segment" and key in ("begin.delta", "end.delta") and self.groups > 1:
+                continue
+            else:
+                output.append(line)
+                if text.split(" ")[0] == "end":
+                    stack.pop()
+                elif text and "=" not in text and not (stack and stack[-1] == "pathway"):
+                    stack.append(text.split()[0])
+                    if re.match(r"segment \d+$", text) and self.groups > 1:
+                        begin_group, end_group = segment_groups[int(text.split()[1])]
+                        output.append(f"\tbegin.delta = delta_eim{begin_group}")
+                        output.append(f"\tend.delta = delta_eim{end_group}")
+
+        with open(self.file_2d, "w") as f:
+            f.write("\n".join(output) + "\n")
+
+    # === 对波长列表批量预求解（默认 symbol 下的全部截面组）===
+    # 函数名: prepare
+    # 参数:
+    #   wave_list - 波长列表
+    # 返回: 无（结果写入 slab_cache）
+    def prepare(self, wave_list):
+        ind = load_ind(self.file_2d)
+        params = []
+        for wave in wave_list:
+            table = ind.evaluate({"wave": wave})
+            n_clad = table["background_index"]
+            for k in range(1, self.groups + 1):
+                params.append((n_clad + table[f"eim_core{k}"], n_clad, table[f"eim_height{k}"], table["free_space_wavelength"]))
+        slab_table(*(np.array(column) for column in zip(*params)))
+
+    # === 为一个仿真任务计算 delta_eim 覆盖值 ===
+    # 函数名: overrides
+    # 参数:
+    #   ind_file      - 任务使用的 ind 文件（非 EIM 伴随文件时返回空字典）
+    #   symbol_values - {symbol: value} 任务参数
+    # 返回:
+    #   {"delta_eim1": .., ...}
+    def overrides(self, ind_file, symbol_values):
+        ind = load_ind(ind_file)
+        if "delta_3d" not in ind.symbols:
+            return {}
+        table = ind.evaluate(symbol_values)
+        n_clad = table["background_index"]
+        groups = [int(name[len("eim_height"):]) for name in ind.symbols if name.startswith("eim_height")]
+        n_core = [n_clad + table[f"eim_core{k}"] for k in groups]
+        thickness = [table[f"eim_height{k}"] for k in groups]
+        neff = slab_table(np.array(n_core), n_clad, np.array(thickness), table["free_space_wavelength"])
+        return {f"delta_eim{k}": round(float(value - n_clad), 10) for k, value in zip(groups, neff)}
@@ -0,0 +1,146 @@
+# ============================================================
+# 文件名称: RsoftFOM.py
+# 模块功能: 用户自定义品质因数（FOM）表达式，编译为 NumPy 向量化计算
+# 功能概述:
+#   - 表达式为受限的 Python 算术表达式，只允许白名单中的变量、函数与运算符
+#   - 按表达式文本缓存编译结果，同一表达式只解析、编译一次
+#   - 变量均为 (rows, cols, n_out) 可广播数组: 轴 0 为 symbol1，轴 1 为 wave（symbol2），轴 2 为输出端口
+#   - 表达式结果在 wave 与端口轴上取最大值（最坏情况），得到每行一个 FOM 值，越小越好
+# 可用变量（由 RsoftData.fom_namespace 提供）:
+#   P                      各端口输出功率 (rows, cols, n_out)
+#   IL / ILmax_n           各端口插入损耗 / 各点端口最大 IL
+#   EL / UL                各点总损耗 / 不均匀性损耗
+#   WDL                    各端口波长相关损耗 (rows, 1, n_out)
+#   ILmax ELmax ULmax WDLmax  每行最大值（即 RsoftData 的同名矩阵）
+#   wave / port            列坐标（symbol2 取值）/ 端口编号 1..n_out；symbol1、symbol2 名称本身也可作变量
+# 可用函数:
+#   max / min / mean / sum (x, "wave" | "port" ...)   按轴名归约（省略轴名时两轴均归约），保留维度
+#   db(ratio)               -10log10(ratio)
+#   penalty(x, limit)       超出 limit 的部分（未超出为 0）
+#   where / maximum / minimum / clip / abs / sqrt / exp / log10
+#   x[n]                    取第 n 个端口（从 1 开始），如 P[1] / P[2]
+# 示例:
+#   "(ELmax + WDLmax + ULmax) / 3"                    默认，与原 mean 指标一致
+#   "max(IL * where(port == 1, 2, 1), 'port')"        端口 1 加权的插入损耗
+#   "ELmax + 10 * penalty(ULmax, 0.5)"                不均匀性超过 0.5 dB 时加罚
+#   "max(db(P[1] / P[2]))"                            波段内两端口功率比最坏值
+# 依赖模块: ast, numpy
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import ast
+import numpy as np
+
+# === 默认 FOM: RsoftData 原 mean 指标 ===
+default_fom = "(ELmax + WDLmax + ULmax) / 3"
+
+# === 编译缓存 {表达式文本: 编译结果} ===
+fom_cache = {}
+
+# 可归约的轴名 → (rows, cols, n_out) 中的轴号
+fom_axes = {"wave": 1, "port": 2}
+
+
+def reducer(func):
+    def reduce(x, *names):
+        for name in names:
+            if name not in fom_axes:
+                raise ValueError(f"Unknown FOM axis '{name}', available axes: {list(fom_axes)}")
+        axes = tuple(fom_axes[name] for name in names) or (1, 2)
+        x = np.asarray(x, dtype=float)
+        return func(x.reshape((1,) * (3 - x.ndim) + x.shape), axis=axes, keepdims=True)
+    return reduce
+
+
+def loss(ratio):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return -10 * np.log10(ratio)
+
+
+# === 取第 n 个端口（从 1 开始），保留端口轴 ===
+def port_of(x, n):
+    return np.asarray(x)[..., n - 1:n]
+
+
+fom_functions = {
+    "max": reducer(np.max),
+    "min": reducer(np.min),
+    "mean": reducer(np.mean),
+    "sum": reducer(np.sum),
+    "db": loss,
+    "penalty": lambda x, limit: np.maximum(np.subtract(x, limit), 0),
+    "where": np.where,
+    "maximum": np.maximum,
+    "minimum": np.minimum,
+    "clip": np.clip,
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    "exp": np.exp,
+    "log10": np.log10,
+    "port_of": port_of,
+}
+
+# 允许的语法节点（不含属性访问、下标切片、lambda、推导式等）
+fom_nodes = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.Call, ast.Name, ast.Load, ast.Constant,
+             ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.Mod, ast.USub, ast.UAdd, ast.BitAnd, ast.BitOr, ast.Invert,
+             ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+
+
+# === 端口下标 x[n] 改写为 port_of(x, n) ===
+class PortIndex(ast.NodeTransformer):
+    def visit_Subscript(self, node):
+        self.generic_visit(node)
+        index = node.slice
+        if not (isinstance(index, ast.Constant) and isinstance(index.value, int) and index.value >= 1):
+            raise ValueError("FOM subscripts must be port numbers starting at 1, e.g. P[1]")
+        return ast.copy_location(ast.Call(func=ast.Name(id="port_of", ctx=ast.Load()), args=[node.value, index], keywords=[]), node)
+
+
+# === 编译 FOM 表达式（按文本缓存）===
+# 函数名: compile_fom
+# 参数:
+#   text : FOM 表达式文本
+# 返回:
+#   (code, names) : 编译后的代码对象与表达式引用的变量名集合
+def compile_fom(text):
+    if text in fom_cache:
+        return fom_cache[text]
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except SyntaxError as error:
+        raise ValueError(f"Invalid FOM expression '{text}': {error.msg}") from None
+    tree = ast.fix_missing_locations(PortIndex().visit(tree))
+    names = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, fom_nodes):
+            raise ValueError(f"Unsupported syntax in FOM expression '{text}': {type(node).__name__}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, str)):
+            raise ValueError(f"Unsupported constant in FOM expression '{text}': {node.value!r}")
+        if isinstance(node, ast.Call):
+            if not (isinstance(node.func, ast.Name) and node.func.id in fom_functions) or node.keywords:
+                raise ValueError(f"Unsupported call in FOM expression '{text}': {ast.unparse(node)}")
+        elif isinstance(node, ast.Name) and node.id not in fom_functions:
+            names.add(node.id)
+    compiled = (compile(tree, "<fom>", "eval"), names)
+    fom_cache[text] = compiled
+    return compiled
+
+
+# === 计算 FOM ===
+# 函数名: evaluate_fom
+# 参数:
+#   text      : FOM 表达式文本
+#   namespace : {变量名: (rows, cols, n_out) 可广播数组}
+#   shape     : (rows, cols, n_out)
+# 返回:
+#   fom       : (rows, 1) 每行的 FOM（wave 与端口轴上的最大值），未完成的仿真点使该行为 nan
+def evaluate_fom(text, namespace, shape):
+    code, names = compile_fom(text)
+    missing = names - set(namespace)
+    if missing:
+        raise ValueError(f"Unknown variables in FOM expression '{text}': {sorted(missing)}, available: {sorted(namespace)}")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = eval(code, {"__builtins__": {}, **fom_functions}, namespace)
+    value = np.broadcast_to(np.asarray(value, dtype=float), shape)
+    return value.max(axis=(1, 2)).reshape(-1, 1)
@@ -0,0 +1,349 @@
+# ============================================================
+# 文件名称: RsoftField.py
+# 模块功能: 场文件读取（内存映射）与研究级场指标（模式重叠积分、端口功率窗口、XZ 功率分布）
+# 功能概述:
+#   - load_field: 读取求解器输出的 ASCII 场文件（.fld 输出场、.pcs 等 XZ 等高线图）与二进制 .npy 场；
+#     文本文件只解析一次，写入同目录的 {文件}.npy（单精度）与 {文件}.json（坐标轴）缓存，之后以 memmap 打开，不再整体复制
+#   - overlap / window_power: 批量重叠积分 η = |∫E·M*|² / (∫|E|²·∫|M|²) 与窗口功率占比（掩模矩阵乘法）
+#   - field_metrics: 研究内全部任务输出场对参考模式的重叠积分与各端口窗口（芯层）功率占比
+#   - power_maps: 研究内全部任务 XZ 等高线图的各端口窗口功率随 z 的分布
+#   - 研究级计算在工作进程中并行（fork 启动方式时使用进程池，与 RsoftPlot 相同），结果为带轴名的 LabeledArray
+#   - 场文件按研究清单中的 .mon 路径定位（支持分片布局），支持 retention="archive" 的 _outputs.zip 与 pack_study 归档
+# 说明: RSoft 二进制场格式未公开，"二进制场" 指本模块写出的 .npy 缓存或用户以 np.save 保存的场
+# 依赖模块: os, json, functools, multiprocessing, concurrent.futures, numpy, scipy, RsoftArray, RsoftArchive, RsoftInd, RsoftBPM
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import json
+import functools
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+from RsoftArray import *
+from RsoftArchive import StudyArchive, study_files, loose_files, open_archives
+from RsoftInd import load_ind
+from RsoftBPM import BPMDesign
+
+# 场文件格式 → 每个采样点的数值个数（实部 / 实部 + 虚部）
+field_formats = {"OUTPUT_REAL": 1, "OUTPUT_REAL_IMAG": 2}
+
+
+# === 解析 RSoft ASCII 场文件 ===
+# 函数名: parse_field
+# 参数:
+#   raw  : 文件内容（bytes）
+# 返回:
+#   axes : {"x": [min, max, n], "y": [min, max, n]}（一维场无 "y"；XZ 等高线图的第二轴为 z）
+#   data : 一维场形状 (nx,)，二维场 (ny, nx)；OUTPUT_REAL_IMAG 为 complex64，OUTPUT_REAL 为 float32
+def parse_field(raw):
+    pos = 0
+    while raw.startswith(b"/", pos):
+        pos = raw.index(b"\n", pos) + 1
+    end = raw.index(b"\n", pos)
+    words = raw[pos:end].split()
+    pos = end + 1
+    kind = next((word.decode() for word in words if word.startswith(b"OUTPUT_")), "OUTPUT_REAL_IMAG")
+    two_d = kind.endswith("_3D")
+    kind = kind[:-len("_3D")] if two_d else kind
+    if kind not in field_formats:
+        raise ValueError(f"unsupported field format: {kind}")
+    axes = {"x": [float(words[1]), float(words[2]), int(words[0])]}
+    shape = (int(words[0]),)
+    if two_d:
+        end = raw.find(b"\n", pos)
+        end = len(raw) if end < 0 else end
+        words = raw[pos:end].split()
+        pos = end + 1
+        axes["y"] = [float(words[1]), float(words[2]), int(words[0])]
+        shape = (int(words[0]),) + shape
+    values = np.fromstring(raw[pos:].decode(), dtype=float, sep=" ")
+    if kind == "OUTPUT_REAL":
+        return axes, values.reshape(shape).astype(np.float32)
+    values = values.reshape(shape + (2,))
+    data = np.empty(shape, dtype=np.complex64)
+    data.real, data.imag = values[..., 0], values[..., 1]
+    return axes, data
+
+
+# === 坐标轴数组 ===
+def axis_values(axes, name):
+    return np.linspace(*axes[name][:2], int(axes[name][2])) if name in axes else None
+
+
+# === 场文件的读取来源 ===
+# 参数:
+#   path     : 场文件路径
+#   run_path : 所属研究目录（用于定位 retention="archive" 的 {run_path}_outputs.zip）
+# 返回:
+#   files    : loose_files 或 StudyArchive
+def field_source(path, run_path=None):
+    if os.path.isfile(path):
+        return loose_files
+    if run_path is not None and os.path.isfile(run_path + "_outputs.zip"):
+        outputs_path = run_path + "_outputs.zip"
+        archive = open_archives.get(outputs_path)
+        if archive is None or archive.mtime != os.path.getmtime(outputs_path):
+            # 输出压缩包的成员名相对研究目录本身
+            archive = StudyArchive(outputs_path, os.path.join(run_path, ""))
+            open_archives[outputs_path] = archive
+        if archive.isfile(path):
+            return archive
+    return study_files(os.path.dirname(path))
+
+
+# === 读取场文件 ===
+# 函数名: load_field
+# 参数:
+#   path     : 场文件路径（ASCII 场文件或 .npy 二进制场）
+#   cache    : ASCII 文件解析后写入 {path}.npy / {path}.json 缓存，之后以 memmap 打开（源文件更新时重新解析）
+#   run_path : 所属研究目录（场文件已归档时用于定位归档）
+# 返回:
+#   x, y, data（同 RsoftMode.read_field；磁盘上的文件为只读 memmap，归档内的文件在内存中解析、不写缓存）
+def load_field(path, cache=True, run_path=None):
+    if path.endswith(".npy"):
+        npy_path, source = path, None
+    else:
+        npy_path, source = path + ".npy", path
+    axes_path = npy_path[:-len(".npy")] + ".json"
+    if os.path.isfile(npy_path) and (source is None or not os.path.isfile(source)
+                                     or os.path.getmtime(npy_path) >= os.path.getmtime(source)):
+        data = np.load(npy_path, mmap_mode="r")
+        if os.path.isfile(axes_path):
+            with open(axes_path, "r") as f:
+                axes = json.load(f)
+        else:
+            # 无坐标轴记录的 .npy 场: 以采样序号为坐标
+            axes = {name: [0, n - 1, n] for name, n in zip(("y", "x")[-data.ndim:], data.shape)}
+        return axis_values(axes, "x"), axis_values(axes, "y"), data
+
+    files = field_source(path, run_path)
+    if not files.isfile(path):
+        raise FileNotFoundError(f"No field file at {path}")
+    axes, data = parse_field(files.read(path))
+    if cache and files is loose_files:
+        temp_path = npy_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            np.save(f, data)
+        with open(axes_path, "w") as f:
+            json.dump(axes, f)
+        os.replace(temp_path, npy_path)
+        data = np.load(npy_path, mmap_mode="r")
+    return axis_values(axes, "x"), axis_values(axes, "y"), data
+
+
+# === 功率密度: 复数场为 |E|²，实数场按幅值平方（squared=False 时视为已是功率）===
+def intensity(data, squared=True):
+    data = np.asarray(data)
+    if np.iscomplexobj(data):
+        return data.real.astype(float) ** 2 + data.imag.astype(float) ** 2
+    return data.astype(float) ** 2 if squared else data.astype(float)
+
+
+# === 参考模式插值到场的网格（网格外为 0）===
+# 参数:
+#   mode   : (x, y, field)、场文件路径或 RsoftMode 求解结果（取基模）
+#   x, y   : 目标网格（一维场 y 为 None）
+# 返回:
+#   field  : 形状与目标网格相同的复数场
+def resample_mode(mode, x, y=None):
+    if isinstance(mode, str):
+        mode = load_field(mode)
+    elif isinstance(mode, dict):
+        mode = (mode["x"], mode.get("y"), np.asarray(mode["field"])[0])
+    mode_x, mode_y, field = mode
+    field = np.asarray(field, dtype=complex)
+    if y is None:
+        if mode_y is not None:
+            raise ValueError("2D reference mode for a 1D field")
+        return np.interp(x, mode_x, field.real, 0, 0) + 1j * np.interp(x, mode_x, field.imag, 0, 0)
+    if mode_y is None:
+        raise ValueError("1D reference mode for a 2D field")
+    interpolate = RegularGridInterpolator((mode_y, mode_x), np.stack([field.real, field.imag], axis=-1),
+                                          bounds_error=False, fill_value=0)
+    points = np.stack(np.meshgrid(y, x, indexing="ij"), axis=-1)
+    values = interpolate(points)
+    return values[..., 0] + 1j * values[..., 1]
+
+
+# === 批量重叠积分 ===
+# 函数名: overlap
+# 参数:
+#   fields : 场 (n, ...)（单个场取 field[None]）
+#   modes  : 同一网格上的参考模式 (m, ...)
+# 返回:
+#   eta    : (n, m) 功率耦合效率（网格面元在归一化中约去）
+def overlap(fields, modes):
+    modes = np.asarray(modes, dtype=complex)
+    modes = modes.reshape(len(modes), -1)
+    fields = np.asarray(fields).reshape(-1, modes.shape[1]).astype(complex)
+    inner = fields @ modes.conj().T
+    norm = np.einsum("ij,ij->i", fields.real, fields.real) + np.einsum("ij,ij->i", fields.imag, fields.imag)
+    mode_norm = np.einsum("ij,ij->i", modes.real, modes.real) + np.einsum("ij,ij->i", modes.imag, modes.imag)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.abs(inner) ** 2 / np.outer(norm, mode_norm)
+
+
+# === 窗口掩模矩阵 ===
+# 参数:
+#   windows : 一维窗口 [(xc, width), ...] 或二维窗口 [(xc, yc, width, height), ...]
+#   x, y    : 网格（二维场上的一维窗口只按 x 划分）
+# 返回:
+#   masks   : (p, 网格点数) 0/1 矩阵
+def window_masks(windows, x, y=None):
+    masks = []
+    for window in windows:
+        xc, width = window[0], window[2] if len(window) == 4 else window[1]
+        mask = np.abs(x - xc) <= width / 2
+        if y is not None:
+            mask = np.broadcast_to(mask, (len(y), len(x)))
+            if len(window) == 4:
+                mask = mask & (np.abs(y - window[1]) <= window[3] / 2)[:, None]
+        masks.append(mask.ravel())
+    return np.array(masks, dtype=float).reshape(len(masks), -1)
+
+
+# === 窗口功率占比 ===
+# 函数名: window_power
+# 参数:
+#   power  : 功率密度 (n, 网格点数) 或单个功率分布
+#   masks  : window_masks 的掩模矩阵 (p, 网格点数)
+# 返回:
+#   ratio  : (n, p) 各窗口功率占总功率的比例
+def window_power(power, masks):
+    power = np.asarray(power, dtype=float).reshape(-1, masks.shape[1])
+    total = power.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return power @ masks.T / total
+
+
+# === 由 .ind 得到各 pathway 末端的端口窗口 (xc, width) ===
+# 参数:
+#   ind_file  : .ind 文件路径
+#   overrides : symbol 覆盖
+#   scale     : 窗口宽度相对芯层宽度的倍数
+def port_windows(ind_file, overrides=None, scale=1.0):
+    design = BPMDesign(load_ind(ind_file), overrides)
+    windows = []
+    for pathway in range(1, len(design.ind.pathways) + 1):
+        z_end = max(max(design.point(number, "begin")[1], design.point(number, "end")[1]) for number in design.ind.pathways[pathway - 1])
+        xc, width = design.pathway_profile(pathway, np.array([z_end]))
+        windows.append((float(xc[0]), float(width[0]) * scale))
+    return windows
+
+
+# === 网格相关的模式与掩模（每个进程按网格缓存，同一研究通常只计算一次）===
+# {(研究计算标识, 网格): (插值后的模式 (m, 网格点数), 掩模 (p, 网格点数))}
+grid_cache = {}
+
+
+def grid_terms(token, x, y, modes, windows):
+    key = (token, len(x), float(x[0]), float(x[-1])) + ((len(y), float(y[0]), float(y[-1])) if y is not None else ())
+    terms = grid_cache.get(key)
+    if terms is None:
+        resampled = np.array([resample_mode(mode, x, y) for mode in modes]).reshape(len(modes), -1)
+        if len(grid_cache) > 16:
+            grid_cache.clear()
+        terms = grid_cache[key] = (resampled, window_masks(windows, x, y))
+    return terms
+
+
+# === 工作进程: 一个任务的输出场 → (重叠积分 (m,), 端口功率占比 (p,))，文件缺失时为 None ===
+def job_field(path, run_path, token, modes, windows, squared, cache):
+    try:
+        x, y, data = load_field(path, cache, run_path)
+    except FileNotFoundError:
+        return None
+    resampled, masks = grid_terms(token, x, y, modes, windows)
+    flat = np.asarray(data).reshape(1, -1)
+    eta = overlap(flat, resampled)[0] if len(modes) else np.zeros(0)
+    power = window_power(intensity(flat, squared), masks)[0] if len(windows) else np.zeros(0)
+    return eta, power
+
+
+# === 工作进程: 一个任务的 XZ 等高线图 → (z, 各端口功率占比 (nz, p))，文件缺失时为 None ===
+def job_map(path, run_path, windows, squared, cache):
+    try:
+        x, z, data = load_field(path, cache, run_path)
+    except FileNotFoundError:
+        return None
+    if z is None:
+        raise ValueError(f"{path} is not an XZ map")
+    masks = window_masks(windows, x)
+    return z, window_power(intensity(data, squared), masks)
+
+
+# === 研究内各任务的场文件路径与轴 ===
+def study_fields(run_path, suffix):
+    index, _ = study_index(run_path)
+    coords, positions, cases = study_axes(index)
+    paths = [os.path.join(run_path, os.path.splitext(str(mon))[0] + suffix) for mon in index["mon"]]
+    return paths, coords, [tuple(position) for position in positions], cases
+
+
+# === 在工作进程中逐个任务计算（按块分发，减少进程间通信）===
+def map_jobs(worker, paths, processes=None, max_workers=None):
+    if processes is None:
+        processes = multiprocessing.get_start_method() == "fork"
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (max_workers * 4))
+    pool = ProcessPoolExecutor(max_workers) if processes else ThreadPoolExecutor(max_workers)
+    with pool:
+        return list(pool.map(worker, paths, chunksize=chunksize))
+
+
+# === 研究级场指标 ===
+# 函数名: field_metrics
+# 参数:
+#   run_path    : 研究结果目录（需有清单或结果存储）
+#   modes       : 参考模式列表（(x, y, field)、场文件路径或 RsoftMode 求解结果）
+#   windows     : 端口窗口列表（一维 (xc, width)，二维 (xc, yc, width, height)；可由 port_windows 得到）
+#   suffix      : 输出场文件后缀（文件名为 .mon 的前缀 + suffix）
+#   squared     : 实数场按幅值平方计算功率
+#   cache       : 写入 .npy 缓存（见 load_field）
+#   processes   : True 进程池 / False 线程池 / None 按启动方式自动选择
+#   max_workers : 工作进程数（默认 CPU 核数）
+# 返回:
+#   {"overlap": LabeledArray（轴 ..., mode）, "power": LabeledArray（轴 ..., port）}，缺少场文件的任务为 nan
+def field_metrics(run_path, modes=(), windows=(), suffix=".fld", squared=True, cache=True, processes=None, max_workers=None):
+    paths, coords, cells, cases = study_fields(run_path, suffix)
+    modes, windows = list(modes), [tuple(window) for window in windows]
+    # 每次计算一个标识，工作进程内的网格缓存不会混用其他研究或其他参考模式的结果
+    token = os.urandom(8).hex()
+    worker = functools.partial(job_field, run_path=run_path, token=token, modes=modes, windows=windows, squared=squared, cache=cache)
+    results = map_jobs(worker, paths, processes, max_workers)
+    shape = tuple(len(values) for values in coords.values())
+    eta = np.full(shape + (len(modes),), np.nan)
+    power = np.full(shape + (len(windows),), np.nan)
+    for cell, result in zip(cells, results):
+        if result is not None:
+            eta[cell], power[cell] = result
+    return {"overlap": LabeledArray(eta, OrderedDict(coords, mode=np.arange(1, len(modes) + 1)), cases),
+            "power": LabeledArray(power, OrderedDict(coords, port=np.arange(1, len(windows) + 1)), cases)}
+
+
+# === 研究级 XZ 功率分布 ===
+# 函数名: power_maps
+# 参数:
+#   run_path : 研究结果目录
+#   windows  : 端口窗口列表 [(xc, width), ...]（按 x 划分）
+#   suffix   : XZ 等高线图文件后缀（slice_display_mode = DISPLAY_CONTOURMAPXZ 的输出）
+#   其余同 field_metrics
+# 返回:
+#   LabeledArray（轴 ..., z, port）: 各 z 截面上窗口功率占该截面总功率的比例，z 取最长的一个图
+def power_maps(run_path, windows, suffix=".pcs", squared=True, cache=True, processes=None, max_workers=None):
+    paths, coords, cells, cases = study_fields(run_path, suffix)
+    windows = [tuple(window) for window in windows]
+    worker = functools.partial(job_map, run_path=run_path, windows=windows, squared=squared, cache=cache)
+    results = map_jobs(worker, paths, processes, max_workers)
+    done = [result for result in results if result is not None]
+    z = max((result[0] for result in done), key=len, default=np.zeros(0))
+    shape = tuple(len(values) for values in coords.values())
+    data = np.full(shape + (len(z), len(windows)), np.nan)
+    for cell, result in zip(cells, results):
+        if result is not None:
+            data[cell + (slice(0, len(result[0])),)] = result[1]
+    return LabeledArray(data, OrderedDict(coords, z=z, port=np.arange(1, len(windows) + 1)), cases)
@@ -0,0 +1,206 @@
+# ============================================================
+# 文件名称: RsoftInd.py
+# 模块功能: 读取 RSoft .ind 文件（RsoftCad 生成或 CAD 保存），解析符号表与结构块，并计算符号表达式
+# 功能概述:
+#   - 解析顶层 symbol 定义及 material / segment / pathway / monitor / launch_field 等块
+#   - 支持命令行风格的 symbol 覆盖（如 Lta=300 wave=1.31）后求值
+#   - 内置常用材料的 Sellmeier 色散模型，支持 nreal($background_material) 等表达式
+# 说明:
+#   - 三角函数与 RSoft CAD 一致，按角度（deg）计算
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import re
+import math
+from collections import OrderedDict
+
+
+# === 材料色散模型（波长单位 µm）===
+# 可在外部扩展: material_table["LiNbO3_e"] = lambda wave: 2.138
+def sellmeier(terms):
+    def index(wave):
+        wave2 = wave * wave
+        return math.sqrt(1 + sum(B * wave2 / (wave2 - C) for B, C in terms))
+    return index
+
+material_table = {
+    "Air": lambda wave: 1.0,
+    # Malitson, J.Opt.Soc.Am 55, 1205 (1965)，与 Dielectrics.mlb 中 SiO2 数据来源一致
+    "SiO2": sellmeier([(0.6961663, 0.0684043 ** 2), (0.4079426, 0.1162414 ** 2), (0.8974794, 9.896161 ** 2)]),
+    # Luke et al., Opt. Lett. 40, 4823 (2015)
+    "Si3N4": sellmeier([(3.0249, 0.1353406 ** 2), (40314, 1239.842 ** 2)]),
+    # Li, J. Phys. Chem. Ref. Data 9, 561 (1980)，293 K
+    "Si": lambda wave: math.sqrt(11.6858 + 0.939816 / wave ** 2 + 0.00810461 * 1.1071 ** 2 / (wave ** 2 - 1.1071 ** 2)),
+}
+
+
+# === 查询材料折射率实部 ===
+# 函数名: material_index
+# 参数:
+#   name : 材料名称（与 .mlb 中 name 一致，如 "SiO2"）
+#   wave : 自由空间波长（µm）
+# 返回:
+#   n    : 折射率实部
+def material_index(name, wave):
+    if name not in material_table:
+        raise ValueError(f"No dispersion model for material '{name}', add one to RsoftInd.material_table")
+    return material_table[name](wave)
+
+
+# === RSoft 表达式中可用的函数（三角函数按角度计算）===
+expression_functions = {
+    "sqrt": math.sqrt, "exp": math.exp, "log": math.log, "log10": math.log10, "abs": abs,
+    "pow": pow, "min": min, "max": max, "int": int, "floor": math.floor, "ceil": math.ceil,
+    "sin": lambda a: math.sin(math.radians(a)),
+    "cos": lambda a: math.cos(math.radians(a)),
+    "tan": lambda a: math.tan(math.radians(a)),
+    "asin": lambda v: math.degrees(math.asin(v)),
+    "acos": lambda v: math.degrees(math.acos(v)),
+    "atan": lambda v: math.degrees(math.atan(v)),
+    "atan2": lambda y, x: math.degrees(math.atan2(y, x)),
+    "pi": math.pi,
+}
+
+
+# ============================================================
+# 类名: SymbolTable
+# 功能: 按需递归计算 .ind 符号值（作为 eval 的局部命名空间）
+# ============================================================
+class SymbolTable:
+    def __init__(self, symbols, overrides=None):
+        self.symbols = symbols
+        self.overrides = {k: str(v) for k, v in (overrides or {}).items()}
+        self.values = {}
+        self.evaluating = set()
+
+    def __getitem__(self, name):
+        if name in self.values:
+            return self.values[name]
+        if name == "nreal":
+            return lambda material: material_index(material, self["free_space_wavelength"])
+        if name == "nimag":
+            return lambda material: 0.0
+        if name in self.overrides:
+            expr = self.overrides[name]
+        elif name in self.symbols:
+            expr = self.symbols[name]
+        elif name in expression_functions:
+            return expression_functions[name]
+        else:
+            raise KeyError(name)
+        if name in self.evaluating:
+            raise ValueError(f"Circular symbol definition: {name}")
+        self.evaluating.add(name)
+        try:
+            value = self.value(expr)
+        finally:
+            self.evaluating.discard(name)
+        self.values[name] = value
+        return value
+
+    def __contains__(self, name):
+        return name in self.overrides or name in self.symbols
+
+    # === 计算一个表达式（无法计算为数值时返回原字符串，如 SiO2、TAPER_LINEAR）===
+    def value(self, expr):
+        expr = str(expr).strip()
+        source = re.sub(r"\$(\w+)", r"\1", expr).replace("^", "**")
+        try:
+            return eval(source, {"__builtins__": {}}, self)
+        except (NameError, SyntaxError, TypeError):
+            return expr
+
+
+# ============================================================
+# 类名: RsoftInd
+# 功能: 解析 .ind 文件为符号表与结构块
+# 属性:
+#   symbols  - OrderedDict，顶层 symbol → 表达式字符串
+#   blocks   - {块类型: [块字典, ...]}，如 blocks["segment"][0]["begin.x"]
+#   pathways - [[段编号, ...], ...]
+# ============================================================
+class RsoftInd:
+    def __init__(self, file=str):
+        self.file = file
+        self.symbols = OrderedDict()
+        self.blocks = OrderedDict()
+        self.pathways = []
+
+        with open(file, "r") as f:
+            lines = f.read().splitlines()
+
+        stack = []  # 当前嵌套块 [(块类型, 块字典), ...]
+        for line in lines:
+            text = line.strip()
+            if not text:
+                continue
+            words = text.split()
+            if words[0] == "end":
+                if stack:
+                    stack.pop()
+                continue
+            if "=" in text:
+                key, value = [part.strip() for part in text.split("=", 1)]
+                if stack:
+                    stack[-1][1][key] = value
+                else:
+                    self.symbols[key] = value
+            elif stack and stack[-1][0] == "pathway":
+                stack[-1][1]["segments"].append(int(words[0]))
+            elif len(words) == 2 and words[1].isdigit() and not stack:
+                block = OrderedDict(number=int(words[1]))
+                if words[0] == "pathway":
+                    block["segments"] = []
+                    self.pathways.append(block["segments"])
+                self.blocks.setdefault(words[0], []).append(block)
+                stack.append((words[0], block))
+            else:
+                # 嵌套子块（如 material 中的 optical），内容并入父块
+                stack.append((words[0], stack[-1][1] if stack else OrderedDict()))
+
+        self.dimension = int(self.symbols.get("dimension", 3))
+        self.segments = self.blocks.get("segment", [])
+        self.monitors = self.blocks.get("monitor", [])
+        self.launches = self.blocks.get("launch_field", [])
+
+    # === 计算符号表 ===
+    # 函数名: evaluate
+    # 参数:
+    #   overrides - {symbol: value} 命令行风格覆盖（如 {"Lta": 300, "wave": 1.31}）
+    # 返回:
+    #   SymbolTable 对象，可用 table["Lta"] 或 table.value("2*width+Gap") 取值
+    def evaluate(self, overrides=None):
+        return SymbolTable(self.symbols, overrides)
+
+
+# === 将 bsimw32 命令行参数（symbol=value 列表）转换为覆盖字典 ===
+# 函数名: parse_overrides
+# 参数:
+#   arguments : ["prefix=xxx", "Lta=300", "wave=1.55", ...]
+# 返回:
+#   prefix, overrides（prefix 不存在时为 None）
+def parse_overrides(arguments):
+    prefix, overrides = None, OrderedDict()
+    for argument in arguments:
+        if "=" not in argument:
+            continue
+        key, value = argument.split("=", 1)
+        if key == "prefix":
+            prefix = value
+        else:
+            overrides[key] = value
+    return prefix, overrides
+
+
+# === 读取 .ind 文件（按路径 + 修改时间缓存解析结果）===
+ind_cache = {}
+
+def load_ind(file):
+    stamp = os.path.getmtime(file)
+    cached = ind_cache.get(file)
+    if cached is None or cached[0] != stamp:
+        cached = (stamp, RsoftInd(file))
+        ind_cache[file] = cached
+    return cached[1]
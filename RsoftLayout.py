@@ -0,0 +1,149 @@
+# ============================================================
+# 文件名称: RsoftLayout.py
+# 模块功能: 研究目录的分片布局与求解器输出文件的保留策略
+# 功能概述:
+#   - 分片布局（layout="sharded"）: 每个任务以前缀哈希的短前缀求解，输出写入 {run_path}/{哈希前两位}/ 子目录，
+#     单个目录内的文件数降为 1/256；前缀 → 结果文件的对应关系记录在研究清单（_manifest.jsonl 的 mon 字段）中
+#   - 保留策略（每个研究一个 StudyOutputs，任务完成即处理）:
+#       "all"     - 保留全部输出（默认，与原行为一致）
+#       "mon"     - 只保留 .mon，场文件、等高线文件、日志等立即删除
+#       "top"     - 研究结束时只保留 FOM 最优的 top 个设计（行）的全部输出，其余只保留 .mon
+#       "archive" - 除 .mon 外的输出逐个任务压缩进 {run_path}_outputs.zip 后删除
+#   - 任务完成时只按已知的求解器输出后缀（output_suffixes）逐个检查文件，不列举研究目录；
+#     其他后缀的输出在研究结束时每个目录列举一次统一处理（平铺布局下不会因逐任务列举目录而随任务数平方增长）
+# 依赖模块: os, hashlib, threading, zipfile, numpy
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import hashlib
+import threading
+import zipfile
+import numpy as np
+
+retention_policies = ("all", "mon", "top", "archive")
+
+
+# === 分片位置 ===
+# 函数名: shard_name
+# 参数:
+#   prefix : 逻辑前缀（如 Lta(100)_wave(1.55)）
+#   width  : 分片子目录名长度（十六进制位数，2 位即 256 个分片）
+#   length : 求解器短前缀长度
+# 返回:
+#   (shard, short) : 分片子目录名、求解器使用的短前缀
+def shard_name(prefix, width=2, length=12):
+    digest = hashlib.sha1(prefix.encode()).hexdigest()
+    return digest[:width], digest[:length]
+
+
+# 求解器输出文件的已知后缀（{前缀}{后缀}）: 监视器、场、等高线、数据、日志与消息文件
+output_suffixes = (".mon", ".fld", ".pcs", ".dat", ".log", ".txt", ".msg", ".err")
+
+
+# === 一个任务的已知输出文件（按 output_suffixes 逐个检查，不列举目录）===
+# 参数:
+#   mon_path : 任务的 .mon 文件路径
+# 返回:
+#   paths    : 已存在的输出文件路径列表
+def job_outputs(mon_path):
+    stem = os.path.splitext(mon_path)[0]
+    return [stem + suffix for suffix in output_suffixes if os.path.isfile(stem + suffix)]
+
+
+# === 一组任务的全部输出文件（{前缀}.* 与 {前缀}_*），每个目录只列举一次 ===
+# 参数:
+#   mon_paths : 各任务的 .mon 文件路径
+# 返回:
+#   outputs   : {mon_path: [输出文件路径, ...]}（文件名同时匹配多个前缀时归属最长的前缀）
+def study_outputs(mon_paths):
+    outputs = {mon_path: [] for mon_path in mon_paths}
+    stems = {}
+    for mon_path in mon_paths:
+        directory, name = os.path.split(mon_path)
+        stems.setdefault(directory, {})[os.path.splitext(name)[0]] = mon_path
+    for directory, names in stems.items():
+        with os.scandir(directory or ".") as entries:
+            for entry in entries:
+                cuts = [i for i, char in enumerate(entry.name) if char in "._"]
+                owner = next((names[entry.name[:i]] for i in reversed(cuts) if entry.name[:i] in names), None)
+                if owner is not None and entry.is_file():
+                    outputs[owner].append(entry.path)
+    return {mon_path: sorted(paths) for mon_path, paths in outputs.items()}
+
+
+# ============================================================
+# 类名: StudyOutputs
+# 功能: 单个研究的输出文件保留策略
+# 属性:
+#   policy       - 保留策略（见 retention_policies）
+#   top          - "top" 策略保留全部输出的设计数
+#   done         - {前缀: .mon 路径}，已完成的任务
+#   archive_path - "archive" 策略的压缩包路径
+#   removed      - 已删除（或归档）的文件数与字节数
+# ============================================================
+class StudyOutputs:
+    def __init__(self, run_path, policy="all", top=3, fom=None):
+        if policy not in retention_policies:
+            raise ValueError(f"unknown retention policy: {policy}")
+        self.run_path = run_path
+        self.policy = policy
+        self.top = top
+        self.fom = fom
+        self.archive_path = run_path + "_outputs.zip"
+        self.archive = None
+        self.lock = threading.Lock()
+        self.done = {}
+        self.removed = [0, 0]
+        if policy == "archive" and os.path.isfile(self.archive_path):
+            os.remove(self.archive_path)
+
+    # === 任务完成: 按策略处理该任务除 .mon 外的输出 ===
+    # 参数:
+    #   prefix   : 逻辑前缀
+    #   mon_path : .mon 文件路径
+    def job_done(self, prefix, mon_path):
+        self.done[prefix] = mon_path
+        if self.policy in ("all", "top"):
+            return
+        self.discard([path for path in job_outputs(mon_path) if not path.endswith(".mon")])
+
+    # === 按策略处理非 .mon 输出: "archive" 先逐个追加到压缩包，再删除 ===
+    def discard(self, extra):
+        if self.policy == "archive" and extra:
+            with self.lock:
+                # 压缩包在研究期间保持打开，逐个任务追加（每次重新打开需重读中央目录）
+                if self.archive is None:
+                    self.archive = zipfile.ZipFile(self.archive_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1)
+                for path in extra:
+                    self.archive.write(path, os.path.relpath(path, self.run_path).replace(os.sep, "/"))
+        self.remove(extra)
+
+    # === 研究结束: "mon" / "archive" 策略处理其余后缀的输出后关闭压缩包；"top" 策略删除最优设计以外的任务的非 .mon 输出 ===
+    # 参数:
+    #   data : 研究的 RsoftData（指标已就绪或可惰性计算，仅 "top" 策略需要）
+    def finish(self, data=None):
+        if self.policy in ("mon", "archive") and self.done:
+            for paths in study_outputs(list(self.done.values())).values():
+                self.discard([path for path in paths if not path.endswith(".mon")])
+        with self.lock:
+            if self.archive is not None:
+                self.archive.close()
+                self.archive = None
+        if self.policy != "top" or data is None or data.rows * data.cols <= 1 or data.prefix_matrix is None:
+            return
+        order = np.argsort(np.asarray(data.mean_matrix, dtype=float).reshape(data.rows, -1)[:, 0])
+        keep = {prefix for i in order[:self.top] for prefix in data.prefix_matrix[i] if prefix is not None}
+        outputs = study_outputs([mon_path for prefix, mon_path in self.done.items() if prefix not in keep])
+        for paths in outputs.values():
+            self.remove([path for path in paths if not path.endswith(".mon")])
+
+    # === 删除文件并计数 ===
+    def remove(self, paths):
+        for path in paths:
+            size = os.path.getsize(path)
+            os.remove(path)
+            with self.lock:
+                self.removed[0] += 1
+                self.removed[1] += size
@@ -0,0 +1,148 @@
+# ============================================================
+# 文件名称: RsoftLive.py
+# 模块功能: 研究进行中的流式结果汇总（每个任务完成即并入，无需等待整个研究结束）
+# 功能概述:
+#   - RsoftSimulation 的任务完成钩子将每个任务的输出功率交给对应研究的 LiveStudy
+#   - 运行中的指标矩阵按行更新（只重新计算该任务所在行），未完成的点为 nan
+#   - 按时间间隔节流写出 {run_path}_live.json（进度与当前最优点）及部分结果表格 _result.txt
+#   - 其他进程可用 read_live(run_path) 查询当前最优点
+#   - 研究结束时指标已全部就绪，分析可直接使用 LiveStudy.data，无需重新读取结果文件
+# 依赖模块: os, json, time, threading, numpy, RsoftData
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import json
+import time
+import threading
+import numpy as np
+from RsoftData import *
+
+
+# ============================================================
+# 类名: LiveStudy
+# 功能: 单个研究的流式汇总
+# 属性:
+#   data  - 惰性 RsoftData（索引来自研究清单，输出功率与指标由完成的任务逐个填入）
+#   power - {前缀: 输出功率列表}，已完成的任务
+# ============================================================
+class LiveStudy:
+    # ------------------------------------------------------------
+    # 构造函数: __init__
+    # 参数:
+    #   run_path - 研究结果目录
+    #   fom      - 品质因数表达式（同 RsoftData）
+    #   interval - 汇总文件最短写出间隔（秒）
+    # ------------------------------------------------------------
+    def __init__(self, run_path, fom=None, interval=5.0):
+        self.run_path = run_path
+        self.fom = fom
+        self.interval = interval
+        self.summary_path = run_path + "_live.json"
+        self.lock = threading.Lock()
+        self.power = {}
+        self.data = None
+        self.position = {}
+        # 出现索引中没有的前缀（研究仍在提交任务）时，在下次写出时重建索引
+        self.stale = True
+        self.last_write = time.time()
+
+    # === 并入一个已完成任务 ===
+    # 函数名: add
+    # 参数:
+    #   prefix : 仿真前缀
+    #   power  : 各端口输出功率（结果文件缺失时为空列表）
+    # 返回: 无
+    def add(self, prefix, power):
+        with self.lock:
+            self.power[prefix] = list(power)
+            position = self.position.get(prefix)
+            if position is None or len(power) > self.data.n_out:
+                self.stale = True
+            elif not self.stale:
+                i, j = position
+                self.data.output_matrix[i, j] = np.nan
+                self.data.output_matrix[i, j, :len(power)] = power
+                self.update_rows([i])
+            if time.time() - self.last_write >= self.interval:
+                self.write()
+
+    # === 按研究清单重建索引，并用已完成任务的功率填充输出矩阵 ===
+    def reindex(self):
+        data = RsoftData(self.run_path, fom=self.fom, lazy=True)
+        self.position = {prefix: (i, j) for i, row in enumerate(data.prefix_matrix) for j, prefix in enumerate(row) if prefix is not None}
+        data.n_out = max([len(power) for power in self.power.values()] + [0])
+        data.output_matrix = np.full((data.rows, data.cols, data.n_out), np.nan)
+        for prefix, power in self.power.items():
+            if prefix in self.position:
+                data.output_matrix[self.position[prefix] + (slice(0, len(power)),)] = power
+        self.data = data
+        self.stale = False
+        self.update_rows(np.arange(data.rows))
+
+    # === 重新计算若干行的指标（单点研究无指标）===
+    def update_rows(self, rows):
+        data = self.data
+        if data.rows * data.cols <= 1 or data.n_out == 0:
+            return
+        view = data.metric_view(rows)
+        for name in metric_names:
+            matrix = getattr(view, f"{name}_matrix")
+            if len(rows) == data.rows:
+                setattr(data, f"{name}_matrix", matrix)
+            else:
+                data.__dict__[f"{name}_matrix"][rows] = matrix
+        # 当前最优点（只在已完成全部 wave 的行中选取）
+        if not np.isnan(data.mean_matrix[:, 0]).all():
+            data.select_best()
+
+    # === 当前最优点 ===
+    # 返回:
+    #   {"symbol": symbol1, "value": 最优取值, "mean": 最优 FOM}，尚无完整的行时为 None
+    def best(self):
+        data = self.data
+        if data is None or "min_symbol" not in data.__dict__:
+            return None
+        return {"symbol": data.symbol1, "value": data.min_symbol, "mean": data.min_mean[0]}
+
+    # === 写出汇总（进度、当前最优点）与部分结果表格 ===
+    def write(self, report=True):
+        self.last_write = time.time()
+        if self.stale:
+            self.reindex()
+        best = self.best()
+        if report and best is not None:
+            self.data.report()
+        summary = {
+            "run_path": self.run_path,
+            "done": len(self.power),
+            "total": int((self.data.row_index >= 0).sum()),
+            "fom": self.data.fom,
+            "best": best,
+            "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        temp_path = self.summary_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(summary, f, indent=2)
+        os.replace(temp_path, self.summary_path)
+
+    # === 研究结束: 写出最终汇总，返回指标已就绪的 RsoftData（结果表格由调用方输出）===
+    def finish(self):
+        with self.lock:
+            self.write(report=False)
+            return self.data
+
+
+# === 查询研究的当前汇总（可在其他进程中调用）===
+# 函数名: read_live
+# 参数:
+#   run_path : 研究结果目录
+# 返回:
+#   summary  : {"done", "total", "fom", "best", "updated", ...}，研究未启用流式汇总时为 None
+def read_live(run_path):
+    path = run_path + "_live.json"
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
@@ -0,0 +1,260 @@
+# ============================================================
+# 文件名称: RsoftMode.py
+# 模块功能: 有限差分模式求解器，为 Scan 的宽度 × 波长组合批量计算有效折射率表与入射场文件
+# 功能概述:
+#   - 一维平板（2D 设计）: 三对角有限差分矩阵，求解最高阶若干本征值
+#   - 二维矩形通道（3D 设计）: 五点差分稀疏矩阵，移位反演 eigsh 求解
+#   - 截面参数哈希缓存（内存 + mode_cache 目录下的 npz），相同截面只求解一次
+#   - 平板设计的 neff 表对全部 宽度 × 波长 一次向量化求解（RsoftEIM.slab_table，色散方程二分法）
+#   - 输出 neff 表（tabulate 文本）与 RSoft ASCII 场文件，供 RsoftCad 以 launch_type.File 引用
+# 依赖模块: numpy, scipy
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import hashlib
+import numpy as np
+import scipy.sparse as sparse
+from scipy.sparse.linalg import eigsh
+from scipy.linalg import eigh_tridiagonal
+from tabulate import tabulate
+from RsoftInd import *
+from RsoftEIM import slab_table
+
+
+# === 写出 RSoft ASCII 场文件 ===
+# 函数名: write_field
+# 参数:
+#   path  : 输出文件路径
+#   x     : x 坐标 (nx,)
+#   field : (nx,) 一维场或 (ny, nx) 二维场（复数或实数）
+#   y     : y 坐标 (ny,)，二维场时必需
+# 返回: 无
+def write_field(path, x, field, y=None):
+    field = np.asarray(field, dtype=complex)
+    with open(path, "w") as f:
+        f.write("/rn,a,b/nx0/ls1\n/r,qa,qb\n")
+        if field.ndim == 1:
+            f.write(f"{len(x)} {x[0]:.6g} {x[-1]:.6g} 0 OUTPUT_REAL_IMAG 0 0\n")
+            np.savetxt(f, np.column_stack([field.real, field.imag]), fmt="%.6e")
+        else:
+            f.write(f"{len(x)} {x[0]:.6g} {x[-1]:.6g} 0 OUTPUT_REAL_IMAG_3D 0 0\n")
+            f.write(f"{len(y)} {y[0]:.6g} {y[-1]:.6g}\n")
+            pairs = np.empty((field.shape[0], field.shape[1] * 2))
+            pairs[:, 0::2], pairs[:, 1::2] = field.real, field.imag
+            np.savetxt(f, pairs, fmt="%.6e")
+
+
+# === 读取 RSoft ASCII 场文件 ===
+# 函数名: read_field
+# 返回:
+#   x, y, field（一维场时 y 为 None，field 形状为 (nx,)；二维场为 (ny, nx)）
+def read_field(path):
+    with open(path, "r") as f:
+        lines = f.read().splitlines()
+    head = 0
+    while lines[head].startswith("/"):
+        head += 1
+    nx, xmin, xmax = lines[head].split()[:3]
+    x = np.linspace(float(xmin), float(xmax), int(nx))
+    if "3D" in lines[head]:
+        ny, ymin, ymax = lines[head + 1].split()[:3]
+        y = np.linspace(float(ymin), float(ymax), int(ny))
+        values = np.array(" ".join(lines[head + 2:]).split(), dtype=float).reshape(int(ny), int(nx), 2)
+    else:
+        y = None
+        values = np.array(" ".join(lines[head + 1:]).split(), dtype=float).reshape(int(nx), 2)
+    return x, y, values[..., 0] + 1j * values[..., 1]
+
+
+# === 由本征值 β² 得到有效折射率，低于包层折射率的（窗口辐射模）记为 nan ===
+def guided_neff(beta2, k0, n_clad):
+    neff = np.sqrt(np.maximum(beta2, 0)) / k0
+    return np.where(neff > n_clad, neff, np.nan)
+
+
+# ============================================================
+# 类名: RsoftMode
+# 功能: 平板 / 通道截面的有限差分模式求解，按截面哈希缓存
+# ============================================================
+class RsoftMode:
+    # ------------------------------------------------------------
+    # 构造函数: __init__
+    # 参数:
+    #   cache_dir - 磁盘缓存目录（None 时仅内存缓存）
+    #   modes     - 每个截面求解的模式数
+    # ------------------------------------------------------------
+    def __init__(self, cache_dir=None, modes=1):
+        self.cache_dir = cache_dir
+        self.modes = modes
+        self.cache = {}
+        if cache_dir is not None and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    # === 截面哈希（参数取有限位数，避免浮点噪声导致缓存失效）===
+    def key(self, *params):
+        text = repr(tuple(round(float(p), 9) if isinstance(p, (int, float, np.floating)) else p for p in params))
+        return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+    # === 先查内存，再查磁盘 npz，均未命中时求解并写入缓存 ===
+    def lookup(self, key, solve):
+        if key in self.cache:
+            return self.cache[key]
+        path = os.path.join(self.cache_dir, f"{key}.npz") if self.cache_dir else None
+        if path and os.path.isfile(path):
+            with np.load(path) as data:
+                result = {name: data[name] for name in data.files}
+        else:
+            result = solve()
+            result["key"] = np.array(key)
+            if path:
+                np.savez(path, **result)
+        self.cache[key] = result
+        return result
+
+    # === 一维平板模式 ===
+    # 函数名: slab
+    # 参数:
+    #   width, n_core, n_clad, wave : 芯宽、芯层 / 包层折射率、波长（µm）
+    #   grid, window                : 网格间距与计算窗口宽度（None 时自动选择）
+    # 返回:
+    #   {"neff": (modes,), "x": (nx,), "field": (modes, nx), "key": 截面哈希}，场按功率归一化，截止模式 neff 为 nan
+    def slab(self, width, n_core, n_clad, wave, grid=None, window=None):
+        grid = grid or min(width / 20, wave / n_core / 10)
+        window = window or width + 2 * max(6 * wave, width)
+
+        def solve():
+            x = np.linspace(-window / 2, window / 2, int(round(window / grid)) + 1)
+            k0 = 2 * np.pi / wave
+            n = np.where(np.abs(x) <= width / 2, n_core, n_clad)
+            diagonal = -2 / grid ** 2 + (k0 * n) ** 2
+            off = np.full(len(x) - 1, 1 / grid ** 2)
+            beta2, vectors = eigh_tridiagonal(diagonal, off, select="i", select_range=(len(x) - self.modes, len(x) - 1))
+            order = np.argsort(beta2)[::-1]
+            field = vectors[:, order].T
+            field /= np.sqrt(np.sum(field ** 2, axis=1, keepdims=True) * grid)
+            field *= np.sign(field[:, np.argmax(np.abs(field), axis=1)].diagonal())[:, None]
+            return {"neff": guided_neff(beta2[order], k0, n_clad), "x": x, "field": field}
+
+        return self.lookup(self.key("slab", width, n_core, n_clad, wave, grid, window, self.modes), solve)
+
+    # === 二维矩形通道模式（标量近似）===
+    # 函数名: channel
+    # 参数:
+    #   width, height               : 芯层宽度与高度（µm）
+    #   n_core, n_clad, wave        : 芯层 / 包层折射率、波长（µm）
+    #   grid, window                : 网格间距与方形计算窗口边长（None 时自动选择）
+    # 返回:
+    #   {"neff": (modes,), "x": (nx,), "y": (ny,), "field": (modes, ny, nx)}
+    def channel(self, width, height, n_core, n_clad, wave, grid=None, window=None):
+        grid = grid or min(width, height) / 20
+        window = window or max(width, height) + 2 * max(6 * wave, max(width, height) / 2)
+
+        def solve():
+            x = np.linspace(-window / 2, window / 2, int(round(window / grid)) + 1)
+            y = x.copy()
+            k0 = 2 * np.pi / wave
+            core = (np.abs(x)[None, :] <= width / 2) & (np.abs(y)[:, None] <= height / 2)
+            n2 = np.where(core, n_core ** 2, n_clad ** 2).ravel()
+            second = sparse.diags([1.0, -2.0, 1.0], [-1, 0, 1], shape=(len(x), len(x))) / grid ** 2
+            identity = sparse.identity(len(x))
+            operator = sparse.kron(identity, second) + sparse.kron(second, identity) + sparse.diags(k0 ** 2 * n2)
+            beta2, vectors = eigsh(operator.tocsc(), k=self.modes, sigma=(k0 * n_core) ** 2, which="LM")
+            order = np.argsort(beta2)[::-1]
+            field = vectors[:, order].T.reshape(self.modes, len(y), len(x))
+            field /= np.sqrt(np.sum(field ** 2, axis=(1, 2), keepdims=True) * grid ** 2)
+            peak = field.reshape(self.modes, -1)[np.arange(self.modes), np.argmax(np.abs(field.reshape(self.modes, -1)), axis=1)]
+            field *= np.sign(peak)[:, None, None]
+            return {"neff": guided_neff(beta2[order], k0, n_clad), "x": x, "y": y, "field": field}
+
+        return self.lookup(self.key("channel", width, height, n_core, n_clad, wave, grid, window, self.modes), solve)
+
+    # === 由 .ind 与 symbol 覆盖值得到发射段截面参数 ===
+    # 函数名: design_section
+    # 参数:
+    #   ind_file  : .ind 文件路径
+    #   overrides : {symbol: value}，需包含或可推出 wave
+    # 返回:
+    #   {"dimension", "width", "height"（仅三维）, "n_core", "n_clad", "wave", "grid"}
+    def design_section(self, ind_file, overrides=None):
+        ind = load_ind(ind_file)
+        table = ind.evaluate(overrides)
+        launch = ind.launches[0] if ind.launches else {}
+        segment = {s["number"]: s for s in ind.segments}.get(ind.pathways[int(launch.get("launch_pathway", 1)) - 1][0], {}) if ind.pathways else {}
+        n_clad = float(table["background_index"])
+        section = {"dimension": ind.dimension,
+                   "width": float(table.value(segment.get("begin.width", "width"))),
+                   "n_core": n_clad + float(table.value(segment.get("begin.delta", "delta"))),
+                   "n_clad": n_clad,
+                   "wave": float(table["free_space_wavelength"]),
+                   "grid": float(table["grid_size"]) if "grid_size" in table else None}
+        if ind.dimension != 2:
+            section["height"] = float(table.value(segment.get("begin.height", "height")))
+        return section
+
+    # === 由 .ind 与 symbol 覆盖值得到发射段截面并求解 ===
+    # 函数名: design_mode
+    # 参数:
+    #   ind_file  : .ind 文件路径（dimension 2 → 平板，3 → 通道）
+    #   overrides : {symbol: value}，需包含或可推出 wave
+    # 返回:
+    #   模式求解结果字典（同 slab / channel）
+    def design_mode(self, ind_file, overrides=None):
+        s = self.design_section(ind_file, overrides)
+        if s["dimension"] == 2:
+            return self.slab(s["width"], s["n_core"], s["n_clad"], s["wave"], grid=s["grid"])
+        return self.channel(s["width"], s["height"], s["n_core"], s["n_clad"], s["wave"], grid=s["grid"])
+
+    # === 有效折射率表（symbol × 波长批量求解）===
+    # 函数名: neff_table
+    # 功能:
+    #   - 平板（2D）设计: 全部截面一次调用 slab_table，对称平板 TE 基模色散方程的向量化二分解（精确解，按截面缓存）
+    #   - 通道（3D）设计: 各截面分别做有限差分求解（稀疏本征问题无法合并），结果按截面哈希缓存
+    # 参数:
+    #   ind_file    : .ind 文件路径
+    #   symbol      : 扫描的截面参数名（如 "width"）
+    #   values      : 参数取值列表
+    #   wave_list   : 波长列表
+    #   result_path : 表格输出路径（None 时为 {ind}_neff.txt）
+    # 返回:
+    #   neff        : 列表矩阵 [values][wave]（基模）
+    def neff_table(self, ind_file, symbol, values, wave_list, result_path=None):
+        sections = [[self.design_section(ind_file, {symbol: value, "wave": wave}) for wave in wave_list] for value in values]
+        if sections and sections[0] and sections[0][0]["dimension"] == 2:
+            flat = [s for row in sections for s in row]
+            solved = slab_table(*(np.array([s[name] for s in flat]) for name in ("n_core", "n_clad", "width", "wave")))
+            neff = solved.reshape(len(values), len(wave_list)).tolist()
+        else:
+            neff = [[float(self.channel(s["width"], s["height"], s["n_core"], s["n_clad"], s["wave"], grid=s["grid"])["neff"][0])
+                     for s in row] for row in sections]
+        result_path = result_path or os.path.splitext(ind_file)[0] + "_neff.txt"
+        table_data = [[f"{symbol}/wave"] + list(wave_list)] + [[value] + [round(n, 6) for n in row] for value, row in zip(values, neff)]
+        with open(result_path, "w") as f:
+            f.write("neff:\n")
+            f.write(tabulate(table_data, tablefmt="plain") + "\n")
+        print(f"{result_path} 创建成功")
+        return neff
+
+    # === 写出发射段基模场文件（按截面哈希命名，已存在则直接复用）===
+    # 函数名: launch_file
+    # 返回:
+    #   path : 场文件路径
+    def launch_file(self, ind_file, overrides=None):
+        mode = self.design_mode(ind_file, overrides)
+        directory = self.cache_dir or os.path.dirname(os.path.abspath(ind_file))
+        path = os.path.join(directory, f"launch_{mode['key']}.fld")
+        if not os.path.isfile(path):
+            write_field(path, mode["x"], mode["field"][0], mode.get("y"))
+        return path
+
+    # === RsoftSimulation 任务钩子: 为每个任务提供 launch 文件覆盖 ===
+    # 函数名: launch_hook
+    # 参数:
+    #   symbol : .ind 中 launch_file 引用的 symbol 名（RsoftCad.add_launch(..., launch_file="$launch_file")）
+    # 返回:
+    #   hook(ind_file, symbol_values) → {symbol: 场文件路径}
+    def launch_hook(self, symbol="launch_file"):
+        def hook(ind_file, symbol_values):
+            return {symbol: self.launch_file(ind_file, symbol_values)}
+        return hook
@@ -0,0 +1,142 @@
+# ============================================================
+# 文件名称: RsoftMon.py
+# 模块功能: 读取 RSoft 监视器结果文件（.mon，每行: z 监视器1 监视器2 ...）
+# 功能概述:
+#   - last_record: 从文件末尾反向分块查找最后一条记录，与文件长度无关
+#   - read_trace : 整个文件批量解析为 NumPy 数组 (nz, 1 + n_monitor)
+#   - trace_shape: 只统计记录数与列数（用于预分配大数组）
+#   - 两种结果均按 (路径, 修改时间, 文件大小) 缓存，文件未变化时不重复读取
+#   - RecordCache: 最后一条记录的磁盘缓存（每个研究目录一个），重新分析时只读取新增或变化的文件
+# 依赖模块: os, numpy
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import numpy as np
+
+# === 缓存 {路径: ((mtime, size), 结果)} ===
+record_cache = {}
+trace_cache = {}
+
+# 反向读取时每次读取的字节数
+block_size = 4096
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
+
+
+# === 读取最后一条记录 ===
+# 函数名: last_record
+# 参数:
+#   path : .mon 文件路径
+# 返回:
+#   values : [z, P1, P2, ...]（浮点列表）
+def last_record(path):
+    stamp = file_stamp(path)
+    cached = record_cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    with open(path, "rb") as f:
+        position = stamp[1]
+        tail = b""
+        # 向前扩展读取窗口，直到窗口内包含一条完整的非空记录
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            tail = f.read(step) + tail
+            lines = tail.rstrip().split(b"\n")
+            if len(lines) > 1 or position == 0:
+                break
+    last_line = tail.rstrip().split(b"\n")[-1].decode()
+    values = [float(value) for value in last_line.split()]
+
+    record_cache[path] = (stamp, values)
+    return values
+
+
+# === 读取完整功率-传播距离曲线 ===
+# 函数名: read_trace
+# 参数:
+#   path  : .mon 文件路径
+#   cache : 是否写入缓存（批量转存大量曲线时关闭，避免全部驻留内存）
+# 返回:
+#   trace : NumPy 数组 (nz, 1 + n_monitor)，第 0 列为 z
+def read_trace(path, cache=True):
+    stamp = file_stamp(path)
+    cached = trace_cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    # numpy 的 C 语言文本解析器一次性解析全部行
+    trace = np.loadtxt(path, ndmin=2)
+
+    if cache:
+        trace_cache[path] = (stamp, trace)
+    return trace
+
+
+# === 统计记录数与列数（分块计数换行，不解析数值）===
+# 函数名: trace_shape
+# 返回:
+#   (nz, 1 + n_monitor)
+def trace_shape(path):
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1
+    return lines, len(last_record(path))
+
+
+# ============================================================
+# 类名: RecordCache
+# 功能: 研究目录内各 .mon 文件最后一条记录的持久缓存（{run_path}_records.npz）
+#       按 (文件名, 修改时间, 文件大小) 判断是否需要重新读取，跨进程、跨分析复用
+# ============================================================
+class RecordCache:
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.entries = {}
+        # changed: 尚未写回的读取数；reads: 本对象实际读取的文件数
+        self.changed = 0
+        self.reads = 0
+        if os.path.isfile(cache_path):
+            with np.load(cache_path) as data:
+                for name, stamp, values, count in zip(data["names"], data["stamps"], data["values"], data["counts"]):
+                    self.entries[str(name)] = ((float(stamp[0]), int(stamp[1])), values[:count].tolist())
+
+    # === 读取最后一条记录（文件未变化时直接取缓存）===
+    def record(self, path):
+        name = os.path.basename(path)
+        stamp = file_stamp(path)
+        entry = self.entries.get(name)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        values = last_record(path)
+        self.entries[name] = (stamp, values)
+        self.changed += 1
+        self.reads += 1
+        return values
+
+    # === 有新读取的文件时写回缓存 ===
+    def save(self):
+        if not self.changed:
+            return
+        names = list(self.entries)
+        width = max(len(values) for _, values in self.entries.values())
+        values = np.full((len(names), width), np.nan)
+        for k, name in enumerate(names):
+            values[k, :len(self.entries[name][1])] = self.entries[name][1]
+        temp_path = self.cache_path + ".tmp.npz"
+        np.savez(temp_path, names=np.array(names, dtype=str), stamps=np.array([self.entries[name][0] for name in names], dtype=float),
+                 values=values, counts=np.array([len(self.entries[name][1]) for name in names]))
+        os.replace(temp_path, self.cache_path)
+        self.changed = 0
@@ -0,0 +1,171 @@
+# ============================================================
+# 文件名称: RsoftOED.py
+# 模块功能: 正交设计（OEDsim）结果的极差分析与方差分析，预测最优水平组合并给出验证组合
+# 功能概述:
+#   - 响应值: 每个试验取 RsoftData 任一指标矩阵在 wave 与端口轴上的最大值（最坏情况，与 FOM 一致），越小越好
+#   - 极差分析: 各因素各水平的响应均值 K 与极差 R（bincount 向量化计算）
+#   - 方差分析: 各因素平方和、自由度、F 值、p 值与贡献率；误差自由度为 0（饱和设计）时将平方和最小的因素并入误差
+#   - 最优预测: 各因素取 K 最小的水平，按加性模型预测响应；按预测值给出未试验过的前 n 个组合供验证仿真
+# 依赖模块: numpy, scipy, tabulate
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import numpy as np
+from scipy.stats import f as f_distribution
+from tabulate import tabulate
+
+
+# === 每个试验（行）的响应值 ===
+# 函数名: study_response
+# 参数:
+#   data   : RsoftData 对象（行为试验，列为 wave）
+#   metric : 指标名（"mean" / "ELmax" / "IL" 等，对应 {metric}_matrix）
+# 返回:
+#   response : (rows,) 数组，未完成的试验为 nan
+def study_response(data, metric="mean"):
+    matrix = np.asarray(getattr(data, f"{metric}_matrix"), dtype=float)
+    with np.errstate(invalid="ignore"):
+        return matrix.reshape(data.rows, -1).max(axis=1)
+
+
+# ============================================================
+# 类名: OEDAnalysis
+# 功能: 正交设计结果分析
+# 属性:
+#   K          - (因素数, 最大水平数) 各水平响应均值（该因素没有的水平为 nan）
+#   R          - 各因素极差
+#   SS / df / F / p / contribution - 方差分析结果（并入误差的因素 F、p 为 nan）
+#   pooled     - 并入误差的因素（布尔数组）
+#   best       - 各因素最优水平的序号
+#   predicted  - 最优组合的预测响应
+# ============================================================
+class OEDAnalysis:
+    # ------------------------------------------------------------
+    # 构造函数: __init__
+    # 参数:
+    #   symbols  - 因素名列表
+    #   values   - 各因素的水平取值列表
+    #   design   - (试验数, 因素数) 各试验的水平序号
+    #   response - (试验数,) 各试验的响应值（nan 的试验不参与分析）
+    #   metric   - 响应所用的指标名（仅用于报告）
+    # ------------------------------------------------------------
+    def __init__(self, symbols, values, design, response, metric="mean"):
+        self.symbols = list(symbols)
+        self.values = [list(value) for value in values]
+        self.metric = metric
+        self.levels = np.array([len(value) for value in self.values])
+        design = np.asarray(design, dtype=int)
+        response = np.asarray(response, dtype=float)
+        finite = np.isfinite(response)
+        if finite.sum() < 2:
+            raise ValueError("OED analysis requires at least two finished runs")
+        self.design, self.response = design[finite], response[finite]
+        self.range_analysis()
+        self.anova()
+        self.predict()
+
+    # === 极差分析: 各水平响应均值 K 与极差 R ===
+    def range_analysis(self):
+        k, width = len(self.levels), self.levels.max()
+        # 因素 j 的水平 l 编码为 j * width + l，一次 bincount 得到全部水平的和与次数
+        codes = (self.design + np.arange(k) * width).ravel()
+        sums = np.bincount(codes, weights=np.repeat(self.response, k), minlength=k * width).reshape(k, width)
+        self.counts = np.bincount(codes, minlength=k * width).reshape(k, width)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.K = np.where(self.counts > 0, sums / self.counts, np.nan)
+        self.R = np.nanmax(self.K, axis=1) - np.nanmin(self.K, axis=1)
+
+    # === 方差分析（饱和设计时按平方和从小到大并入误差，直到误差自由度大于 0）===
+    def anova(self):
+        self.grand = self.response.mean()
+        self.SS = np.nansum(self.counts * (self.K - self.grand) ** 2, axis=1)
+        self.df = (self.counts > 0).sum(axis=1) - 1
+        self.SST = float(((self.response - self.grand) ** 2).sum())
+        self.pooled = np.zeros(len(self.levels), dtype=bool)
+        error_ss = max(self.SST - self.SS.sum(), 0.0)
+        error_df = len(self.response) - 1 - self.df.sum()
+        for j in np.argsort(self.SS):
+            if error_df > 0 or self.pooled.sum() == len(self.levels) - 1:
+                break
+            self.pooled[j] = True
+            error_ss += self.SS[j]
+            error_df += self.df[j]
+        self.error_ss, self.error_df = error_ss, error_df
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.F = np.where(self.pooled | (error_df <= 0), np.nan, (self.SS / self.df) / (error_ss / error_df))
+            self.contribution = self.SS / self.SST if self.SST > 0 else np.zeros(len(self.levels))
+        self.p = np.where(np.isnan(self.F), np.nan, f_distribution.sf(self.F, self.df, max(error_df, 1)))
+
+    # === 最优水平组合与加性模型预测（只计入未并入误差的因素）===
+    def predict(self):
+        self.best = np.nanargmin(self.K, axis=1)
+        effects = self.K[np.arange(len(self.levels)), self.best] - self.grand
+        self.predicted = float(self.grand + effects[~self.pooled].sum())
+
+    # === 预测响应最小的若干组合（排除已试验的组合）===
+    # 函数名: candidates
+    # 参数:
+    #   count : 返回的组合数
+    # 返回:
+    #   [(水平序号元组, 预测响应), ...]，按预测响应升序
+    # 说明:
+    #   加性模型下逐因素保留部分和最小的前 n 个组合即可得到全局前 n 个（束搜索，无需枚举全部组合）
+    def candidates(self, count):
+        tried = set(map(tuple, self.design.tolist()))
+        keep = count + len(tried)
+        effects = np.where(self.pooled[:, None], np.inf, self.K - self.grand)
+        effects[np.arange(len(self.levels)), self.best] = np.where(self.pooled, 0.0, effects[np.arange(len(self.levels)), self.best])
+        effects = np.where(np.isnan(effects), np.inf, effects)
+        partial = np.zeros(1)
+        combos = np.zeros((1, 0), dtype=int)
+        for j in range(len(self.levels)):
+            total = (partial[:, None] + effects[j][None, :self.levels[j]]).ravel()
+            order = np.argsort(total, kind="stable")[:keep]
+            order = order[np.isfinite(total[order])]
+            combos = np.hstack([combos[order // self.levels[j]], (order % self.levels[j])[:, None]])
+            partial = total[order]
+        return [(tuple(combo), float(self.grand + value)) for combo, value in zip(combos.tolist(), partial)
+                if tuple(combo) not in tried][:count]
+
+    # === 水平序号 → {因素: 取值} ===
+    def case(self, combo):
+        return {symbol: self.values[j][level] for j, (symbol, level) in enumerate(zip(self.symbols, combo))}
+
+    # === 分析报告（纯文本表格）===
+    # 参数:
+    #   confirmed : [(水平序号元组, 预测响应, 验证响应), ...] 验证仿真结果
+    # 返回:
+    #   text      : 极差分析表、方差分析表、最优组合与验证结果
+    def report(self, confirmed=()):
+        width = self.levels.max()
+        lines = [f"range analysis ({self.metric})"]
+        table = [["factor"] + [f"K{l + 1}" for l in range(width)] + ["R", "best"]]
+        for j, symbol in enumerate(self.symbols):
+            table.append([symbol] + [round(value, 4) if np.isfinite(value) else "" for value in self.K[j]]
+                         + [round(self.R[j], 4), self.values[j][self.best[j]]])
+        lines.append(tabulate(table, tablefmt="plain"))
+
+        lines.append(f"\nANOVA ({self.metric})")
+        table = [["source", "SS", "df", "MS", "F", "p", "contribution"]]
+        for j, symbol in enumerate(self.symbols):
+            if self.pooled[j]:
+                table.append([symbol + " (pooled)", round(self.SS[j], 4), self.df[j], "", "", "", f"{self.contribution[j]:.1%}"])
+            else:
+                table.append([symbol, round(self.SS[j], 4), self.df[j], round(self.SS[j] / self.df[j], 4),
+                              round(self.F[j], 4) if np.isfinite(self.F[j]) else "", round(self.p[j], 4) if np.isfinite(self.p[j]) else "",
+                              f"{self.contribution[j]:.1%}"])
+        error_ms = self.error_ss / self.error_df if self.error_df > 0 else np.nan
+        table.append(["error", round(self.error_ss, 4), self.error_df, round(error_ms, 4) if np.isfinite(error_ms) else "", "", "", ""])
+        table.append(["total", round(self.SST, 4), len(self.response) - 1, "", "", "", ""])
+        lines.append(tabulate(table, tablefmt="plain"))
+
+        optimum = ",".join(f"{symbol}={value}" for symbol, value in self.case(self.best).items())
+        lines.append(f"\npredicted optimum: {optimum},predicted={round(self.predicted, 4)}")
+        if confirmed:
+            lines.append("\nconfirmation")
+            table = [["confirm"] + self.symbols + ["predicted", self.metric]]
+            for i, (combo, predicted, measured) in enumerate(confirmed, 1):
+                table.append([i] + list(self.case(combo).values()) + [round(predicted, 4), round(measured, 4)])
+            lines.append(tabulate(table, tablefmt="plain"))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,96 @@
+# ============================================================
+# 文件名称: RsoftPlot.py
+# 模块功能: 后台绘图服务，研究结束后在进程池中并行生成性能图像，不阻塞仿真与分析流程
+# 功能概述:
+#   - 绘图进程使用非交互的 Agg 后端，每张图保存后立即释放
+#   - 预览模式: 低分辨率（默认 60 dpi）写入 {run_path}_preview.png，秒级完成
+#   - 全分辨率导出（默认 600 dpi，写入 {run_path}_result.png）仅在 export() 时进行
+#   - 多个研究的图像批量提交，由进程池并发渲染
+# 注意:
+#   - 进程池在 fork 启动方式（Linux）下默认启用；Windows 为 spawn 启动方式，子进程会重新导入主脚本，
+#     需将主脚本置于 if __name__ == "__main__": 下后以 processes=True 启用，否则使用线程池
+# 依赖模块: multiprocessing, concurrent.futures, matplotlib
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import matplotlib
+
+
+# === 绘图进程初始化: 非交互后端 ===
+def init_worker():
+    matplotlib.use("Agg")
+
+
+# === 在绘图进程中渲染一个研究的总览图 ===
+def render(view, dpi, save_path):
+    return view.plot_all(dpi=dpi, save_path=save_path)
+
+
+# ============================================================
+# 类名: PlotService
+# 功能: 绘图任务池（预览 / 全分辨率导出）
+# ============================================================
+class PlotService:
+    # ------------------------------------------------------------
+    # 构造函数: __init__
+    # 参数:
+    #   max_workers - 并发绘图数
+    #   preview_dpi - 预览图分辨率
+    #   dpi         - 全分辨率导出的分辨率
+    #   processes   - True 进程池 / False 线程池 / None 按启动方式自动选择（fork 时使用进程池）
+    # ------------------------------------------------------------
+    def __init__(self, max_workers=2, preview_dpi=60, dpi=600, processes=None):
+        self.preview_dpi = preview_dpi
+        self.dpi = dpi
+        if processes is None:
+            processes = multiprocessing.get_start_method() == "fork"
+        if processes:
+            self.pool = ProcessPoolExecutor(max_workers, initializer=init_worker)
+        else:
+            self.pool = ThreadPoolExecutor(max_workers)
+        self.futures = []
+        # 已提交研究的作图数据 {file_path: view}，供之后全分辨率导出
+        self.views = {}
+
+    # === 提交一个研究的作图任务（立即返回）===
+    # 函数名: submit
+    # 参数:
+    #   data    : RsoftData 对象（需为多点研究）
+    #   preview : True 生成低分辨率预览图，False 生成全分辨率图
+    # 返回:
+    #   future  : 结果为图像路径
+    def submit(self, data, preview=True):
+        view = data.plot_view()
+        self.views[view.file_path] = view
+        return self.render(view, preview)
+
+    def render(self, view, preview):
+        if preview:
+            future = self.pool.submit(render, view, self.preview_dpi, view.file_path + "_preview.png")
+        else:
+            future = self.pool.submit(render, view, self.dpi, view.file_path + "_result.png")
+        self.futures.append(future)
+        return future
+
+    # === 全分辨率导出（默认为全部已提交的研究，批量并发渲染）===
+    # 参数:
+    #   paths : 研究结果目录列表（None 为全部）
+    # 返回:
+    #   futures
+    def export(self, paths=None):
+        paths = list(self.views) if paths is None else paths
+        return [self.render(self.views[path], preview=False) for path in paths]
+
+    # === 等待已提交的作图任务完成 ===
+    # 返回:
+    #   save_paths : 生成的图像路径列表（任务异常在此处抛出）
+    def wait(self):
+        futures, self.futures = self.futures, []
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        self.wait()
+        self.pool.shutdown()
@@ -0,0 +1,131 @@
+# ============================================================
+# 文件名称: RsoftScreen.py
+# 模块功能: 全局灵敏度筛选（Morris 基本效应法），在优化前剔除影响小的参数
+# 功能概述:
+#   - 每个参数以其候选值列表为 Morris 网格（p 个水平，步长 p//2 个水平）
+#   - r 条轨迹，每条从随机基点出发按随机顺序逐个改变参数，共 r(k+1) 个点（重复点只仿真一次）
+#   - 基本效应按归一化步长计算，μ*（|EE| 均值）衡量影响大小，σ 衡量非线性 / 交互作用
+#   - μ* 不小于最大值 threshold 倍的参数保留，并按各水平的边际平均响应给出缩小后的取值范围
+# 依赖模块: numpy, tabulate
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import numpy as np
+from tabulate import tabulate
+
+
+# ============================================================
+# 类名: MorrisScreening
+# 功能: Morris 轨迹设计与基本效应分析
+# 属性:
+#   points     - (n_point, k) 需仿真的全部不重复点（各参数的水平序号）
+#   mu_star    - 各参数 |EE| 均值（analyze 后）
+#   mu / sigma - 各参数 EE 均值与标准差
+#   keep       - 保留的参数（布尔数组）
+#   suggested  - 各参数建议的取值列表（保留参数为缩小后的范围，剔除参数为单个最优值）
+# ============================================================
+class MorrisScreening:
+    # ------------------------------------------------------------
+    # 构造函数: __init__
+    # 参数:
+    #   symbols      - 参数名列表
+    #   values       - 各参数的候选值列表（至少 2 个）
+    #   trajectories - 轨迹数 r
+    #   seed         - 随机数种子
+    # ------------------------------------------------------------
+    def __init__(self, symbols, values, trajectories=4, seed=None):
+        self.symbols = list(symbols)
+        self.values = [list(value) for value in values]
+        self.levels = np.array([len(value) for value in self.values])
+        if (self.levels < 2).any():
+            raise ValueError("Morris screening requires at least two candidate values per symbol")
+        self.jump = self.levels // 2
+        rng = np.random.default_rng(seed)
+        k = len(self.symbols)
+
+        # === 轨迹: 基点取能向所选方向移动一个步长的水平，各参数按随机顺序依次移动 ===
+        direction = np.where(rng.random((trajectories, k)) < 0.5, 1, -1)
+        low = np.where(direction > 0, 0, self.jump)
+        high = np.where(direction > 0, self.levels - 1 - self.jump, self.levels - 1)
+        base = low + np.floor(rng.random((trajectories, k)) * (high - low + 1)).astype(int)
+        self.order = np.argsort(rng.random((trajectories, k)), axis=1)
+        steps = np.zeros((trajectories, k, k), dtype=int)
+        steps[np.arange(trajectories)[:, None], np.arange(k)[None, :], self.order] = (direction * self.jump)[
+            np.arange(trajectories)[:, None], self.order]
+        self.trajectories = np.concatenate([base[:, None, :], base[:, None, :] + np.cumsum(steps, axis=1)], axis=1)
+        self.step = np.take_along_axis(direction * self.jump, self.order, axis=1)
+
+        # 不重复的仿真点，index[t, j] 为轨迹 t 第 j 个点在 points 中的序号
+        self.points, index = np.unique(self.trajectories.reshape(-1, k), axis=0, return_inverse=True)
+        self.index = index.reshape(trajectories, k + 1)
+
+    # === 水平序号 → 取值 ===
+    def case(self, point):
+        return {symbol: self.values[j][level] for j, (symbol, level) in enumerate(zip(self.symbols, point))}
+
+    # === 基本效应分析 ===
+    # 函数名: analyze
+    # 参数:
+    #   response  : (n_point,) 各仿真点的响应值（越小越好）
+    #   threshold : μ* 不小于最大值的 threshold 倍的参数保留（至少保留一个）
+    #   window    : 建议范围包含边际平均响应不超过 min + window × (max - min) 的水平
+    # 返回: 无（结果存入属性）
+    def analyze(self, response, threshold=0.1, window=0.5):
+        response = np.asarray(response, dtype=float)
+        y = response[self.index]
+        k = len(self.symbols)
+        # EE = Δy / 归一化步长（步长占该参数全范围的比例），按移动的参数归位
+        ee = np.empty(self.order.shape)
+        np.put_along_axis(ee, self.order, np.diff(y, axis=1) / (self.step / (self.levels[self.order] - 1)), axis=1)
+        self.ee = ee
+        self.mu = np.nanmean(ee, axis=0)
+        self.mu_star = np.nanmean(np.abs(ee), axis=0)
+        self.sigma = np.nanstd(ee, axis=0, ddof=1) if len(ee) > 1 else np.zeros(k)
+        self.rank = np.argsort(np.argsort(-self.mu_star)) + 1
+        self.keep = self.mu_star >= threshold * np.nanmax(self.mu_star)
+        if not self.keep.any():
+            self.keep[np.nanargmax(self.mu_star)] = True
+
+        # === 建议取值: 各水平的边际平均响应（只含仿真过的点）===
+        finite = np.isfinite(response)
+        best_point = self.points[np.nanargmin(response)]
+        self.best = self.case(best_point)
+        self.suggested = []
+        for j in range(k):
+            if not self.keep[j]:
+                self.suggested.append([self.values[j][best_point[j]]])
+                continue
+            counts = np.bincount(self.points[finite, j], minlength=self.levels[j])
+            sums = np.bincount(self.points[finite, j], weights=response[finite], minlength=self.levels[j])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                means = np.where(counts > 0, sums / counts, np.nan)
+            low, high = np.nanmin(means), np.nanmax(means)
+            good = np.flatnonzero(means <= low + window * (high - low))
+            start, stop = good.min(), good.max()
+            # 范围至少包含 2 个候选值
+            if start == stop:
+                start, stop = max(start - 1, 0), min(stop + 1, self.levels[j] - 1)
+            self.suggested.append(self.values[j][start:stop + 1])
+
+    # === 剪枝后的参数列表（可直接用于 Optimize / OEDsim，wave 需另行追加）===
+    # 返回:
+    #   (symbols, values, fixed) : 保留的参数名、建议取值列表、{剔除的参数: 筛选中的最优值}
+    def pruned(self):
+        symbols = [symbol for symbol, keep in zip(self.symbols, self.keep) if keep]
+        values = [value for value, keep in zip(self.suggested, self.keep) if keep]
+        fixed = {symbol: value[0] for symbol, value, keep in zip(self.symbols, self.suggested, self.keep) if not keep}
+        return symbols, values, fixed
+
+    # === 筛选报告（纯文本表格）===
+    def report(self, metric="mean"):
+        table = [["symbol", "mu*", "mu", "sigma", "rank", "keep", "suggested"]]
+        for j in np.argsort(self.rank):
+            suggested = self.suggested[j]
+            table.append([self.symbols[j], round(self.mu_star[j], 4), round(self.mu[j], 4), round(self.sigma[j], 4), self.rank[j],
+                          "yes" if self.keep[j] else "no",
+                          f"{suggested[0]}..{suggested[-1]} ({len(suggested)})" if self.keep[j] else suggested[0]])
+        lines = [f"Morris screening ({metric}, {len(self.index)} trajectories, {len(self.points)} points)",
+                 tabulate(table, tablefmt="plain"),
+                 "best: " + ",".join(f"{symbol}={value}" for symbol, value in self.best.items())]
+        return "\n".join(lines) + "\n"
@@ -4,21 +4,40 @@
 # 支持功能:
 #   - 单次仿真 Sim
 #   - 参数扫描 Scan（支持双参数）
-#   - 多参数级联优化 Optimize
-#   - 自动窗口最小化、许可证弹窗处理、并发仿真调度
+#   - 多参数级联优化 Optimize（优化目标可由 FOM 表达式自定义，见 RsoftFOM）
+#   - 多保真度筛选 MultiFidelity（粗网格预扫 + 细网格确认）
+#   - 网格收敛性研究 Converge（结果按设计族与波长范围缓存，后续仿真自动使用）
+#   - 三维设计的有效折射率降维 Reduce2D / Restore3D（二维模型快速预筛）
+#   - 自动窗口最小化、许可证弹窗处理（共享的事件驱动监视线程，Linux / 离线求解器为无操作后端，见 RsoftDesktop）、并发仿真调度
+#   - 研究结束后的性能图像由后台绘图服务生成（默认低分辨率预览，export_plots 导出全分辨率）
+#   - 任务完成即流式汇总（LiveStudy），研究进行中可查看 {研究目录}_live.json 中的进度与当前最优点
+#   - 正交设计 OEDsim 结果的极差分析、方差分析与最优组合的自动验证仿真（见 RsoftOED）
+#   - 工艺容差蒙特卡洛良率分析 Yield（拉丁超立方抽样、流式统计、置信区间达标即提前结束，见 RsoftYield）
+#   - 优化前的全局灵敏度筛选 Screen（Morris 基本效应法，剔除影响小的参数并缩小取值范围，见 RsoftScreen）
+#   - 批量求解（batch_mode="on"，仅限可读取任务文件的求解器如 RsoftBPM）: 多个短任务合并为一次求解器调用，按预测耗时确定每批任务数
+#   - 分片目录布局（layout="sharded"）与求解器输出的保留策略（retention，只保留 .mon / 最优设计 / 逐任务归档，见 RsoftLayout）
 # 作者单位: 中南大学机电工程学院 郑煜教授课题组
 # 撰写作者: 2022届硕士研究生 万强伟
 # ============================================================
 
 import subprocess
 import time
-import win32gui
-import win32con
-import threading
 from concurrent.futures import ThreadPoolExecutor
-import pyautogui
 import shutil
+import shlex
+import json
+import itertools
+from math import sqrt, atanh, tanh, erfc
 from RsoftData import *
+from RsoftStore import *
+from RsoftPlot import *
+from RsoftLive import *
+from RsoftOED import *
+from RsoftYield import *
+from RsoftScreen import *
+from RsoftEIM import *
+from RsoftDesktop import *
+from RsoftLayout import *
 from OAT import *
 
 
@@ -29,27 +48,86 @@ class RsoftSimulation:
     #   file_name        : ind 文件名称（不含后缀）
     #   max_workers      : 最大并发仿真数量
     #   window_minimize  : 是否最小化仿真窗口（"on"/"off"）
-    def __init__(self, file_path=str, file_name=str, max_workers=int, window_minimize="on"):
+    #   family           : 设计族名称（网格缓存的键，默认与 file_name 相同）
+    #   solver           : 求解器命令（默认 "bsimw32"，离线预筛可用 RsoftBPM.bpm_command）
+    #   desktop          : 桌面交互后端（"auto" / "headless" / "windows" 或后端对象，见 RsoftDesktop.make_desktop）
+    def __init__(self, file_path=str, file_name=str, max_workers=int, window_minimize="on", family=None, solver="bsimw32", desktop="auto"):
         self.file_name = file_name
         self.file_path = file_path
-        self.file = file_path + "\\" + self.file_name + ".ind"  # 拼接完整文件路径
+        self.file = os.path.join(file_path, self.file_name + ".ind")  # 拼接完整文件路径
         self.max_workers = max_workers
         self.window_minimize = window_minimize
+        self.solver = solver
 
         # 创建并发线程池（最多 max_workers 个任务同时进行）
         self.command_pool = ThreadPoolExecutor(max_workers=self.max_workers)
 
-        # 最小化窗口的控制标志，只在第一次运行时多次尝试
-        self.first_minimize = True
+        # 桌面交互后端: 所有任务共享一个窗口监视线程（无头环境下不创建线程）
+        self.desktop = make_desktop(desktop, solver, window_minimize == "on")
         self.mailnum = 0
 
+        # 全局 symbol 覆盖（如粗化后的 grid_size / step_size），追加到每条仿真命令末尾
+        self.overrides = {}
+
+        # 网格收敛缓存：{设计族: {"波长下限_波长上限": {grid_size, grid_size_y, step_size, ...}}}
+        self.family = family if family is not None else file_name
+        self.grid_cache_file = os.path.join(file_path, "grid_cache.json")
+        self.grid_cache = {}
+        if os.path.isfile(self.grid_cache_file):
+            with open(self.grid_cache_file, "r") as f:
+                self.grid_cache = json.load(f)
+        self.design_wave = {}
+
+        # 任务级覆盖钩子: hook(ind_file, {symbol: value}) → {symbol: value}（如 EIM 的 delta_eim）
+        self.job_hooks = []
+
+        # 结果存储: 每个研究目录一个 ResultStore，任务完成即追加；catalog 为 None 时不登记项目目录
+        self.stores = {}
+        self.store_traces = False
+        self.catalog = os.path.join(file_path, "results_catalog.json")
+
+        # 优化过程中以惰性模式分析的各轮结果，研究结束时统一输出表格与图像
+        self.pending_reports = []
+
+        # 绘图: "preview" 后台生成低分辨率预览图，"full" 后台生成全分辨率图，"off" 不作图
+        # （绘图服务在首次作图时创建，可预先赋值 PlotService(...) 以指定并发数、分辨率或进程池）
+        self.plot_mode = "preview"
+        self.plot_service = None
+
+        # 任务完成钩子: hook(run_path, run_prefix, symbol_values, power)，在线程池中任务结束后立即调用
+        self.completion_hooks = []
+        # 流式汇总: 每个研究一个 LiveStudy，live_interval 为汇总文件最短写出间隔（秒），None 时不启用
+        self.live_interval = 5.0
+        self.live = {}
+        self.live_done = {}
+
+        # 批量求解: batch_mode 为 "on" 时同一研究的任务在 wait_Scan / wait_completion 时按批合并为一次求解器调用，
+        # 每批任务数按预测的单任务耗时确定（每批约 batch_target 秒，不超过 batch_max，且保证各线程都有批次）
+        # batch_interface: "jobs" 求解器读取任务文件（jobs=路径，如 RsoftBPM）；None 求解器没有多任务接口。
+        # bsimw32 每次调用只能运行一个任务，批量求解无法节省进程启动与许可证签出，只会把并行任务串行化，
+        # 因此 batch_interface 为 None 时 batch_mode="on" 在提交任务时报错
+        self.batch_mode = "off"
+        self.batch_target = 60.0
+        self.batch_max = 32
+        self.batch_interface = "jobs" if "RsoftBPM" in solver else None
+        self.batch_queue = {}
+        self.batch_count = 0
+        # 各 ind 文件的单任务耗时估计（秒，指数平均）
+        self.job_cost = {}
+
+        # 目录布局: "flat" 全部任务输出在研究目录下（前缀即文件名），"sharded" 按前缀哈希分入 256 个子目录并使用短前缀
+        # 保留策略: "all" / "mon" / "top"（保留最优 retention_top 个设计的全部输出）/ "archive"，见 RsoftLayout
+        self.layout = "flat"
+        self.retention = "all"
+        self.retention_top = 3
+        self.outputs = {}
+
 
     # === 启动 RSoft 仿真命令，并自动处理窗口与许可证 ===
     # 函数名: run_command
     # 功能:
     #   - 启动系统命令运行 RSoft 仿真
-    #   - 最小化仿真窗口（可选）
-    #   - 启动后台线程监控许可证弹窗
+    #   - 窗口最小化与许可证弹窗由共享的桌面交互后端在窗口出现时处理，任务本身不等待
     # 参数:
     #   command  : 系统命令字符串（如 bsimw32 xxx.ind prefix=xxx ...）
     #   work_dir : 命令执行的工作目录（仿真路径）
@@ -57,79 +135,33 @@ class RsoftSimulation:
     def run_command(self, command, work_dir):
         print(f"启动命令: {command}")
 
-        # 启动子进程运行命令
-        process = subprocess.Popen(command, shell=True, cwd=work_dir)
-
-        # 启动后台守护线程监测并点击许可证窗口（Query）
-        Query_thread = threading.Thread(
-            target=self.detect_and_click_query_window,
-            args=('Query', 410, 523),
-            daemon=True  # 守护线程，主程序退出则自动关闭
-        )
-        Query_thread.start()
+        # 确保窗口监视已就绪，求解器创建的窗口都能被处理
+        self.desktop.job_started()
 
-
-        # 可选：最小化所有包含 "Computation" 的窗口
-        if self.window_minimize == "on":
-            self.minimize_rsoft_window()
+        # 启动子进程运行命令
+        # Windows 下经 cmd 解析；其他平台按 POSIX 规则拆分参数，避免前缀中的括号被 shell 解释
+        if os.name == "nt":
+            process = subprocess.Popen(command, shell=True, cwd=work_dir)
+        else:
+            process = subprocess.Popen(shlex.split(command), cwd=work_dir)
 
         # 等待仿真进程结束
         process.wait()
 
 
-    # === 扫描所有窗口，匹配包含特定标题的窗口并最小化 ===
-    # 函数名: minimize_rsoft_window
-    # 功能:
-    #   - 最小化所有窗口标题包含指定字符串的窗口（默认为“Computation”）
-    #   - 仅在第一次调用时进行 self.max_workers+1 次尝试，之后仅尝试 2 次
-    # 参数:
-    #   window_title_part : 匹配窗口标题的关键字（默认 "Computation"）
-    # 返回: 无
-    def minimize_rsoft_window(self, window_title_part="Computation"):
-        def callback(hwnd, _):
-            if window_title_part in win32gui.GetWindowText(hwnd):
-                win32gui.ShowWindow(hwnd, win32con.SW_MINIMIZE)
-        # 控制尝试次数
-        if self.first_minimize:
-            repeat_times = self.max_workers + 1
-            self.first_minimize = False
-        else:
-            repeat_times = 2
-        for _ in range(repeat_times):
-            win32gui.EnumWindows(callback, None)
-            time.sleep(1.5)
-
-
-    # === 检测是否弹出“Query”窗口，点击“否”自动关闭 ===
-    # 函数名: detect_and_click_query_window
-    # 功能:
-    #   - 定期扫描是否存在名为 title 的窗口
-    #   - 若存在则在相对坐标 (rel_x, rel_y) 模拟鼠标点击
-    # 参数:
-    #   title    : 窗口标题完整匹配（如 "Query"）
-    #   rel_x    : 相对左上角 X 坐标（用于点击“否”按钮）
-    #   rel_y    : 相对左上角 Y 坐标
-    #   interval : 检查间隔时间（秒）
-    def detect_and_click_query_window(self, title, rel_x, rel_y, interval=10):
-        while True:
-            hwnd = win32gui.FindWindow(None, title)
-            if hwnd:
-                # 获取窗口左上角坐标
-                left, top, _, _ = win32gui.GetWindowRect(hwnd)
-                abs_x, abs_y = left + rel_x, top + rel_y
-                pyautogui.moveTo(abs_x, abs_y)
-                pyautogui.click()
-                print(f"点击窗口 '{title}' 内相对坐标 ({rel_x}, {rel_y})的‘否’，屏幕坐标 ({abs_x}, {abs_y})")
-                break
-            time.sleep(interval)
-
-
     # === 等待当前线程池中所有任务完成 ===
     # 函数名: wait_completion
     # 功能: 阻塞直到所有仿真命令结束
     # 返回: 无
     def wait_completion(self):
+        self.flush_batches()
         self.command_pool.shutdown(wait=True)
+        self.close_stores()
+        self.close_live()
+        self.close_outputs()
+        self.desktop.close()
+        if self.plot_service is not None:
+            self.plot_service.wait()
         print("所有命令执行完毕")
 
 
@@ -140,10 +172,13 @@ class RsoftSimulation:
     #   - 重建线程池，为下一轮仿真做准备
     # 返回: 无
     def wait_Scan(self):
+        self.flush_batches()
         self.command_pool.shutdown(wait=True)
+        self.close_stores()
+        self.close_live()
+        self.close_outputs()
         print("Scan命令执行完毕")
         self.command_pool = ThreadPoolExecutor(self.max_workers)
-        self.first_minimize = True
 
 
     # === 生成格式化字符串，确保 valuelist 中所有值输出宽度一致 ===
@@ -181,6 +216,251 @@ class RsoftSimulation:
         return format_str
 
 
+    # === 构造求解器仿真命令 ===
+    # 函数名: build_command
+    # 功能:
+    #   - 拼接求解器、ind 文件、输出前缀与 symbol=value 参数
+    #   - 追加 self.overrides 中的全局覆盖及网格收敛缓存（优先级: 任务 symbol > 钩子 > overrides > 缓存）
+    # 参数:
+    #   ind_file      : ind 文件路径
+    #   run_prefix    : 仿真输出前缀
+    #   symbol_values : [(symbol, value), ...] 任务参数列表
+    # 返回:
+    #   commend       : 完整命令字符串
+    def build_command(self, ind_file, run_prefix, symbol_values):
+        return self.solver + " " + ind_file + " " + self.build_arguments(ind_file, run_prefix, symbol_values)
+
+    # === 单个任务的求解器参数（prefix=... symbol=value ...，批量求解时写入任务文件或驱动脚本）===
+    def build_arguments(self, ind_file, run_prefix, symbol_values):
+        symbol_values = list(symbol_values)
+        job_symbols = {symbol for symbol, _ in symbol_values}
+        overrides = {**self.cached_grid(ind_file, dict(symbol_values).get("wave")), **self.overrides}
+        for hook in self.job_hooks:
+            overrides.update(hook(ind_file, {**overrides, **dict(symbol_values)}))
+        symbol_values += [(k, v) for k, v in overrides.items() if k not in job_symbols]
+        arguments = "prefix=" + run_prefix
+        if symbol_values:
+            arguments += " " + " ".join(f"{symbol}={value}" for symbol, value in symbol_values)
+        return arguments
+
+
+    # === 任务的输出位置 ===
+    # 函数名: job_location
+    # 参数:
+    #   run_path   : 仿真结果目录
+    #   run_prefix : 逻辑前缀（研究清单、结果存储与流式汇总中使用）
+    # 返回:
+    #   (work_dir, solver_prefix) : 求解器工作目录与输出前缀（结果文件为 work_dir/solver_prefix.mon）
+    def job_location(self, run_path, run_prefix):
+        if self.layout == "sharded":
+            shard, short = shard_name(run_prefix)
+            return os.path.join(run_path, shard), short
+        return run_path, run_prefix
+
+
+    # === 提交一个仿真任务（写入研究清单，完成后结果追加到该研究的 ResultStore）===
+    # 函数名: submit_job
+    # 参数:
+    #   ind_file      : ind 文件路径
+    #   run_path      : 仿真结果目录
+    #   run_prefix    : 仿真输出前缀
+    #   symbol_values : [(symbol, value), ...] 任务参数列表
+    #   fom           : 研究的品质因数表达式（用于流式汇总的当前最优点）
+    # 返回:
+    #   future        : 线程池任务对象（批量求解模式下任务进入批次队列，返回 None）
+    def submit_job(self, ind_file, run_path, run_prefix, symbol_values, fom=None):
+        if self.batch_mode == "on" and self.batch_interface != "jobs":
+            raise ValueError(f"batch_mode='on' requires a solver that reads a jobs file (batch_interface='jobs'); "
+                             f"{self.solver} runs one job per process, so batching would only serialise jobs")
+        symbol_values = list(symbol_values)
+        work_dir, solver_prefix = self.job_location(run_path, run_prefix)
+        mon = None
+        if work_dir != run_path:
+            os.makedirs(work_dir, exist_ok=True)
+            mon = os.path.relpath(os.path.join(work_dir, solver_prefix), run_path).replace(os.sep, "/")
+            # 任务文件中的任务都在研究目录下运行，前缀带分片子目录
+            if self.batch_mode == "on":
+                solver_prefix = mon
+            mon += ".mon"
+        arguments = self.build_arguments(ind_file, solver_prefix, symbol_values)
+        if run_path not in self.stores:
+            # 新研究开始，清空同目录下的旧存储与清单
+            self.stores[run_path] = ResultStore(run_path)
+            self.stores[run_path].reset()
+            reset_manifest(run_path)
+            self.outputs[run_path] = StudyOutputs(run_path, self.retention, self.retention_top, fom)
+            if self.live_interval is not None:
+                self.live[run_path] = LiveStudy(run_path, fom, self.live_interval)
+        append_manifest(run_path, run_prefix, symbol_values, mon)
+        if self.batch_mode == "on":
+            self.batch_queue.setdefault((run_path, ind_file), []).append((run_prefix, symbol_values, arguments))
+            return None
+        commend = self.solver + " " + ind_file + " " + arguments
+        return self.command_pool.submit(self.run_job, commend, run_path, ind_file, run_prefix, symbol_values)
+
+
+    # === 线程池中执行的任务: 运行求解器并记录结果 ===
+    def run_job(self, commend, run_path, ind_file, run_prefix, symbol_values):
+        start = time.time()
+        self.run_command(commend, self.job_location(run_path, run_prefix)[0])
+        elapsed = time.time() - start
+        self.update_cost(ind_file, elapsed)
+        self.record_job(commend, run_path, ind_file, run_prefix, symbol_values, elapsed)
+
+
+    # === 将批次队列中的任务按批提交到线程池 ===
+    # 函数名: flush_batches
+    # 功能: 每个 (研究目录, ind 文件) 的任务按 batch_size 分批，每批一次求解器调用
+    # 返回: 无
+    def flush_batches(self):
+        queue, self.batch_queue = self.batch_queue, {}
+        for (run_path, ind_file), jobs in queue.items():
+            size = self.batch_size(ind_file, len(jobs))
+            for start in range(0, len(jobs), size):
+                self.batch_count += 1
+                self.command_pool.submit(self.run_batch, run_path, ind_file, jobs[start:start + size], f"batch_{self.batch_count:04d}")
+
+
+    # === 每批任务数 ===
+    # 函数名: batch_size
+    # 参数:
+    #   ind_file : ind 文件路径（按文件记录的单任务耗时预测）
+    #   n        : 待提交的任务数
+    # 返回:
+    #   size     : 每批任务数（无耗时记录时将任务平均分给各线程）
+    def batch_size(self, ind_file, n):
+        balanced = -(-n // self.max_workers)
+        cost = self.job_cost.get(ind_file)
+        size = balanced if cost is None else max(1, int(self.batch_target / max(cost, 1e-3)))
+        return int(max(1, min(size, balanced, self.batch_max)))
+
+
+    # === 更新单任务耗时估计（指数平均）===
+    def update_cost(self, ind_file, elapsed):
+        cost = self.job_cost.get(ind_file)
+        self.job_cost[ind_file] = elapsed if cost is None else 0.5 * cost + 0.5 * elapsed
+
+
+    # === 线程池中执行的批次: 生成任务文件，一次调用求解器完成全部任务，再逐个记录结果 ===
+    # 函数名: run_batch
+    # 参数:
+    #   run_path : 仿真结果目录（各任务按自身前缀输出到此目录或其分片子目录，与逐个调用时相同）
+    #   ind_file : ind 文件路径
+    #   jobs     : [(run_prefix, symbol_values, arguments), ...]
+    #   name     : 批次名（任务文件名，完成后删除）
+    def run_batch(self, run_path, ind_file, jobs, name):
+        commands = [self.solver + " " + ind_file + " " + arguments for _, _, arguments in jobs]
+        # 任务文件中的前缀已带分片子目录，统一在研究目录下运行
+        batch_file = None
+        commend = commands[0]
+        if len(jobs) > 1:
+            batch_file = os.path.join(run_path, name + ".jobs")
+            with open(batch_file, "w") as f:
+                f.writelines(arguments + "\n" for _, _, arguments in jobs)
+            commend = self.solver + " " + ind_file + " jobs=" + batch_file
+
+        start = time.time()
+        self.run_command(commend, run_path)
+        elapsed = (time.time() - start) / len(jobs)
+        self.update_cost(ind_file, elapsed)
+        if batch_file is not None and os.path.isfile(batch_file):
+            os.remove(batch_file)
+        for (run_prefix, symbol_values, _), command in zip(jobs, commands):
+            self.record_job(command, run_path, ind_file, run_prefix, symbol_values, elapsed)
+
+
+    # === 记录一个已完成任务: 追加到结果存储，并入流式汇总，调用完成钩子 ===
+    def record_job(self, commend, run_path, ind_file, run_prefix, symbol_values, elapsed):
+        wave = dict(symbol_values).get("wave")
+        if wave is None:
+            if ind_file not in self.design_wave:
+                self.design_wave[ind_file] = self.read_symbol(ind_file, "wave")
+            wave = self.design_wave[ind_file]
+        work_dir, solver_prefix = self.job_location(run_path, run_prefix)
+        mon_path = os.path.join(work_dir, solver_prefix + ".mon")
+        power = self.stores[run_path].append(run_prefix, symbol_values, wave, mon_path, elapsed, ind_file, commend)
+        self.outputs[run_path].job_done(run_prefix, mon_path)
+        if run_path in self.live:
+            self.live[run_path].add(run_prefix, power)
+        for hook in self.completion_hooks:
+            hook(run_path, run_prefix, symbol_values, power)
+
+
+    # === 压缩所有已结束研究的存储并登记到项目目录 ===
+    def close_stores(self):
+        for store in self.stores.values():
+            store.flush(traces=self.store_traces)
+            if self.catalog is not None:
+                update_catalog(self.catalog, store)
+        self.stores = {}
+
+
+    # === 结束所有流式汇总，保留其结果供研究分析直接使用 ===
+    def close_live(self):
+        for run_path, live in self.live.items():
+            live.finish()
+            self.live_done[run_path] = live
+        self.live = {}
+
+
+    # === 结束所有研究的输出保留策略（关闭归档；"top" 策略在此按研究结果删除最优设计以外的输出）===
+    def close_outputs(self):
+        for run_path, outputs in self.outputs.items():
+            data = None
+            if outputs.policy == "top":
+                live = self.live_done.get(run_path)
+                data = live.data if live is not None and live.fom == outputs.fom else RsoftData(run_path, fom=outputs.fom, lazy=True)
+            outputs.finish(data)
+            if outputs.removed[0]:
+                print(f"{run_path}: 清理输出文件 {outputs.removed[0]} 个，{outputs.removed[1] / 2 ** 20:.1f} MB")
+        self.outputs = {}
+
+
+    # === 研究结果对象: 流式汇总已覆盖全部任务时直接使用，否则从结果存储读取（惰性模式）===
+    # 函数名: study_data
+    # 参数:
+    #   run_path : 研究结果目录
+    #   fom      : 品质因数表达式
+    # 返回:
+    #   data     : RsoftData 对象
+    def study_data(self, run_path, fom=None):
+        live = self.live_done.pop(run_path, None)
+        if live is not None and live.fom == fom and live.data is not None and live.data.rows * live.data.cols > 1:
+            return live.data
+        return RsoftData(run_path, fom=fom, lazy=True)
+
+
+    # === 查询网格收敛缓存 ===
+    # 函数名: cached_grid
+    # 功能:
+    #   - 在当前设计族的缓存中查找波长范围包含 wave 的网格设置
+    #   - 多个范围同时命中时取最细（grid_size 最小）的设置
+    # 参数:
+    #   ind_file : ind 文件路径（wave 为 None 时读取其中的 wave 值）
+    #   wave     : 任务波长，None 表示使用 ind 文件默认波长
+    # 返回:
+    #   grid     : {"grid_size": .., "grid_size_y": .., "step_size": ..}，未命中时为空字典
+    def cached_grid(self, ind_file, wave=None):
+        entries = self.grid_cache.get(self.family, {})
+        if not entries:
+            return {}
+        if wave is None:
+            if ind_file not in self.design_wave:
+                self.design_wave[ind_file] = self.read_symbol(ind_file, "wave")
+            wave = self.design_wave[ind_file]
+            if wave is None:
+                return {}
+        hits = []
+        for wave_range, entry in entries.items():
+            wave_min, wave_max = (float(v) for v in wave_range.split("_"))
+            if wave_min <= float(wave) <= wave_max:
+                hits.append(entry)
+        if not hits:
+            return {}
+        best = min(hits, key=lambda entry: entry["grid_size"])
+        return {k: best[k] for k in ("grid_size", "grid_size_y", "step_size") if k in best}
+
+
     # === 执行单次 BPM 仿真（Sim）任务 ===
     # 函数名: Sim
     # 功能:
@@ -193,38 +473,32 @@ class RsoftSimulation:
     #   run_path   : 仿真结果目录（用于后续分析）
     def Sim(self, symbollist, valuelist):
         # 创建仿真路径（如 D:\work\test_Sim）
-        Sim_path = f"{self.file_path}\\{self.file_name}_Sim"
+        Sim_path = os.path.join(self.file_path, f"{self.file_name}_Sim")
         if not os.path.exists(Sim_path):
             os.makedirs(Sim_path)
 
         # === 情况一：使用默认参数 ===
         if symbollist == 'default' and valuelist == 'default':
-            run_path = f"{Sim_path}\\default"  # 仿真结果子目录
+            run_path = os.path.join(Sim_path, "default")  # 仿真结果子目录
             if not os.path.exists(run_path):
                 os.makedirs(run_path)
 
             run_prefix = "default"
-            commend = "bsimw32 " + self.file + " prefix=" + run_prefix
-            self.command_pool.submit(self.run_command, commend, run_path)
+            self.submit_job(self.file, run_path, run_prefix, [])
 
         # === 情况二：使用自定义参数 ===
         else:
             # 文件夹命名：Lta(300)_Ln(500)
             symbol_value_bracket = [f"{symbollist[i]}({valuelist[i]})" for i in range(len(symbollist))]
             symbol_value_path = "_".join(symbol_value_bracket)
-            run_path = f"{Sim_path}\\{symbol_value_path}"
+            run_path = os.path.join(Sim_path, symbol_value_path)
             if not os.path.exists(run_path):
                 os.makedirs(run_path)
 
             run_prefix = symbol_value_path
 
-            # 构造参数字符串：Lta=300 Ln=500
-            symbol_value_equal = [f"{symbollist[i]}={valuelist[i]}" for i in range(len(symbollist))]
-            symbol_value_space = " ".join(symbol_value_equal)
-
-            # 构造仿真命令并提交
-            commend = "bsimw32 " + self.file + " prefix=" + run_prefix + " " + symbol_value_space
-            self.command_pool.submit(self.run_command, commend, run_path)
+            # 构造仿真命令并提交（参数形如 Lta=300 Ln=500）
+            self.submit_job(self.file, run_path, run_prefix, zip(symbollist, valuelist))
 
         return run_path
 
@@ -238,12 +512,16 @@ class RsoftSimulation:
     #   symbollist : 参数名列表（必须为两个参数，如 ['Lta', 'wave']）
     #   valuelist  : 对应值列表（如 [[100,200],[1.55,1.65]]）
     #   optimize   : 优化模式标志（"off" 或 "on"）
+    #   fom        : 品质因数表达式（None 时为默认 mean，见 RsoftFOM）
     # 返回:
     #   run_path   : 仿真结果路径（供后续数据处理）
-    def Scan(self, symbollist, valuelist, optimize="off"):
+    def Scan(self, symbollist, valuelist, optimize="off", fom=None):
+        # 仿真前先编译 FOM，表达式有误时立即报错
+        if fom is not None:
+            compile_fom(fom)
         # === 创建扫描结果根目录 ===
         if optimize == "off":
-            Scan_path = f"{self.file_path}\\{self.file_name}_Scan"
+            Scan_path = os.path.join(self.file_path, f"{self.file_name}_Scan")
             if not os.path.exists(Scan_path):
                 os.makedirs(Scan_path)
         elif optimize == "on":
@@ -255,43 +533,82 @@ class RsoftSimulation:
 
         # 创建扫描结果路径
         if optimize == "off":
-            run_path = f"{Scan_path}\\{symbol_value_path}"
+            run_path = os.path.join(Scan_path, symbol_value_path)
         elif optimize == "on":
-            run_path = f"{Scan_path}\\{self.optimize_index}_{symbol_value_path}"
+            run_path = os.path.join(Scan_path, f"{self.optimize_index}_{symbol_value_path}")
             self.optimize_index += 1
         if not os.path.exists(run_path):
             os.makedirs(run_path)
 
-        # === 将 valuelist 格式化为等宽字符串，防止路径混乱 ===
+        # === 构造所有参数组合并提交仿真任务（优化模式使用 optimize.ind）===
+        ind_file = self.Optimize_Rsoft if optimize == "on" else self.file
+        self.submit_scan(ind_file, run_path, symbollist, valuelist, fom)
+        if optimize == "on":
+            return run_path
+        else:
+            self.wait_Scan()
+            self.analyze(run_path, fom)
+
+
+    # === 研究结束: 分析结果、写出表格，图像交给后台绘图服务 ===
+    # 函数名: analyze
+    # 返回:
+    #   data : RsoftData 对象
+    def analyze(self, run_path, fom=None):
+        data = self.study_data(run_path, fom)
+        data.report()
+        self.render_plots(data)
+        return data
+
+
+    # === 提交研究的性能图像（按 plot_mode，单点研究不作图）===
+    def render_plots(self, data):
+        if self.plot_mode == "off" or data.rows * data.cols <= 1:
+            return
+        if self.plot_service is None:
+            self.plot_service = PlotService()
+        self.plot_service.submit(data, preview=self.plot_mode == "preview")
+
+
+    # === 将本次运行中已作图的研究导出为全分辨率图像（并发渲染，等待完成）===
+    # 参数:
+    #   paths : 研究结果目录列表（None 为全部）
+    # 返回:
+    #   save_paths : 图像路径列表
+    def export_plots(self, paths=None):
+        if self.plot_service is None:
+            return []
+        self.plot_service.export(paths)
+        return self.plot_service.wait()
+
+
+    # === 提交双参数全排列仿真任务 ===
+    # 函数名: submit_scan
+    # 功能:
+    #   - 将 valuelist 格式化为等宽字符串，防止路径混乱
+    #   - 按 symbol1 × symbol2 全排列构造命令并提交到线程池（不等待）
+    # 参数:
+    #   ind_file   : 仿真使用的 ind 文件
+    #   run_path   : 仿真结果目录
+    #   symbollist : 参数名列表（两个参数，如 ['Lta', 'wave']）
+    #   valuelist  : 对应值列表（如 [[100,200],[1.55,1.65]]）
+    #   fom        : 品质因数表达式（用于流式汇总）
+    # 返回: 无
+    def submit_scan(self, ind_file, run_path, symbollist, valuelist, fom=None):
         valuelist_format = [[], []]
         for i in range(len(valuelist)):
             format_str = self.determine_format(valuelist[i])
             valuelist_format[i] = [format_str.format(v) for v in valuelist[i]]
 
-        # === 构造所有参数组合并提交仿真任务 ===
         for i in range(len(valuelist[0])):
             for j in range(len(valuelist[1])):
                 # 构建路径：Lta(100)_wave(1.55)
                 symbol_value_bracket = [f"{symbollist[0]}({valuelist_format[0][i]})", f"{symbollist[1]}({valuelist_format[1][j]})"]
-                symbol_value_path = "_".join(symbol_value_bracket)
-                run_prefix = symbol_value_path
+                run_prefix = "_".join(symbol_value_bracket)
 
                 # 构建仿真参数：Lta=100 wave=1.55
-                symbol_value_equal = [f"{symbollist[0]}={valuelist[0][i]}", f"{symbollist[1]}={valuelist[1][j]}"]
-                symbol_value_space = " ".join(symbol_value_equal)
-
-                # 构建命令（优化模式路径不同）
-                if optimize == "on":
-                    commend = "bsimw32 " + self.Optimize_Rsoft + " prefix=" + run_prefix + " " + symbol_value_space
-                else:
-                    commend = "bsimw32 " + self.file + " prefix=" + run_prefix + " " + symbol_value_space
-
-                self.command_pool.submit(self.run_command, commend, run_path)
-        if optimize == "on":
-            return run_path
-        else:
-            self.wait_Scan()
-            RsoftData(run_path)
+                symbol_values = [(symbollist[0], valuelist[0][i]), (symbollist[1], valuelist[1][j])]
+                self.submit_job(ind_file, run_path, run_prefix, symbol_values, fom)
 
 
     # === 多参数级联优化仿真（Optimize） ===
@@ -303,20 +620,27 @@ class RsoftSimulation:
     # 参数:
     #   symbolList : 参数名列表（如 ['Lta', 'Ln', 'Wn', ..., 'wave']）
     #   valueList  : 与 symbolList 一一对应的值列表（每个是数组）
+    #   fidelity   : None 或 MultiFidelity 参数字典（如 {"coarsen": 2, "top_k": 3}），
+    #                给定时每轮先粗网格预扫，再细网格确认前 top_k 个候选
+    #   fom        : 每轮选取最优值所用的品质因数表达式（None 时为默认 mean，见 RsoftFOM）
+    #   report     : 是否在全部轮次结束后输出各轮的结果表格与图像（各轮进行中只计算选优所需指标）
     # 返回: 无（中间输出包括数据、图、结果文件）
-    def Optimize(self, symbolList, valueList):
+    def Optimize(self, symbolList, valueList, fidelity=None, fom=None, report=True):
+        # 仿真前先编译 FOM，表达式有误时立即报错
+        if fom is not None:
+            compile_fom(fom)
         # === Step 1: 创建干净优化目录 OptimizeN ===
         self.Optimize_path = self.create_clean_optimize_path(self.file_path, self.file_name)
         self.optimize_index = 1
         self.optimize_path = self.Optimize_path
 
         # === Step 2: 创建并打开结果记录文件 ===
-        Optimize_result_file = f"{self.Optimize_path}\\Optimize_result.txt"
+        Optimize_result_file = os.path.join(self.Optimize_path, "Optimize_result.txt")
         open(Optimize_result_file, "w").close()  # 清空旧文件
         Optimize_result = open(Optimize_result_file, "r+")
 
         # === Step 3: 复制 .ind 文件，用于迭代修改 ===
-        self.Optimize_Rsoft = f"{self.Optimize_path}\\{self.file_name}_optimize.ind"
+        self.Optimize_Rsoft = os.path.join(self.Optimize_path, f"{self.file_name}_optimize.ind")
         shutil.copyfile(self.file, self.Optimize_Rsoft)
 
         # === Step 4: 多轮循环优化，每轮只优化一个参数 + wave ===
@@ -325,13 +649,18 @@ class RsoftSimulation:
             symbollist = [symbolList[i], symbolList[-1]]
             valuelist = [valueList[i], valueList[-1]]
 
-            # 调用 Scan 函数提交所有组合仿真任务
-            sacn_path = self.Scan(symbollist, valuelist, optimize="on")
-            self.wait_Scan()  # 等待仿真完成
+            if fidelity is None:
+                # 调用 Scan 函数提交所有组合仿真任务
+                sacn_path = self.Scan(symbollist, valuelist, optimize="on", fom=fom)
+                self.wait_Scan()  # 等待仿真完成
 
-            # 数据分析：提取最优值
-            data = RsoftData(sacn_path)
-            min_symbol = data.get_min_symbol()
+                # 数据分析：提取最优值（惰性模式，只计算选优所需指标）
+                data = self.study_data(sacn_path, fom)
+                min_symbol = data.get_min_symbol()
+                self.pending_reports.append(data)
+            else:
+                # 多保真度：粗网格预扫全部候选，细网格仅确认前 top_k
+                min_symbol = self.MultiFidelity(symbollist, valuelist, optimize="on", fom=fom, **fidelity)
 
             # 修改 optimize.ind 中当前参数为最优值
             self.change_symbol(self.Optimize_Rsoft, symbolList[i], min_symbol)
@@ -339,6 +668,23 @@ class RsoftSimulation:
             # 记录优化过程到结果文件
             Optimize_result.write(f"{symbolList[i]} {valueList[i]}\n")
             Optimize_result.write(f"{symbolList[i]}={min_symbol}\n")
+        Optimize_result.close()
+
+        # === Step 5: 优化结束后输出各轮结果表格与图像 ===
+        if report:
+            self.write_reports()
+        self.pending_reports = []
+
+
+    # === 输出惰性分析结果的表格与图像 ===
+    # 函数名: write_reports
+    # 功能: 为 pending_reports 中每个 RsoftData 写出 _result.txt 并提交作图（多点研究），之后清空列表
+    # 返回: 无
+    def write_reports(self):
+        for data in self.pending_reports:
+            data.report()
+            self.render_plots(data)
+        self.pending_reports = []
 
 
     # === 自动创建干净的 OptimizeN 文件夹（若存在空文件夹则复用）===
@@ -409,14 +755,50 @@ class RsoftSimulation:
         print(f"替换前: {old_line.strip()} 替换后: {new_line.strip()}")
 
 
+    # === 读取 ind 文件中指定 symbol 的数值 ===
+    # 函数名: read_symbol
+    # 功能: 查找 "symbol = value" 行并转换为 float（表达式无法转换时返回 None）
+    # 参数:
+    #   ind_file : ind 文件路径
+    #   symbol   : symbol 名（如 "grid_size"）
+    # 返回:
+    #   value    : float 或 None（未找到或为表达式）
+    def read_symbol(self, ind_file, symbol):
+        target_prefix = f"{symbol} ="
+        with open(ind_file, "r") as f:
+            for line in f:
+                if line.strip().startswith(target_prefix):
+                    try:
+                        return float(line.split("=", 1)[1])
+                    except ValueError:
+                        print(f"{line.strip()} 为表达式，无法读取数值")
+                        return None
+        return None
+
+
     # === 多参数正交设计优化仿真OEDsim ===
-    def OEDsim(self, symbollist, valuelist):
+    # 功能:
+    #   - 按正交表提交各试验（每个试验含全部 wave）
+    #   - 对指定指标做极差分析与方差分析（见 RsoftOED），预测最优水平组合
+    #   - 按预测值提交前 confirm 个未试验过的组合作验证仿真（{研究目录}_confirm），取实测最优者
+    # 参数:
+    #   symbollist : 参数名列表（最后一个为 wave）
+    #   valuelist  : 对应值列表
+    #   fom        : 品质因数表达式（None 时为默认 mean，见 RsoftFOM）
+    #   metric     : 分析所用的指标名（默认 "mean"，即 FOM；也可为 "ELmax" / "ULmax" / "IL" 等）
+    #   confirm    : 验证组合数（0 时只分析不验证）
+    # 返回:
+    #   best       : {参数名: 取值} 正交试验与验证仿真中实测响应最小的组合
+    def OEDsim(self, symbollist, valuelist, fom=None, metric="mean", confirm=3):
+        # 仿真前先编译 FOM，表达式有误时立即报错
+        if fom is not None:
+            compile_fom(fom)
         # === 创建扫描结果根目录 ===
-        OEDsim_path = f"{self.file_path}\\{self.file_name}_OEDsim"
+        OEDsim_path = os.path.join(self.file_path, f"{self.file_name}_OEDsim")
         # 构建文件夹命名（如 Lta(100_800)_wave(1.55_1.65)）
         symbol_value_sta_end_bracket = [f"{symbollist[i]}({valuelist[i][0]}_{valuelist[i][-1]})" for i in range(len(symbollist))]
         symbol_value_path = "_".join(symbol_value_sta_end_bracket)
-        run_path = f"{OEDsim_path}\\{symbol_value_path}"
+        run_path = os.path.join(OEDsim_path, symbol_value_path)
         if not os.path.exists(run_path):
             os.makedirs(run_path)
 
@@ -433,34 +815,508 @@ class RsoftSimulation:
             for wave in valuelist[-1]:
                 # 仿真前缀_wave(1.55)格式化为等宽字符串，防止路径混乱
                 run_prefix = f"test({i:0{len(str(len(test_OED)))}d})_wave({wave})"
-                # 构建仿真参数：Lta=400.0 Ln=400.0 Wn=4.0 Lb=800.0 Lt=80.0
-                symbol_value_space = " ".join(f"{key}={value}" for key, value in case.items())
-                symbol_value_space_wave =f"{symbol_value_space} wave={wave}"
-                # 构建命令（优化模式路径不同）
-                commend = "bsimw32 " + self.file + " prefix=" + run_prefix + " " + symbol_value_space_wave
-                self.command_pool.submit(self.run_command, commend, run_path)
+                # 构建仿真参数：Lta=400.0 Ln=400.0 Wn=4.0 Lb=800.0 Lt=80.0 wave=1.55
+                symbol_values = list(case.items()) + [("wave", wave)]
+                self.submit_job(self.file, run_path, run_prefix, symbol_values, fom)
         # 等待仿真完毕，读取数据并处理
         self.wait_Scan()
-        RsoftData(run_path)
+        data = self.analyze(run_path, fom)
         # === 写入正交设计表格 ===
         result_path = run_path + "_result.txt"
-        resultfile = open(result_path, "r+")
-        # 读取原始内容
-        remaining_content = resultfile.read()
-        # 回到文件开头
-        resultfile.seek(0)
-        # 写入正交设计表格
-        table_data = []
-        # 构建表头（根据矩阵类型判断）
-        header = [f"test/symbol"] + symbollist[:-1]
-        table_data.append(header)
-        # 写入每一行数据
-        for i, case in enumerate(test_OED, 1):
-            row = [i] + [f"{value}" for _, value in case.items()]
-            table_data.append(row)
-
-        # 使用 tabulate 美化输出为纯文本表格
-        formatted_table = tabulate(table_data, tablefmt="plain")
-        resultfile.write(formatted_table + "\n\n")
-        # 保留原有内容
-        resultfile.write(remaining_content)
+        with open(result_path, "r+") as resultfile:
+            # 读取原始内容
+            remaining_content = resultfile.read()
+            # 回到文件开头
+            resultfile.seek(0)
+            # 写入正交设计表格
+            table_data = []
+            # 构建表头（根据矩阵类型判断）
+            header = ["test/symbol"] + symbollist[:-1]
+            table_data.append(header)
+            # 写入每一行数据
+            for i, case in enumerate(test_OED, 1):
+                row = [i] + [f"{value}" for _, value in case.items()]
+                table_data.append(row)
+
+            # 使用 tabulate 美化输出为纯文本表格
+            formatted_table = tabulate(table_data, tablefmt="plain")
+            resultfile.write(formatted_table + "\n\n")
+            # 保留原有内容
+            resultfile.write(remaining_content)
+
+        # === 极差分析与方差分析（试验 i 即结果矩阵第 i 行）===
+        values = [np.asarray(value).tolist() for value in valuelist[:-1]]
+        design = [[values[j].index(case[symbol]) for j, symbol in enumerate(symbollist[:-1])] for case in test_OED]
+        response = study_response(data, metric)
+        analysis = OEDAnalysis(symbollist[:-1], values, design, response, metric)
+        self.oed_analysis = analysis
+
+        # === 验证仿真: 预测最优的前 confirm 个未试验组合 ===
+        candidates = analysis.candidates(confirm)
+        confirmed = []
+        if candidates:
+            confirm_path = run_path + "_confirm"
+            if not os.path.exists(confirm_path):
+                os.makedirs(confirm_path)
+            for i, (combo, _) in enumerate(candidates, 1):
+                for wave in valuelist[-1]:
+                    run_prefix = f"confirm({i:0{len(str(len(candidates)))}d})_wave({wave})"
+                    symbol_values = list(analysis.case(combo).items()) + [("wave", wave)]
+                    self.submit_job(self.file, confirm_path, run_prefix, symbol_values, fom)
+            self.wait_Scan()
+            confirm_data = self.analyze(confirm_path, fom)
+            # 验证结果矩阵的行 → 验证组合序号（由前缀 confirm(i) 解析）
+            confirm_response = study_response(confirm_data, metric)
+            measured = {}
+            for row, prefixes in enumerate(confirm_data.prefix_matrix):
+                prefix = next(prefix for prefix in prefixes if prefix is not None)
+                measured[int(re.match(r"confirm\((\d+)\)", prefix).group(1))] = float(confirm_response[row])
+            confirmed = [(combo, predicted, measured[i]) for i, (combo, predicted) in enumerate(candidates, 1)]
+
+        # === 实测最优组合（正交试验与验证仿真）===
+        measured = [(tuple(combo), value) for combo, value in zip(analysis.design.tolist(), analysis.response)]
+        measured += [(combo, value) for combo, _, value in confirmed]
+        best_combo, best_value = min(measured, key=lambda item: item[1] if np.isfinite(item[1]) else np.inf)
+        best = analysis.case(best_combo)
+        with open(result_path, "a") as resultfile:
+            resultfile.write("\n" + analysis.report(confirmed))
+            resultfile.write(",".join(f"{symbol}={value}" for symbol, value in best.items()) + f",min_{metric}={round(best_value, 4)}\n")
+        return best
+
+
+    # === 工艺容差蒙特卡洛良率分析 Yield ===
+    # 函数名: Yield
+    # 功能:
+    #   - 各 symbol 按指定分布分批做拉丁超立方抽样（每批为一组独立的 LHS 样本），每个样本在全部 wave 下仿真
+    #   - 样本完成即并入流式统计（见 RsoftYield），样本目录随即删除，不保留原始结果
+    #   - 每批结束后检查良率置信区间，宽度不大于 target 时提前结束
+    # 参数:
+    #   distributions : {symbol: 分布}，如 {"width": ("normal", None, 0.05), "Gap": ("uniform", 1.4, 1.6)}
+    #                   （None 为 ind 文件中的名义值，分布写法见 RsoftYield.make_distribution）
+    #   limits        : {指标: 上限}，如 {"ILmax": 3.6, "UL": 0.3}（指标为 IL1 / IL2 ... / ILmax / EL / UL，wave 上取最坏情况）
+    #   wave_list     : 波长列表（None 时使用 ind 文件中的 wave）
+    #   target        : 良率置信区间的目标宽度
+    #   confidence    : 置信水平
+    #   batch_size    : 每批样本数（默认 4 × max_workers）
+    #   min_samples   : 提前结束前至少完成的样本数
+    #   max_samples   : 样本数上限
+    #   seed          : 随机数种子
+    #   keep_runs     : True 时保留各样本目录
+    # 返回:
+    #   summary       : 良率、置信区间与各指标统计（见 YieldStudy.summary），表格写入 {研究目录}_result.txt
+    def Yield(self, distributions, limits, wave_list=None, target=0.05, confidence=0.95, batch_size=None,
+              min_samples=20, max_samples=1000, seed=None, keep_runs=False):
+        symbols = list(distributions)
+        dists = [make_distribution(spec, self.read_symbol(self.file, symbol) if not hasattr(spec, "ppf") and None in spec else None)
+                 for symbol, spec in distributions.items()]
+        run_path = os.path.join(self.file_path, f"{self.file_name}_Yield", "_".join(symbols))
+        if not os.path.exists(run_path):
+            os.makedirs(run_path)
+        study = YieldStudy(run_path, symbols, limits, confidence=confidence)
+        waves = list(wave_list) if wave_list is not None else [None]
+        batch_size = batch_size or 4 * self.max_workers
+        rng = np.random.default_rng(seed)
+
+        sample = 0
+        while sample < max_samples:
+            # === 一批拉丁超立方样本 ===
+            u = latin_hypercube(min(batch_size, max_samples - sample), len(symbols), rng)
+            values = np.column_stack([dist.ppf(u[:, j]) for j, dist in enumerate(dists)])
+            futures = []
+            for row in values:
+                sample += 1
+                sample_path = os.path.join(run_path, f"sample({sample:0{len(str(max_samples))}d})")
+                os.makedirs(sample_path, exist_ok=True)
+                row = [float(f"{value:.6g}") for value in row]
+                study.expect(sample, row, len(waves))
+                for k, wave in enumerate(waves):
+                    symbol_values = list(zip(symbols, row)) + ([("wave", wave)] if wave is not None else [])
+                    run_prefix = f"wave({wave})" if wave is not None else "sample"
+                    commend = self.build_command(self.file, run_prefix, symbol_values)
+                    futures.append(self.command_pool.submit(self.run_yield_job, study, commend, sample_path, run_prefix, sample, k, keep_runs))
+            for future in futures:
+                future.result()
+            rate, lower, upper = study.interval()
+            print(f"良率分析: 已完成 {study.samples} 个样本，良率 {rate:.4f}，{confidence:g} 置信区间 [{lower:.4f}, {upper:.4f}]")
+            if study.samples >= min_samples and upper - lower <= target:
+                break
+        study.report()
+        return study.summary()
+
+
+    # === 线程池中执行的良率任务: 运行求解器，结果并入流式统计，样本完成后删除样本目录 ===
+    def run_yield_job(self, study, commend, sample_path, run_prefix, sample, k, keep_runs):
+        self.run_command(commend, sample_path)
+        mon_path = os.path.join(sample_path, run_prefix + ".mon")
+        power = last_record(mon_path)[1:] if os.path.isfile(mon_path) else []
+        record_cache.pop(mon_path, None)
+        if study.add(sample, k, power) and not keep_runs:
+            shutil.rmtree(sample_path, ignore_errors=True)
+
+
+    # === 全局灵敏度筛选 Screen（Morris 基本效应法）===
+    # 函数名: Screen
+    # 功能:
+    #   - 以各参数的候选值为 Morris 网格，r 条轨迹的全部不重复点并行仿真（默认只用首尾两个波长）
+    #   - 按所选指标的 μ* 对参数排序，剔除影响小的参数，保留参数的取值范围缩小到响应较好的区间
+    #   - 轨迹数默认按 budget 确定: 筛选仿真数约为一次完整 Optimize 的 budget 倍（至少 2 条轨迹）
+    # 参数:
+    #   symbollist   : 参数名列表（最后一个为 wave，同 Optimize）
+    #   valuelist    : 对应值列表
+    #   trajectories : 轨迹数（None 时按 budget 确定）
+    #   budget       : 筛选仿真数占一次 Optimize 仿真数的比例
+    #   threshold    : μ* 不小于最大值 threshold 倍的参数保留
+    #   fom          : 品质因数表达式（None 时为默认 mean，见 RsoftFOM）
+    #   metric       : 筛选所用的指标名（默认 "mean"，即 FOM）
+    #   waves        : 筛选所用的波长（None 时取 wave 列表首尾）
+    #   seed         : 随机数种子
+    # 返回:
+    #   (symbollist, valuelist) : 保留的参数及建议取值，末尾为原 wave 列表，可直接传入 Optimize / OEDsim
+    #   （剔除参数在筛选中的最优值见 self.screening.pruned()，表格写入 {研究目录}_result.txt）
+    def Screen(self, symbollist, valuelist, trajectories=None, budget=0.3, threshold=0.1, fom=None, metric="mean", waves=None, seed=None):
+        if len(symbollist) < 3:
+            raise ValueError("Screen requires at least two symbols besides wave")
+        if fom is not None:
+            compile_fom(fom)
+        wave_list = list(valuelist[-1])
+        if waves is None:
+            waves = [wave_list[0], wave_list[-1]] if len(wave_list) > 1 else wave_list
+        values = [np.asarray(value).tolist() for value in valuelist[:-1]]
+        k = len(values)
+        if trajectories is None:
+            optimize_runs = sum(len(value) for value in values) * len(wave_list)
+            trajectories = int(np.clip(budget * optimize_runs // ((k + 1) * len(waves)), 2, 20))
+        screening = MorrisScreening(symbollist[:-1], values, trajectories, seed)
+        self.screening = screening
+
+        # === 创建筛选结果目录并提交全部不重复点 ===
+        symbol_value_sta_end_bracket = [f"{symbollist[i]}({valuelist[i][0]}_{valuelist[i][-1]})" for i in range(len(symbollist))]
+        run_path = os.path.join(self.file_path, f"{self.file_name}_Screen", "_".join(symbol_value_sta_end_bracket))
+        if not os.path.exists(run_path):
+            os.makedirs(run_path)
+        width = len(str(len(screening.points)))
+        for i, point in enumerate(screening.points, 1):
+            for wave in waves:
+                symbol_values = list(screening.case(point).items()) + [("wave", wave)]
+                self.submit_job(self.file, run_path, f"run({i:0{width}d})_wave({wave})", symbol_values, fom)
+        self.wait_Scan()
+        data = self.analyze(run_path, fom)
+
+        # 结果矩阵的行 → 仿真点序号（由前缀 run(i) 解析）
+        response = np.full(len(screening.points), np.nan)
+        row_response = study_response(data, metric)
+        for row, prefixes in enumerate(data.prefix_matrix):
+            prefix = next(prefix for prefix in prefixes if prefix is not None)
+            response[int(re.match(r"run\((\d+)\)", prefix).group(1)) - 1] = row_response[row]
+        screening.analyze(response, threshold)
+
+        symbols, suggested, fixed = screening.pruned()
+        optimize_runs = sum(len(value) for value in values) * len(wave_list)
+        with open(run_path + "_result.txt", "a") as resultfile:
+            resultfile.write("\n" + screening.report(metric))
+            resultfile.write(f"runs={len(screening.points) * len(waves)},optimize_runs={optimize_runs}\n")
+        print(f"参数筛选: 保留 {symbols}，剔除 {list(fixed)}（筛选仿真 {len(screening.points) * len(waves)} 次，完整 Optimize 约 {optimize_runs} 次）")
+        return symbols + [symbollist[-1]], suggested + [valuelist[-1]]
+
+
+    # === 多保真度筛选仿真 MultiFidelity ===
+    # 函数名: MultiFidelity
+    # 功能:
+    #   - 粗网格预扫：grid_size / grid_size_y / step_size 乘以 coarsen 后作为 symbol 覆盖，扫描全部候选
+    #   - 按 RsoftData 的 mean 指标排序，仅对前 top_k（或与最优差值不超过 margin）的候选做原网格确认
+    #   - 另取 spread 个排序分散的检查点（其余候选中的中位与最差排名等）一并原网格仿真，
+    #     Spearman 秩相关系数在全部原网格点上计算，附点数、95% 置信区间与排列检验 p 值；点数少于 4 时不输出
+    # 参数:
+    #   symbollist : 参数名列表（两个参数，如 ['Lta', 'wave']）
+    #   valuelist  : 对应值列表（如 [[100,200,300],[1.55,1.65]]）
+    #   coarsen    : 网格与步长粗化倍数（默认 2）
+    #   top_k      : 细网格确认的候选数（至少为 2）
+    #   margin     : None 或 dB 值，给定时确认所有 mean <= 最优 + margin 的候选
+    #   spread     : 额外的原网格检查点数（默认 2，在其余候选中按粗网格排名均匀选取，含最差者）
+    #   optimize   : 优化模式标志（"off" 或 "on"，与 Scan 一致）
+    #   fom        : 排序所用的品质因数表达式（None 时为默认 mean，见 RsoftFOM）
+    # 返回:
+    #   min_symbol : 细网格下 mean 最小的 symbol1 取值
+    def MultiFidelity(self, symbollist, valuelist, coarsen=2, top_k=3, margin=None, spread=2, optimize="off", fom=None):
+        if len(valuelist[0]) < 2:
+            raise ValueError("MultiFidelity requires at least two candidate values")
+
+        # === 创建结果目录（coarse / fine 两个子目录）===
+        symbol_value_sta_end_bracket = [f"{symbollist[i]}({valuelist[i][0]}_{valuelist[i][-1]})" for i in range(len(symbollist))]
+        symbol_value_path = "_".join(symbol_value_sta_end_bracket)
+        if optimize == "off":
+            ind_file = self.file
+            run_path = os.path.join(self.file_path, f"{self.file_name}_MultiFidelity", symbol_value_path)
+        elif optimize == "on":
+            ind_file = self.Optimize_Rsoft
+            run_path = os.path.join(self.optimize_path, f"{self.optimize_index}_{symbol_value_path}")
+            self.optimize_index += 1
+        coarse_path = os.path.join(run_path, "coarse")
+        fine_path = os.path.join(run_path, "fine")
+        for path in (coarse_path, fine_path):
+            if not os.path.exists(path):
+                os.makedirs(path)
+
+        # === Step 1: 粗网格预扫全部候选 ===
+        production_overrides = dict(self.overrides)
+        production_grid = {**self.cached_grid(ind_file, min(valuelist[1]) if symbollist[1] == "wave" else None), **production_overrides}
+        coarse_overrides = {}
+        for symbol in ("grid_size", "grid_size_y", "step_size"):
+            value = production_grid.get(symbol, self.read_symbol(ind_file, symbol))
+            if value is not None:
+                coarse_overrides[symbol] = round(float(value) * coarsen, 6)
+        self.overrides = {**production_overrides, **coarse_overrides}
+        self.submit_scan(ind_file, coarse_path, symbollist, valuelist, fom)
+        self.wait_Scan()
+        self.overrides = production_overrides
+        coarse = self.study_data(coarse_path, fom)
+        coarse_mean = {value: coarse.mean_matrix[i][0] for i, value in enumerate(coarse.unique_value1)}
+
+        # === Step 2: 排序并选出需要细网格确认的候选 ===
+        ranked = sorted(coarse_mean, key=lambda value: coarse_mean[value])
+        if margin is None:
+            selected = ranked[:max(2, top_k)]
+        else:
+            selected = [value for value in ranked if coarse_mean[value] <= coarse_mean[ranked[0]] + margin]
+            selected = selected if len(selected) >= 2 else ranked[:2]
+        # 排序分散的检查点：仅用前几名计算秩相关时 rho 几乎由构造决定（2 点必为 ±1）
+        remaining = [value for value in ranked if value not in selected]
+        checks = []
+        if remaining and spread:
+            checks = sorted(set(remaining[-(-(i + 1) * len(remaining) // spread) - 1] for i in range(spread)))
+
+        # === Step 3: 原网格确认（保持原扫描顺序）===
+        fine_values = [v for v in valuelist[0] if float(v) in selected or float(v) in checks]
+        self.submit_scan(ind_file, fine_path, symbollist, [fine_values, valuelist[1]], fom)
+        self.wait_Scan()
+        fine = self.study_data(fine_path, fom)
+        fine_mean = {value: fine.mean_matrix[i][0] for i, value in enumerate(fine.unique_value1)}
+        min_symbol = fine.get_min_symbol()
+
+        # === Step 4: 计算两种保真度排序的一致性并写入报告 ===
+        # 全部原网格点上的秩相关；Fisher z 变换的 95% 置信区间（Spearman 的标准误取 sqrt(1.06 / (n - 3))）
+        # |rho| = 1 时置信区间退化，只给出排列检验的 p 值
+        n = len(fine_mean)
+        if n >= 4:
+            x, y = [coarse_mean[v] for v in fine_mean], [fine_mean[v] for v in fine_mean]
+            rho = self.rank_correlation(x, y)
+            ci = "n/a"
+            if abs(rho) < 1 - 1e-9:
+                half = 1.96 * sqrt(1.06 / (n - 3))
+                ci = f"({round(tanh(atanh(rho) - half), 4)}, {round(tanh(atanh(rho) + half), 4)})"
+            rank_line = f"spearman_rho={round(rho, 4)},n={n},ci95={ci},p={round(self.rank_p_value(x, y, rho), 4)}"
+        else:
+            rank_line = f"spearman_rho=n/a,n={n}（原网格点少于 4 个，秩相关无参考意义）"
+        fine_ranked = sorted(fine_mean, key=lambda value: fine_mean[value])
+        table_data = [[symbollist[0], "coarse_mean", "coarse_rank", "fine_mean", "fine_rank"]]
+        for value in ranked:
+            if value in fine_mean:
+                table_data.append([value, round(coarse_mean[value], 4), ranked.index(value) + 1, round(fine_mean[value], 4), fine_ranked.index(value) + 1])
+            else:
+                table_data.append([value, round(coarse_mean[value], 4), ranked.index(value) + 1, "-", "-"])
+
+        result_path = run_path + "_result.txt"
+        with open(result_path, "w") as resultfile:
+            resultfile.write(f"coarse overrides: {coarse_overrides}\n")
+            resultfile.write(f"coarse jobs: {len(valuelist[0]) * len(valuelist[1])}, fine jobs: {len(fine_values) * len(valuelist[1])}\n\n")
+            resultfile.write(tabulate(table_data, tablefmt="plain") + "\n\n")
+            resultfile.write(f"rank checks: {checks}\n")
+            resultfile.write(rank_line + "\n")
+            resultfile.write(f"{symbollist[0]}={min_symbol},min_mean={round(fine.min_mean[0], 4)}\n")
+        print(f"多保真度筛选完成: {symbollist[0]}={min_symbol}, {rank_line}")
+
+        # 粗 / 细网格结果表格与图像: 独立运行时立即输出，优化轮次中待优化结束后统一输出
+        self.pending_reports += [coarse, fine]
+        if optimize == "off":
+            self.write_reports()
+        return min_symbol
+
+
+    # === 计算 Spearman 秩相关系数（并列值取平均秩）===
+    # 函数名: rank_correlation
+    # 参数:
+    #   x, y : 等长数值列表
+    # 返回:
+    #   rho  : float，无法计算（某一序列全部相同）时返回 nan
+    def rank_correlation(self, x, y):
+        rx, ry = self.rank_values(x), self.rank_values(y)
+        mx, my = sum(rx) / len(rx), sum(ry) / len(ry)
+        cov = sum((a - mx) * (b - my) for a, b in zip(rx, ry))
+        sx = sqrt(sum((a - mx) ** 2 for a in rx))
+        sy = sqrt(sum((b - my) ** 2 for b in ry))
+        if sx == 0 or sy == 0:
+            return float("nan")
+        return cov / (sx * sy)
+
+
+    # === 秩（并列值取平均秩，从 1 开始）===
+    def rank_values(self, values):
+        order = sorted(range(len(values)), key=lambda i: values[i])
+        ranks = [0.0] * len(values)
+        i = 0
+        while i < len(order):
+            j = i
+            while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+                j += 1
+            for k in range(i, j + 1):
+                ranks[order[k]] = (i + j) / 2 + 1
+            i = j + 1
+        return ranks
+
+
+    # === 秩相关的单侧 p 值（无关假设下 rho 不小于观测值的概率）===
+    # 函数名: rank_p_value
+    # 参数:
+    #   x, y : 等长数值列表
+    #   rho  : rank_correlation(x, y)
+    # 返回:
+    #   p    : n <= 8 时为全部排列的精确概率，否则为正态近似 rho·sqrt(n-1)
+    def rank_p_value(self, x, y, rho):
+        n = len(x)
+        if rho != rho:
+            return float("nan")
+        if n <= 8:
+            rx = np.array(self.rank_values(x))
+            rx -= rx.mean()
+            ry = np.array(self.rank_values(y))
+            permuted = np.array(list(itertools.permutations(ry - ry.mean())))
+            rhos = permuted @ rx / (sqrt((rx ** 2).sum()) * sqrt((permuted[0] ** 2).sum()))
+            return float(np.mean(rhos >= rho - 1e-12))
+        return 0.5 * erfc(rho * sqrt(n - 1) / sqrt(2))
+
+
+    # === 网格收敛性研究 Converge ===
+    # 函数名: Converge
+    # 功能:
+    #   - 以 ind 文件（或缓存）中的 grid_size / grid_size_y / step_size 为基准，按 ladder 倍数逐级粗化
+    #   - 所有网格级别 × 波长并行仿真，以最细级别为参考比较 IL / EL / UL（按前缀中的级别与波长定位结果，参考级别缺失时报错）
+    #   - 从最细级别开始逐级检查，选出误差不超过 tolerance (dB) 的最粗级别
+    #   - 将选中设置写入 grid_cache.json（键: 设计族 + 波长范围），之后的仿真命令自动使用
+    # 参数:
+    #   wave_list : 波长列表（如 [1.27, 1.55, 1.65]）
+    #   ladder    : 粗化倍数列表（第一个为参考级别，默认 [1, 1.5, 2, 3, 4]）
+    #   tolerance : 允许的最大指标偏差（dB）
+    # 返回:
+    #   grid      : 选中的网格设置字典
+    def Converge(self, wave_list, ladder=(1, 1.5, 2, 3, 4), tolerance=0.05):
+        ladder = sorted(ladder)
+        if len(ladder) < 2:
+            raise ValueError("Converge requires at least two ladder levels")
+
+        # === 创建结果目录 ===
+        wave_range = f"{min(wave_list)}_{max(wave_list)}"
+        run_path = os.path.join(self.file_path, f"{self.file_name}_Converge", f"wave({wave_range})")
+        if not os.path.exists(run_path):
+            os.makedirs(run_path)
+
+        # === 基准网格（缓存优先，其次 ind 文件）===
+        base_grid = {**self.cached_grid(self.file, min(wave_list)), **self.overrides}
+        for symbol in ("grid_size", "grid_size_y", "step_size"):
+            if symbol not in base_grid:
+                value = self.read_symbol(self.file, symbol)
+                if value is None:
+                    raise ValueError(f"{symbol} is not a numeric symbol in {self.file}")
+                base_grid[symbol] = value
+
+        # === 所有级别 × 波长并行提交，网格作为任务 symbol 显式传入 ===
+        level_format = self.determine_format(ladder)
+        wave_format = self.determine_format(wave_list)
+        level_grids = []
+        for level in ladder:
+            grid = {k: round(float(v) * level, 6) for k, v in base_grid.items()}
+            level_grids.append(grid)
+            for wave in wave_list:
+                run_prefix = f"level({level_format.format(level)})_wave({wave_format.format(wave)})"
+                symbol_values = list(grid.items()) + [("wave", wave)]
+                self.submit_job(self.file, run_path, run_prefix, symbol_values)
+        self.wait_Scan()
+        data = RsoftData(run_path)
+
+        # === 按前缀 level(x)_wave(y) 定位各级别各波长的结果（不依赖结果矩阵的行顺序与行数）===
+        level_index = {float(level_format.format(level)): i for i, level in enumerate(ladder)}
+        waves = [float(wave_format.format(wave)) for wave in wave_list]
+        results = {}
+        for i in range(data.rows):
+            for j in range(data.cols):
+                prefix = data.prefix_matrix[i][j]
+                # 未提交或求解失败（指标为 nan）的任务视为缺失
+                if prefix is None or not np.isfinite(data.EL_matrix[i][j]):
+                    continue
+                match = re.match(r"level\((-?[\d.]+)\)_wave\((-?[\d.]+)\)", prefix)
+                results.setdefault(level_index[float(match.group(1))], {})[float(match.group(2))] = \
+                    (data.EL_matrix[i][j], data.UL_matrix[i][j], list(data.IL_matrix[i][j]))
+        missing = [wave for wave in waves if wave not in results.get(0, {})]
+        if missing:
+            raise RuntimeError(f"Converge reference level {ladder[0]} has no results for wave {missing} in {run_path}")
+
+        # === 以最细级别为参考计算各级别的最大偏差（缺少任一波长结果的级别记为 None）===
+        reference = results[0]
+        errors = []
+        for i in range(len(ladder)):
+            level_results = results.get(i, {})
+            if any(wave not in level_results for wave in waves):
+                errors.append(None)
+                continue
+            error = 0
+            for wave in waves:
+                (EL, UL, IL), (EL_ref, UL_ref, IL_ref) = level_results[wave], reference[wave]
+                error = max(error, abs(EL - EL_ref), abs(UL - UL_ref), max(abs(a - b) for a, b in zip(IL, IL_ref)))
+            errors.append(round(error, 4))
+
+        # 逐级检查，遇到第一个超差（或缺失、无效）级别即停止
+        chosen = 0
+        for i in range(1, len(ladder)):
+            if errors[i] is None or not errors[i] <= tolerance:
+                break
+            chosen = i
+        grid = dict(level_grids[chosen])
+
+        # === 写入缓存 ===
+        self.grid_cache.setdefault(self.family, {})[wave_range] = {
+            **grid, "level": ladder[chosen], "error": errors[chosen], "tolerance": tolerance,
+            "date": time.strftime("%Y-%m-%d %H:%M:%S")}
+        with open(self.grid_cache_file, "w") as f:
+            json.dump(self.grid_cache, f, indent=2)
+
+        # === 收敛表追加到结果文件 ===
+        table_data = [["level", "grid_size", "grid_size_y", "step_size", "max_error"]]
+        for level, level_grid, error in zip(ladder, level_grids, errors):
+            table_data.append([level, level_grid.get("grid_size"), level_grid.get("grid_size_y"), level_grid.get("step_size"),
+                               "missing" if error is None else error])
+        with open(data.result_path, "a") as resultfile:
+            resultfile.write("Converge:\n")
+            resultfile.write(tabulate(table_data, tablefmt="plain") + "\n\n")
+            resultfile.write(f"family={self.family},wave={wave_range},tolerance={tolerance},chosen={grid}\n")
+        print(f"网格收敛研究完成: {self.family} wave({wave_range}) → {grid}")
+        return grid
+
+
+    # === 切换到二维有效折射率模型 Reduce2D ===
+    # 函数名: Reduce2D
+    # 功能:
+    #   - 由当前三维 ind 生成二维伴随文件 {file_name}_2d.ind，并对 wave_list 批量预求解平板有效折射率
+    #   - 之后的 Sim / Scan / Optimize / OEDsim 均在二维模型上运行（结果目录带 _2d 后缀）
+    #   - 每个任务按自身 symbol 值（wave、width 等）追加 delta_eim 覆盖
+    # 参数:
+    #   wave_list : 预求解的波长列表
+    # 返回:
+    #   file_2d   : 二维伴随文件路径
+    def Reduce2D(self, wave_list):
+        if self.job_hooks and getattr(self, "file_3d", None):
+            self.Restore3D()
+        reduction = RsoftEIM(self.file, wave_list)
+        self.file_3d, self.file_name_3d = self.file, self.file_name
+        self.file, self.file_name = reduction.file_2d, self.file_name + "_2d"
+        self.eim_hook = reduction.overrides
+        self.job_hooks.append(self.eim_hook)
+        return reduction.file_2d
+
+
+    # === 恢复三维模型 Restore3D ===
+    # 函数名: Restore3D
+    # 功能: 撤销 Reduce2D，之后的仿真重新使用原三维 ind 文件
+    # 返回: 无
+    def Restore3D(self):
+        self.file, self.file_name = self.file_3d, self.file_name_3d
+        self.job_hooks.remove(self.eim_hook)
+        self.file_3d = None
@@ -0,0 +1,297 @@
+# ============================================================
+# 文件名称: RsoftStore.py
+# 模块功能: 仿真结果列式存储，每个研究（Sim / Scan / Optimize 轮次 / OEDsim）一个存储文件
+# 功能概述:
+#   - 每个任务完成时追加一行到日志 {run_path}_store.jsonl（多线程安全）
+#   - 研究结束时压缩为列式 {run_path}_store.npz（前缀、symbol 取值、波长、各端口功率、耗时、设计哈希、命令）
+#   - 可选将完整功率曲线（.mon 全部记录）一并打包
+#   - 可选项目级目录 results_catalog.json，登记所有研究的存储位置与规模
+#   - RsoftData 检测到存储文件时直接从中加载，无需遍历 .mon 文件
+#   - 研究清单 {run_path}_manifest.jsonl: 提交任务时逐行记录 前缀 → 任务 symbol 取值，
+#     RsoftData 据此按索引构建仿真矩阵（与目录列举顺序、文件名格式无关，可在任务未全部完成时分析）
+#   - 研究已打包（RsoftArchive.pack_study）且原目录不存在时，存储与清单从归档中按成员读取
+# 依赖模块: os, json, hashlib, threading, numpy, RsoftMon, RsoftArchive
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import json
+import time
+import hashlib
+import threading
+import numpy as np
+from RsoftMon import *
+from RsoftArchive import study_files
+
+
+# === 设计文件哈希（按路径 + 修改时间缓存）===
+design_hash_cache = {}
+
+def design_hash(ind_file):
+    stamp = os.path.getmtime(ind_file)
+    cached = design_hash_cache.get(ind_file)
+    if cached is None or cached[0] != stamp:
+        with open(ind_file, "rb") as f:
+            cached = (stamp, hashlib.sha1(f.read()).hexdigest())
+        design_hash_cache[ind_file] = cached
+    return cached[1]
+
+
+# ============================================================
+# 类名: ResultStore
+# 功能: 单个研究的结果存储
+# 列（load 后的 self.columns）:
+#   prefix      - (n,) 仿真前缀
+#   names       - (n_symbol,) 任务 symbol 名（按首次出现顺序）
+#   overrides   - (n, n_symbol) symbol 取值字符串（缺失为 ""）
+#   values      - (n, n_symbol) symbol 数值（非数值或缺失为 nan）
+#   wave        - (n,) 波长
+#   power       - (n, n_out) 各端口输出功率（结果文件缺失时为 nan）
+#   time        - (n,) 求解耗时（秒）
+#   design_hash - (n,) ind 文件 sha1
+#   command     - (n,) 完整求解命令
+#   mon         - (n,) .mon 文件路径（相对 run_path，分片布局时含分片子目录）
+#   trace_data / trace_offset - 可选，全部功率曲线按行拼接及各行起始位置
+# ============================================================
+class ResultStore:
+    # ------------------------------------------------------------
+    # 构造函数: __init__
+    # 参数:
+    #   run_path - 研究结果目录（.mon 所在目录），存储文件为 {run_path}_store.npz / .jsonl
+    # ------------------------------------------------------------
+    def __init__(self, run_path=str):
+        self.run_path = run_path
+        self.npz_path = run_path + "_store.npz"
+        self.log_path = run_path + "_store.jsonl"
+        self.lock = threading.Lock()
+        self.columns = None
+        # 文件访问: 磁盘文件或研究归档（只读）
+        self.files = study_files(run_path)
+
+    # === 存储文件是否存在 ===
+    def exists(self):
+        return self.files.isfile(self.npz_path) or self.files.isfile(self.log_path)
+
+    # === 清空存储（新研究开始时调用）===
+    def reset(self):
+        for path in (self.npz_path, self.log_path):
+            if os.path.isfile(path):
+                os.remove(path)
+        self.columns = None
+
+    # === 追加一个已完成任务 ===
+    # 函数名: append
+    # 参数:
+    #   prefix        : 仿真前缀
+    #   symbol_values : [(symbol, value), ...] 任务参数
+    #   wave          : 任务波长
+    #   mon_path      : .mon 文件路径（不存在时功率记为空）
+    #   elapsed       : 求解耗时（秒）
+    #   ind_file      : 使用的 ind 文件
+    #   command       : 完整求解命令
+    # 返回:
+    #   power         : 各端口输出功率（结果文件缺失时为空列表）
+    def append(self, prefix, symbol_values, wave, mon_path, elapsed, ind_file, command):
+        power = last_record(mon_path)[1:] if os.path.isfile(mon_path) else []
+        row = {"prefix": prefix, "symbols": [[str(k), str(v)] for k, v in symbol_values], "wave": wave,
+               "power": power, "time": elapsed, "design_hash": design_hash(ind_file), "command": command,
+               "mon": os.path.relpath(mon_path, self.run_path).replace(os.sep, "/")}
+        line = json.dumps(row) + "\n"
+        with self.lock:
+            with open(self.log_path, "a") as f:
+                f.write(line)
+            self.columns = None
+        return power
+
+    # === 读取日志中的行 ===
+    def journal(self):
+        if not self.files.isfile(self.log_path):
+            return []
+        with self.files.open_text(self.log_path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    # === 加载全部列（压缩文件 + 尚未压缩的日志行）===
+    # 函数名: load
+    # 返回:
+    #   columns : 列字典（见类说明）
+    def load(self):
+        with self.lock:
+            return self.read()
+
+    def read(self):
+        if self.columns is None:
+            rows = self.journal()
+            columns = {}
+            if self.files.isfile(self.npz_path):
+                columns = self.files.load_npz(self.npz_path)
+            if rows:
+                columns = self.merge(columns, rows)
+            self.columns = columns
+        return self.columns
+
+    # === 将日志行并入列 ===
+    def merge(self, columns, rows):
+        names = list(columns.get("names", []))
+        for row in rows:
+            for k, _ in row["symbols"]:
+                if k not in names:
+                    names.append(k)
+        index = {name: i for i, name in enumerate(names)}
+        n_old = len(columns.get("prefix", []))
+        n_out = max([len(row["power"]) for row in rows] + [columns["power"].shape[1] if n_old else 0])
+
+        overrides = np.full((n_old + len(rows), len(names)), "", dtype=object)
+        power = np.full((n_old + len(rows), n_out), np.nan)
+        if n_old:
+            overrides[:n_old, :columns["overrides"].shape[1]] = columns["overrides"]
+            power[:n_old, :columns["power"].shape[1]] = columns["power"]
+        for r, row in enumerate(rows, n_old):
+            for k, v in row["symbols"]:
+                overrides[r, index[k]] = v
+            power[r, :len(row["power"])] = row["power"]
+
+        def extend(name, values, dtype):
+            old = columns[name] if n_old else np.array([], dtype=dtype)
+            return np.concatenate([old.astype(dtype), np.array(values, dtype=dtype)])
+
+        merged = {
+            "prefix": extend("prefix", [row["prefix"] for row in rows], str),
+            "names": np.array(names, dtype=str),
+            "overrides": overrides.astype(str),
+            "values": numeric(overrides),
+            "wave": extend("wave", [np.nan if row["wave"] is None else row["wave"] for row in rows], float),
+            "power": power,
+            "time": extend("time", [row["time"] for row in rows], float),
+            "design_hash": extend("design_hash", [row["design_hash"] for row in rows], str),
+            "command": extend("command", [row["command"] for row in rows], str),
+            "mon": extend("mon", [row["mon"] for row in rows], str),
+        }
+        # 新增行后原有曲线打包不再完整，在下次 flush(traces=True) 时重新打包
+        return merged
+
+    # === 压缩: 日志并入 npz（可选打包完整功率曲线），删除日志 ===
+    # 函数名: flush
+    # 参数:
+    #   traces : 是否从 .mon 文件读取并打包完整功率曲线
+    # 返回:
+    #   rows   : 存储中的总行数
+    def flush(self, traces=False):
+        with self.lock:
+            columns = self.read()
+            if not columns:
+                return 0
+            if traces and "trace_offset" not in columns:
+                mon_paths = [os.path.join(self.run_path, str(mon)) for mon in columns["mon"]]
+                trace_list = [read_trace(path) if os.path.isfile(path) else np.zeros((0, columns["power"].shape[1] + 1))
+                              for path in mon_paths]
+                columns["trace_offset"] = np.cumsum([0] + [len(trace) for trace in trace_list])
+                columns["trace_data"] = np.concatenate(trace_list)
+            temp_path = self.run_path + "_store.tmp.npz"
+            np.savez(temp_path, **columns)
+            os.replace(temp_path, self.npz_path)
+            if os.path.isfile(self.log_path):
+                os.remove(self.log_path)
+        return len(columns["prefix"])
+
+    # === 读取第 k 行的完整功率曲线（已打包时直接取，否则读取 .mon）===
+    # 返回:
+    #   trace : (nz, 1 + n_out)
+    def trace(self, k):
+        columns = self.load()
+        if "trace_offset" in columns:
+            offset = columns["trace_offset"]
+            return columns["trace_data"][offset[k]:offset[k + 1]]
+        return self.files.read_trace(os.path.join(self.run_path, str(columns["mon"][k])))
+
+
+# === 研究清单: 清空（新研究开始时调用）===
+def reset_manifest(run_path):
+    path = run_path + "_manifest.jsonl"
+    if os.path.isfile(path):
+        os.remove(path)
+
+
+# === 研究清单: 追加一个已提交任务 ===
+# 函数名: append_manifest
+# 参数:
+#   run_path      : 研究结果目录
+#   prefix        : 仿真前缀
+#   symbol_values : [(symbol, value), ...] 任务参数（按提交时的原值记录）
+#   mon           : 结果文件相对 run_path 的路径（None 时为 {prefix}.mon；分片布局时为 分片/短前缀.mon）
+# 返回: 无
+def append_manifest(run_path, prefix, symbol_values, mon=None):
+    row = {"prefix": prefix, "symbols": [[str(k), str(v)] for k, v in symbol_values]}
+    if mon is not None:
+        row["mon"] = mon
+    with open(run_path + "_manifest.jsonl", "a") as f:
+        f.write(json.dumps(row) + "\n")
+
+
+# === 研究清单: 读取为列 ===
+# 函数名: read_manifest
+# 参数:
+#   run_path : 研究结果目录
+# 返回:
+#   columns  : {"prefix", "names", "overrides", "values", "mon"}（同 ResultStore 列），清单不存在或为空时为 None
+def read_manifest(run_path):
+    path = run_path + "_manifest.jsonl"
+    files = study_files(run_path)
+    if not files.isfile(path):
+        return None
+    # 研究进行中读取时，最后一行可能尚未写完整（无换行），忽略该行
+    with files.open_text(path) as f:
+        rows = [json.loads(line) for line in f.read().split("\n")[:-1] if line.strip()]
+    if not rows:
+        return None
+    names = []
+    for row in rows:
+        for k, _ in row["symbols"]:
+            if k not in names:
+                names.append(k)
+    index = {name: i for i, name in enumerate(names)}
+    overrides = np.full((len(rows), len(names)), "", dtype=object)
+    for r, row in enumerate(rows):
+        for k, v in row["symbols"]:
+            overrides[r, index[k]] = v
+    return {
+        "prefix": np.array([row["prefix"] for row in rows], dtype=str),
+        "names": np.array(names, dtype=str),
+        "overrides": overrides.astype(str),
+        "values": numeric(overrides),
+        "mon": np.array([row.get("mon", row["prefix"] + ".mon") for row in rows], dtype=str),
+    }
+
+
+# === 字符串取值转为数值矩阵（非数值为 nan）===
+def numeric(overrides):
+    values = np.full(overrides.shape, np.nan)
+    for index, text in np.ndenumerate(overrides):
+        try:
+            values[index] = float(text)
+        except ValueError:
+            pass
+    return values
+
+
+# === 更新项目级结果目录 ===
+# 函数名: update_catalog
+# 参数:
+#   catalog_path : 目录文件路径（如 file_path/results_catalog.json）
+#   store        : ResultStore 对象
+# 返回: 无
+def update_catalog(catalog_path, store):
+    catalog = {}
+    if os.path.isfile(catalog_path):
+        with open(catalog_path, "r") as f:
+            catalog = json.load(f)
+    columns = store.load()
+    catalog[os.path.abspath(store.run_path)] = {
+        "store": os.path.abspath(store.npz_path),
+        "rows": len(columns.get("prefix", [])),
+        "symbols": [str(name) for name in columns.get("names", [])],
+        "design_hash": sorted({str(h) for h in columns.get("design_hash", [])}),
+        "updated": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    with open(catalog_path, "w") as f:
+        json.dump(catalog, f, indent=2)
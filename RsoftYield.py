@@ -0,0 +1,285 @@
+# ============================================================
+# 文件名称: RsoftYield.py
+# 模块功能: 工艺容差蒙特卡洛良率分析（拉丁超立方抽样 + 流式统计）
+# 功能概述:
+#   - 各 symbol（width / Gap / Wd / Delta ...）按指定分布抽样，拉丁超立方分层抽样降低方差
+#   - 每个样本（全部 wave 完成后）计算各端口 IL、ILmax、EL、UL（wave 上取最坏情况），按指标上限判定是否合格
+#   - 均值 / 标准差（Welford）与分位数（P² 算法）均为在线估计，不保留原始结果，样本目录可在完成后立即删除
+#   - 良率置信区间为 Wilson 区间，区间宽度小于目标时提前结束
+#   - 每个样本的取值、指标与判定结果逐行记录于 {run_path}_samples.jsonl
+# 依赖模块: os, re, json, threading, numpy, scipy, tabulate
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import re
+import json
+import threading
+import numpy as np
+from scipy import stats
+from tabulate import tabulate
+
+# 可设上限的指标名: IL1 / IL2 ...（各端口）、ILmax、EL、UL
+limit_pattern = re.compile(r"IL\d+|ILmax|EL|UL")
+
+
+# === 由分布描述构造 scipy 分布 ===
+# 函数名: make_distribution
+# 参数:
+#   spec    : ("normal", 均值, 标准差) / ("uniform", 下限, 上限) / ("triangular", 下限, 众数, 上限)
+#             均值（或众数）为 None 时取 ind 文件中的名义值；也可直接传入 scipy.stats 的冻结分布
+#   nominal : 名义值（spec 中为 None 的位置使用）
+# 返回:
+#   dist    : 具有 ppf 方法的分布对象
+def make_distribution(spec, nominal=None):
+    if hasattr(spec, "ppf"):
+        return spec
+    kind, *params = spec
+    params = [nominal if param is None else float(param) for param in params]
+    if None in params:
+        raise ValueError(f"Distribution {spec} needs a nominal value, but the symbol has no numeric value in the ind file")
+    if kind == "normal":
+        return stats.norm(loc=params[0], scale=params[1])
+    if kind == "uniform":
+        return stats.uniform(loc=params[0], scale=params[1] - params[0])
+    if kind == "triangular":
+        low, mode, high = params
+        return stats.triang((mode - low) / (high - low), loc=low, scale=high - low)
+    raise ValueError(f"Unknown distribution '{kind}', available: normal / uniform / triangular")
+
+
+# === 拉丁超立方抽样 ===
+# 函数名: latin_hypercube
+# 参数:
+#   n   : 样本数
+#   d   : 维数
+#   rng : numpy 随机数生成器
+# 返回:
+#   u   : (n, d) [0, 1) 均匀样本，每一维的 n 个等分区间中各有一个样本
+def latin_hypercube(n, d, rng):
+    strata = rng.permuted(np.tile(np.arange(n), (d, 1)), axis=1).T
+    return (strata + rng.random((n, d))) / n
+
+
+# ============================================================
+# 类名: OnlineStats
+# 功能: 多个量的在线均值、方差、最小值、最大值（Welford 算法）
+# ============================================================
+class OnlineStats:
+    def __init__(self, size):
+        self.count = 0
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = np.minimum(self.min, x)
+        self.max = np.maximum(self.max, x)
+
+    def std(self):
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.full(len(self.mean), np.nan)
+
+
+# ============================================================
+# 类名: P2Quantile
+# 功能: 多个量的在线分位数估计（P² 算法，每个量只保存 5 个标记点）
+# ============================================================
+class P2Quantile:
+    def __init__(self, p, size):
+        self.p = p
+        self.size = size
+        self.initial = []
+        self.heights = None
+        # 标记点的实际位置（每个量不同）与期望位置（所有量相同）
+        self.positions = None
+        self.desired = np.array([0, 2 * p, 4 * p, 2 + 2 * p, 4])
+        self.increment = np.array([0, p / 2, p, (1 + p) / 2, 1])
+
+    def add(self, x):
+        if self.heights is None:
+            self.initial.append(np.array(x, dtype=float))
+            if len(self.initial) == 5:
+                self.heights = np.sort(np.stack(self.initial, axis=1), axis=1)
+                self.positions = np.tile(np.arange(5.0), (self.size, 1))
+            return
+        q, n = self.heights, self.positions
+        q[:, 0] = np.minimum(q[:, 0], x)
+        q[:, 4] = np.maximum(q[:, 4], x)
+        # x 所在的区间 k（0..3），其后的标记点位置加 1
+        k = (x[:, None] >= q[:, 1:4]).sum(axis=1)
+        n += np.arange(5)[None, :] > k[:, None]
+        self.desired = self.desired + self.increment
+        for i in range(1, 4):
+            d = self.desired[i] - n[:, i]
+            move = ((d >= 1) & (n[:, i + 1] - n[:, i] > 1)) | ((d <= -1) & (n[:, i - 1] - n[:, i] < -1))
+            if not move.any():
+                continue
+            s = np.sign(d)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                parabolic = q[:, i] + s / (n[:, i + 1] - n[:, i - 1]) * (
+                    (n[:, i] - n[:, i - 1] + s) * (q[:, i + 1] - q[:, i]) / (n[:, i + 1] - n[:, i])
+                    + (n[:, i + 1] - n[:, i] - s) * (q[:, i] - q[:, i - 1]) / (n[:, i] - n[:, i - 1]))
+                neighbour = np.where(s > 0, i + 1, i - 1)
+                rows = np.arange(self.size)
+                linear = q[:, i] + s * (q[rows, neighbour] - q[:, i]) / (n[rows, neighbour] - n[:, i])
+            adjusted = np.where((q[:, i - 1] < parabolic) & (parabolic < q[:, i + 1]), parabolic, linear)
+            q[:, i] = np.where(move, adjusted, q[:, i])
+            n[:, i] += np.where(move, s, 0)
+
+    def value(self):
+        if self.heights is None:
+            if not self.initial:
+                return np.full(self.size, np.nan)
+            return np.quantile(np.stack(self.initial, axis=1), self.p, axis=1)
+        return self.heights[:, 2]
+
+
+# ============================================================
+# 类名: YieldStudy
+# 功能: 良率研究的流式汇总（线程安全，由仿真线程池中的任务直接调用）
+# 属性:
+#   samples / passed / failed - 已完成的样本数 / 合格数 / 仿真失败数（无结果文件，不计入良率）
+# ============================================================
+class YieldStudy:
+    # ------------------------------------------------------------
+    # 构造函数: __init__
+    # 参数:
+    #   run_path   - 研究结果目录
+    #   symbols    - 抽样的 symbol 名列表
+    #   limits     - {指标名: 上限}（如 {"ILmax": 3.6, "UL": 0.3}），全部满足为合格
+    #   quantiles  - 在线估计的分位数
+    #   confidence - 良率置信区间的置信水平
+    # ------------------------------------------------------------
+    def __init__(self, run_path, symbols, limits, quantiles=(0.05, 0.5, 0.95), confidence=0.95):
+        unknown = [name for name in limits if not limit_pattern.fullmatch(name)]
+        if unknown:
+            raise ValueError(f"Unknown yield limits {unknown}, available: IL1, IL2, ..., ILmax, EL, UL")
+        self.run_path = run_path
+        self.symbols = list(symbols)
+        self.limits = dict(limits)
+        self.quantile_levels = list(quantiles)
+        self.confidence = confidence
+        self.z = stats.norm.ppf(0.5 + confidence / 2)
+        self.lock = threading.Lock()
+        self.journal_path = run_path + "_samples.jsonl"
+        if os.path.isfile(self.journal_path):
+            os.remove(self.journal_path)
+        self.names = None
+        self.stats = None
+        self.quantiles = None
+        # 未完成的样本 {样本号: [symbol 取值, 各 wave 的功率]}
+        self.pending = {}
+        self.samples = self.passed = self.failed = 0
+
+    # === 登记一个样本（提交任务前调用）===
+    def expect(self, sample, values, n_wave):
+        with self.lock:
+            self.pending[sample] = [list(values), [None] * n_wave]
+
+    # === 并入一个任务结果 ===
+    # 函数名: add
+    # 参数:
+    #   sample : 样本号
+    #   k      : wave 序号
+    #   power  : 各端口输出功率（结果文件缺失时为空列表）
+    # 返回:
+    #   done   : 该样本的全部 wave 是否均已完成（完成后即可删除样本目录）
+    def add(self, sample, k, power):
+        with self.lock:
+            values, powers = self.pending[sample]
+            powers[k] = list(power)
+            if any(item is None for item in powers):
+                return False
+            del self.pending[sample]
+            if not all(powers) or len(set(map(len, powers))) != 1:
+                self.failed += 1
+                self.write_sample(sample, values, None, False)
+                return True
+            metrics = self.metrics(np.array(powers))
+            passed = all(metrics.get(name, np.inf) <= limit for name, limit in self.limits.items())
+            x = np.array(list(metrics.values()))
+            if self.names is None:
+                self.names = list(metrics)
+                self.stats = OnlineStats(len(x))
+                self.quantiles = [P2Quantile(p, len(x)) for p in self.quantile_levels]
+            self.stats.add(x)
+            for quantile in self.quantiles:
+                quantile.add(x)
+            self.samples += 1
+            self.passed += passed
+            self.write_sample(sample, values, metrics, passed)
+            return True
+
+    # === 单个样本的指标（wave 上取最坏情况）===
+    # 参数:
+    #   power   : (n_wave, n_out) 各 wave 各端口输出功率
+    # 返回:
+    #   metrics : {"IL1": .., "IL2": .., "ILmax": .., "EL": .., "UL": ..}
+    def metrics(self, power):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            IL = -10 * np.log10(power)
+            EL = -10 * np.log10(power.sum(axis=1))
+        metrics = {f"IL{i + 1}": value for i, value in enumerate(IL.max(axis=0))}
+        metrics["ILmax"] = IL.max()
+        metrics["EL"] = EL.max()
+        metrics["UL"] = (IL.max(axis=1) - IL.min(axis=1)).max()
+        return {name: float(value) for name, value in metrics.items()}
+
+    def write_sample(self, sample, values, metrics, passed):
+        row = {"sample": sample, "symbols": dict(zip(self.symbols, values)), "metrics": metrics, "pass": passed}
+        with open(self.journal_path, "a") as f:
+            f.write(json.dumps(row) + "\n")
+
+    # === 良率与 Wilson 置信区间 ===
+    # 返回:
+    #   (yield, lower, upper)，尚无样本时为 (nan, 0, 1)
+    def interval(self):
+        n = self.samples
+        if n == 0:
+            return np.nan, 0.0, 1.0
+        p, z2 = self.passed / n, self.z ** 2
+        center = (p + z2 / (2 * n)) / (1 + z2 / n)
+        half = self.z * np.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+        return p, max(center - half, 0.0), min(center + half, 1.0)
+
+    # === 置信区间宽度 ===
+    def width(self):
+        _, lower, upper = self.interval()
+        return upper - lower
+
+    # === 汇总 ===
+    # 返回:
+    #   summary : {"samples", "passed", "failed", "yield", "interval", "confidence", "metrics": {指标: {mean, std, min, max, q..}}}
+    def summary(self):
+        with self.lock:
+            rate, lower, upper = self.interval()
+            summary = {"samples": self.samples, "passed": self.passed, "failed": self.failed, "yield": rate,
+                       "interval": (lower, upper), "confidence": self.confidence, "metrics": {}}
+            if self.names is not None:
+                columns = {"mean": self.stats.mean, "std": self.stats.std(), "min": self.stats.min, "max": self.stats.max}
+                columns.update({f"q{p:g}": quantile.value() for p, quantile in zip(self.quantile_levels, self.quantiles)})
+                for i, name in enumerate(self.names):
+                    summary["metrics"][name] = {key: float(value[i]) for key, value in columns.items()}
+            return summary
+
+    # === 写出结果表格 {run_path}_result.txt ===
+    def report(self):
+        summary = self.summary()
+        result_path = self.run_path + "_result.txt"
+        with open(result_path, "w") as f:
+            keys = ["mean", "std", "min"] + [f"q{p:g}" for p in self.quantile_levels] + ["max"]
+            table = [["metric"] + keys + ["limit"]]
+            for name, values in summary["metrics"].items():
+                table.append([name] + [round(values[key], 4) for key in keys] + [self.limits.get(name, "")])
+            f.write(tabulate(table, tablefmt="plain") + "\n\n")
+            lower, upper = summary["interval"]
+            f.write(f"samples={summary['samples']},passed={summary['passed']},failed={summary['failed']}\n")
+            f.write(f"yield={round(summary['yield'], 4)},interval({summary['confidence']:g})=[{round(lower, 4)}, {round(upper, 4)}]\n")
+        print(f"{result_path} 创建成功")
+        return result_path
@@ -0,0 +1,109 @@
+# ============================================================
+# 文件名称: bench_archive.py
+# 模块功能: 研究打包基准测试（散文件研究 vs 单个归档: 复制、加载与随机读取曲线）
+# 使用方式:
+#   python benchmarks/bench_archive.py [rows] [cols] [nz]   # 默认 500 × 10 个任务，每个 .mon nz=200 条记录
+# 说明:
+#   - 替身求解器在进程内运行，每个任务写出 .mon 与一个文本场文件（场文件不打包）
+#   - 复制: 研究目录与研究文件逐个复制 vs 复制一个归档（同一磁盘内，网络共享上文件数的影响更大）
+#   - 加载: 清空进程内缓存后计算指标、load_study，并随机读取 20 条完整功率曲线
+#   - 两种来源的指标与曲线应完全一致
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import RsoftMon
+import RsoftArchive
+from RsoftSimulation import RsoftSimulation
+from RsoftData import RsoftData
+from RsoftArray import load_study
+from RsoftArchive import pack_study, study_patterns, study_suffixes
+
+
+# === 替身求解器: 写出 nz 条记录的 .mon 与场文件 ===
+def standin(nz):
+    z = np.arange(nz, dtype=float)
+
+    def run_command(command, work_dir):
+        symbols = dict(arg.split("=", 1) for arg in command.split()[2:])
+        prefix = os.path.join(work_dir, symbols["prefix"])
+        power = 0.4 + 0.001 * float(symbols["Lta"]) - 0.01 * float(symbols["wave"])
+        trace = np.column_stack([z, power * np.exp(-z / nz / 10), 0.9 * power * np.exp(-z / nz / 5)])
+        np.savetxt(prefix + ".mon", trace, fmt="%.6g")
+        np.savetxt(prefix + ".fld", trace[:, 1:] * 2, fmt="%.6e")
+    return run_command
+
+
+# === 清空缓存后加载: 指标、带轴名数组、随机 20 条曲线 ===
+def load(run_path, picks):
+    RsoftMon.record_cache.clear()
+    RsoftMon.trace_cache.clear()
+    RsoftArchive.open_archives.clear()
+    start = time.perf_counter()
+    data = RsoftData(run_path, lazy=True)
+    mean = data.mean_matrix
+    power = load_study(run_path).values
+    traces = [data.trace(i, j)[1] for i, j in picks]
+    return time.perf_counter() - start, mean, power, traces
+
+
+# === 复制研究（目录 + 目录外的研究文件）===
+def copy_loose(run_path, target):
+    shutil.copytree(run_path, target)
+    for suffix in study_suffixes:
+        if os.path.isfile(run_path + suffix):
+            shutil.copy2(run_path + suffix, target + suffix)
+
+
+if __name__ == "__main__":
+    rows, cols, nz = [int(v) for v in sys.argv[1:4]] if len(sys.argv) == 4 else (500, 10, 200)
+    values = [list(range(100, 100 + rows)), np.round(np.linspace(1.26, 1.65, cols), 3).tolist()]
+    picks = [tuple(pick) for pick in np.random.default_rng(0).integers(0, [rows, cols], size=(20, 2))]
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "test.ind"), "w") as f:
+            f.write("wave = 1.55\nLta = 100\n")
+        simulation = RsoftSimulation(directory, "test", 4, "off", desktop="headless")
+        simulation.run_command = standin(nz)
+        simulation.plot_mode = "off"
+        simulation.catalog = None
+        simulation.Scan(["Lta", "wave"], values)
+        simulation.wait_completion()
+        run_path = os.path.join(directory, "test_Scan", f"Lta({values[0][0]}_{values[0][-1]})_wave({values[1][0]}_{values[1][-1]})")
+        for suffix in ("_metrics.npz", "_records.npz"):
+            if os.path.isfile(run_path + suffix):
+                os.remove(run_path + suffix)
+
+        loose_target = os.path.join(directory, "copy_loose", os.path.basename(run_path))
+        start = time.perf_counter()
+        copy_loose(run_path, loose_target)
+        loose_copy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        archive_path = pack_study(run_path)
+        pack_time = time.perf_counter() - start
+        archive_target = os.path.join(directory, "copy_archive", os.path.basename(run_path))
+        os.makedirs(os.path.dirname(archive_target))
+        start = time.perf_counter()
+        shutil.copy2(archive_path, archive_target + ".zip")
+        archive_copy = time.perf_counter() - start
+
+        loose_load, *loose_result = load(loose_target, picks)
+        archive_load, *archive_result = load(archive_target, picks)
+        assert np.array_equal(loose_result[0], archive_result[0])
+        assert np.array_equal(loose_result[1], archive_result[1], equal_nan=True)
+        assert all(np.array_equal(a, b) for a, b in zip(loose_result[2], archive_result[2]))
+
+        files = sum(len(names) for _, _, names in os.walk(loose_target))
+        size = sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(loose_target) for name in names)
+        print(f"{rows} × {cols} = {rows * cols} 个任务，.mon nz={nz}，打包 {study_patterns}")
+        print(f"散文件: {files} 个文件 {size / 2 ** 20:.1f} MB  复制 {loose_copy * 1000:8.1f} ms  加载 {loose_load * 1000:8.1f} ms")
+        print(f"归档:   1 个文件 {os.path.getsize(archive_path) / 2 ** 20:.1f} MB  复制 {archive_copy * 1000:8.1f} ms  "
+              f"加载 {archive_load * 1000:8.1f} ms  （打包 {pack_time:.2f} s）")
@@ -0,0 +1,83 @@
+# ============================================================
+# 文件名称: bench_batch.py
+# 模块功能: 批量求解基准测试（逐个调用求解器 vs 任务文件）
+# 使用方式:
+#   python benchmarks/bench_batch.py [points] [startup] [per_job]   # 默认 12 个取值 × 4 个波长，启动 0.3 s，单任务 0.02 s
+# 说明:
+#   - 替身求解器每次进程启动等待 startup 秒（模拟许可证签出、设计解析与窗口创建），每个任务等待 per_job 秒后写出 .mon
+#   - 替身求解器与 RsoftBPM 一样接受 jobs=任务文件；没有多任务接口的求解器（bsimw32，batch_interface=None）
+#     开启批量求解时应在提交任务时报错，而不是把并行任务串行化
+#   - 两种模式的结果目录均由 RsoftData 分析，输出功率矩阵应完全一致
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RsoftSimulation import RsoftSimulation
+from RsoftData import RsoftData
+
+# === 替身求解器（参数格式与 bsimw32 / RsoftBPM 相同）===
+standin = '''
+import sys, time
+startup, per_job = float(sys.argv[1]), float(sys.argv[2])
+args = sys.argv[4:]
+jobs = [line.split() for line in open(args[0][5:])] if args[0].startswith("jobs=") else [args]
+time.sleep(startup)
+for job in jobs:
+    symbols = dict(arg.split("=", 1) for arg in job)
+    time.sleep(per_job)
+    power = 0.4 + 0.001 * float(symbols["Lta"]) - 0.01 * float(symbols["wave"])
+    with open(symbols["prefix"] + ".mon", "w") as f:
+        for z in range(5):
+            f.write(f"{z} {power} {power * 0.9}\\n")
+'''
+
+
+def run(directory, mode, interface, values, startup, per_job):
+    solver_file = os.path.join(directory, "standin.py")
+    simulation = RsoftSimulation(directory, "test", 4, "off", solver=f'"{sys.executable}" "{solver_file}" {startup} {per_job}')
+    simulation.plot_mode = "off"
+    simulation.live_interval = None
+    simulation.catalog = None
+    simulation.batch_mode = mode
+    simulation.batch_interface = interface
+    start = time.perf_counter()
+    simulation.Scan(["Lta", "wave"], values)
+    elapsed = time.perf_counter() - start
+    simulation.wait_completion()
+    run_path = os.path.join(directory, "test_Scan", f"Lta({values[0][0]}_{values[0][-1]})_wave({values[1][0]}_{values[1][-1]})")
+    return elapsed, RsoftData(run_path, lazy=True).output_matrix
+
+
+if __name__ == "__main__":
+    points, startup, per_job = (int(sys.argv[1]), float(sys.argv[2]), float(sys.argv[3])) if len(sys.argv) == 4 else (12, 0.3, 0.02)
+    values = [list(range(100, 100 + 50 * points, 50)), [1.31, 1.49, 1.55, 1.65]]
+    n = points * len(values[1])
+    results = {}
+    for label, mode, interface in (("逐个调用", "off", None), ("任务文件", "on", "jobs")):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "test.ind"), "w") as f:
+                f.write("wave = 1.55\nLta = 100\n")
+            with open(os.path.join(directory, "standin.py"), "w") as f:
+                f.write(standin)
+            results[label] = run(directory, mode, interface, values, startup, per_job)
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "test.ind"), "w") as f:
+            f.write("wave = 1.55\nLta = 100\n")
+        try:
+            run(directory, "on", None, values, startup, per_job)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("batch_mode='on' without a jobs interface must be refused")
+    reference = results["逐个调用"][1]
+    print(f"{n} 个任务，4 线程，启动 {startup} s，单任务 {per_job} s")
+    for label, (elapsed, output) in results.items():
+        assert np.array_equal(output, reference)
+        print(f"{label}: {elapsed:6.2f} s  {n / elapsed:6.1f} 任务/s")
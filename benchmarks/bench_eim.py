@@ -0,0 +1,73 @@
+# ============================================================
+# 文件名称: bench_eim.py
+# 模块功能: 平板有效折射率求解基准测试（逐点求解 vs 对波长 / 截面向量化的二分法）与 TE / TM 已知解校验
+# 使用方式:
+#   python benchmarks/bench_eim.py [points]   # 默认 2000 个 (厚度, 波长) 截面
+# 说明:
+#   - 已知解: 取 u = π/4 + mπ/2 使 tan(u - mπ/2) = 1，则 w = u / r（TE: r = 1，TM: r = ncore²/nclad²），
+#     由 V² = u² + w² 反求芯层厚度，精确解 neff = sqrt(ncore² - (u / k0a)²)，slab_neff 须与之一致
+#   - 另检查全部结果满足所选偏振的色散方程，且 220 nm SOI 平板的 TM 基模 neff 约为 2.05（低于 TE 基模）
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RsoftEIM import slab_neff
+
+
+# === 构造的已知解: 返回 (芯层厚度, 精确 neff) ===
+def known_solution(n_core, n_clad, wave, order, pol):
+    ratio = 1.0 if pol == "TE" else n_core ** 2 / n_clad ** 2
+    u = np.pi / 4 + order * np.pi / 2
+    w = u / ratio
+    k0a = np.sqrt(u ** 2 + w ** 2) / np.sqrt(n_core ** 2 - n_clad ** 2)
+    thickness = k0a * wave / np.pi
+    return thickness, np.sqrt(n_core ** 2 - (u / k0a) ** 2)
+
+
+# === 色散方程残差（u·tan(u - mπ/2) - r·w）===
+def residual(neff, n_core, n_clad, thickness, wave, order, pol):
+    ratio = 1.0 if pol == "TE" else n_core ** 2 / n_clad ** 2
+    k0a = np.pi * thickness / wave
+    u = k0a * np.sqrt(n_core ** 2 - neff ** 2)
+    w = k0a * np.sqrt(neff ** 2 - n_clad ** 2)
+    return u * np.tan(u - order * np.pi / 2) - ratio * w
+
+
+if __name__ == "__main__":
+    points = int(sys.argv[1]) if len(sys.argv) == 2 else 2000
+
+    # === 已知解校验 ===
+    for n_core, n_clad in ((3.476, 1.444), (1.50, 1.45), (2.0, 1.0)):
+        for pol in ("TE", "TM"):
+            for order in (0, 1):
+                thickness, exact = known_solution(n_core, n_clad, 1.55, order, pol)
+                neff = slab_neff(n_core, n_clad, thickness, 1.55, order=order, pol=pol)
+                assert abs(neff - exact) < 1e-9, (n_core, n_clad, pol, order, float(neff), exact)
+    te, tm = slab_neff(3.476, 1.444, 0.22, 1.55), slab_neff(3.476, 1.444, 0.22, 1.55, pol="TM")
+    assert 2.0 < tm < 2.1 < te
+
+    # === 向量化 vs 逐点 ===
+    rng = np.random.default_rng(0)
+    thickness = rng.uniform(0.15, 0.5, points)
+    wave = rng.uniform(1.26, 1.66, points)
+    results = {}
+    for pol in ("TE", "TM"):
+        start = time.perf_counter()
+        loop = np.array([slab_neff(3.476, 1.444, t, l, pol=pol) for t, l in zip(thickness, wave)])
+        loop_time = time.perf_counter() - start
+        start = time.perf_counter()
+        vectorized = slab_neff(3.476, 1.444, thickness, wave, pol=pol)
+        vector_time = time.perf_counter() - start
+        assert np.allclose(loop, vectorized, rtol=0, atol=1e-12)
+        assert np.abs(residual(vectorized, 3.476, 1.444, thickness, wave, 0, pol)).max() < 1e-8
+        results[pol] = (loop_time, vector_time)
+
+    print(f"SOI 220 nm @ 1.55 µm: TE0 neff = {float(te):.4f}, TM0 neff = {float(tm):.4f}")
+    for pol, (loop_time, vector_time) in results.items():
+        print(f"{pol}: {points} 个截面  逐点 {loop_time * 1e3:8.2f} ms  向量化 {vector_time * 1e3:6.2f} ms  加速 {loop_time / vector_time:5.1f}×")
@@ -0,0 +1,101 @@
+# ============================================================
+# 文件名称: bench_field.py
+# 模块功能: 场文件指标基准测试（逐个 read_field 计算 vs field_metrics / power_maps 首次解析与 memmap 缓存复用）
+# 使用方式:
+#   python benchmarks/bench_field.py [rows] [cols] [nx] [nz]   # 默认 100 × 10 个任务，场 nx=2048，XZ 图 nz=200
+# 说明:
+#   - 替身求解器在进程内运行，每个任务写出 .mon、复数输出场 .fld（两个高斯端口）与实数 XZ 等高线图 .pcs
+#   - 逐个计算: RsoftMode.read_field 读取后逐个求重叠积分与端口功率（XZ 图按行解析后求和）
+#   - 两种方式的结果应一致（缓存为单精度，相对误差 < 1e-5）
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RsoftSimulation import RsoftSimulation
+from RsoftArray import study_index
+from RsoftMode import write_field, read_field
+from RsoftField import field_metrics, power_maps
+
+windows = [(-10.0, 8.0), (10.0, 8.0)]
+
+
+# === 替身求解器: 输出场为两个端口的高斯场之和，XZ 图为两端口间功率随 z 转移的幅值分布 ===
+def standin(nx, nz):
+    x = np.linspace(-40, 40, nx)
+    z = np.linspace(0, 1000, nz)
+
+    def run_command(command, work_dir):
+        symbols = dict(arg.split("=", 1) for arg in command.split()[2:])
+        prefix = os.path.join(work_dir, symbols["prefix"])
+        split = np.clip(0.001 * float(symbols["Lta"]) * float(symbols["wave"]), 0, 1)
+        np.savetxt(prefix + ".mon", np.column_stack([z, 1 - split * z / z[-1], split * z / z[-1]]), fmt="%.6g")
+        field = (np.sqrt(1 - split) * np.exp(-((x + 10) / 3) ** 2) + 1j * np.sqrt(split) * np.exp(-((x - 10) / 3) ** 2))
+        write_field(prefix + ".fld", x, field)
+        t = (split * z / z[-1])[:, None]
+        amplitude = np.sqrt(1 - t) * np.exp(-((x + 10) / 3) ** 2) + np.sqrt(t) * np.exp(-((x - 10) / 3) ** 2)
+        with open(prefix + ".pcs", "w") as f:
+            f.write("/rn,a,b/nx0/ls1\n/r,qa,qb\n")
+            f.write(f"{nx} {x[0]:.6g} {x[-1]:.6g} 0 OUTPUT_REAL_3D 0 0\n{nz} {z[0]:.6g} {z[-1]:.6g}\n")
+            np.savetxt(f, amplitude, fmt="%.6e")
+    return run_command, x
+
+
+# === 逐个计算（原有读取方式）===
+def one_by_one(run_path, mode):
+    index, _ = study_index(run_path)
+    eta, power, maps = [], [], []
+    for mon in index["mon"]:
+        stem = os.path.join(run_path, os.path.splitext(str(mon))[0])
+        x, _, field = read_field(stem + ".fld")
+        eta.append(abs(np.sum(field * mode.conj())) ** 2 / np.sum(abs(field) ** 2) / np.sum(abs(mode) ** 2))
+        masks = [abs(x - xc) <= width / 2 for xc, width in windows]
+        power.append([np.sum(abs(field[mask]) ** 2) / np.sum(abs(field) ** 2) for mask in masks])
+        with open(stem + ".pcs", "r") as f:
+            rows = [np.array(line.split(), dtype=float) for line in f.read().splitlines()[4:]]
+        maps.append([[np.sum(row[mask] ** 2) / np.sum(row ** 2) for mask in masks] for row in rows])
+    return np.array(eta), np.array(power), np.array(maps)
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    rows, cols, nx, nz = [int(v) for v in sys.argv[1:5]] if len(sys.argv) == 5 else (100, 10, 2048, 200)
+    values = [list(range(100, 100 + rows)), np.round(np.linspace(1.26, 1.65, cols), 3).tolist()]
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "test.ind"), "w") as f:
+            f.write("wave = 1.55\nLta = 100\n")
+        simulation = RsoftSimulation(directory, "test", 4, "off", desktop="headless")
+        simulation.run_command, x = standin(nx, nz)
+        simulation.plot_mode = "off"
+        simulation.catalog = None
+        simulation.Scan(["Lta", "wave"], values)
+        simulation.wait_completion()
+        run_path = os.path.join(directory, "test_Scan", f"Lta({values[0][0]}_{values[0][-1]})_wave({values[1][0]}_{values[1][-1]})")
+        mode = np.exp(-((x - 10) / 3) ** 2).astype(complex)
+
+        loop_time, (eta, power, maps) = timed(one_by_one, run_path, mode)
+        first_time, first = timed(field_metrics, run_path, [(x, None, mode)], windows)
+        cached_time, cached = timed(field_metrics, run_path, [(x, None, mode)], windows)
+        map_first, map_result = timed(power_maps, run_path, windows)
+        map_cached, map_result = timed(power_maps, run_path, windows)
+
+        flat = cached["overlap"].values.reshape(-1)
+        assert np.allclose(np.sort(flat), np.sort(eta), rtol=1e-5, atol=1e-7)
+        assert np.allclose(np.sort(cached["power"].values.reshape(-1, 2), axis=0), np.sort(power, axis=0), rtol=1e-5, atol=1e-7)
+        assert np.allclose(np.sort(map_result.values.reshape(-1)), np.sort(maps.reshape(-1)), rtol=1e-5, atol=1e-7)
+
+        print(f"{rows} × {cols} = {rows * cols} 个任务，.fld nx={nx}，.pcs {nz} × {nx}")
+        print(f"逐个 read_field:         {loop_time:8.2f} s（场 + XZ 图）")
+        print(f"field_metrics 首次解析: {first_time:8.2f} s  缓存复用 {cached_time:8.2f} s")
+        print(f"power_maps    首次解析: {map_first:8.2f} s  缓存复用 {map_cached:8.2f} s")
@@ -0,0 +1,62 @@
+# ============================================================
+# 文件名称: bench_fom.py
+# 模块功能: FOM 表达式计算基准测试（首次编译 + 缓存后重复计算）
+# 使用方式:
+#   python benchmarks/bench_fom.py [rows] [cols] [n_out]   # 默认 1000 × 10 × 100 = 10⁶ 个功率值
+# 说明:
+#   - 指标矩阵由 RsoftData 的向量化方法计算（不读取 .mon 文件），计时只包含 FOM 求值
+#   - 默认 FOM 的结果应与 (ELmax + WDLmax + ULmax) / 3 完全一致
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RsoftData import RsoftData
+from RsoftFOM import *
+
+expressions = [
+    default_fom,
+    "ELmax + 10 * penalty(ULmax, 0.5)",
+    "max(IL * where(port == 1, 2, 1), 'port')",
+    "mean(EL, 'wave') + max(db(P[1] / P[2]))",
+]
+
+
+# === 构造只含指标矩阵的 RsoftData（同 bench_metrics）===
+def metric_data(power):
+    data = RsoftData.__new__(RsoftData)
+    data.output_matrix = power
+    data.rows, data.cols, data.n_out = power.shape
+    data.symbol1, data.symbol2 = "Lta", "wave"
+    data.unique_value1 = list(range(data.rows))
+    data.unique_value2 = np.linspace(1.26, 1.65, data.cols).tolist()
+    for name in ["IL", "EL", "UL", "WDL", "ILmax_n", "ILmax", "ELmax", "ULmax", "WDLmax"]:
+        getattr(data, name)()
+    return data
+
+
+if __name__ == "__main__":
+    rows, cols, n_out = [int(v) for v in sys.argv[1:4]] if len(sys.argv) == 4 else (1000, 10, 100)
+    power = np.random.default_rng(0).uniform(0.01, 0.5, size=(rows, cols, n_out))
+    print(f"输入规模: {rows} × {cols} × {n_out} = {power.size} 个功率值")
+    data = metric_data(power)
+    namespace = data.fom_namespace()
+
+    for text in expressions:
+        start = time.perf_counter()
+        fom = evaluate_fom(text, namespace, power.shape)
+        first_time = time.perf_counter() - start
+        start = time.perf_counter()
+        repeat = 20
+        for _ in range(repeat):
+            evaluate_fom(text, namespace, power.shape)
+        cached_time = (time.perf_counter() - start) / repeat
+        print(f"{text:45s} 首次(含编译): {first_time * 1e3:7.2f} ms  缓存后: {cached_time * 1e3:7.2f} ms")
+
+    reference = (data.ELmax_matrix + data.WDLmax_matrix + data.ULmax_matrix) / 3
+    assert np.array_equal(evaluate_fom(default_fom, namespace, power.shape), reference)
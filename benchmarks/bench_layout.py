@@ -0,0 +1,105 @@
+# ============================================================
+# 文件名称: bench_layout.py
+# 模块功能: 研究目录布局与保留策略基准测试（平铺 + 全部保留 vs 分片 + mon / top / archive）
+# 使用方式:
+#   python benchmarks/bench_layout.py [rows] [cols] [field_kb]   # 默认 500 × 10 个任务，每个任务场文件 64 KB
+# 说明:
+#   - 替身求解器在进程内运行（不启动子进程），每个任务写出 .mon、文本场文件 .fld、等高线 .pcs、日志 .log，
+#     以及不在 output_suffixes 中的 {前缀}_power.txt（由研究结束时的目录列举处理）
+#   - 目录扫描时间: 列举研究目录并逐项 stat（备份、杀毒软件扫描的主要开销），取最大单目录的条目数
+#   - 各方案的研究结果由 RsoftData 分析，输出功率矩阵应完全一致
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RsoftSimulation import RsoftSimulation
+from RsoftData import RsoftData
+
+
+# === 替身求解器: 解析命令中的 prefix 与 symbol，在工作目录写出全部输出文件 ===
+def standin(field_kb):
+    # 场文件为文本格式的复数场采样（与 RSoft .fld 相同的 ASCII 数值表）
+    samples = np.random.default_rng(0).normal(size=field_kb * 1024 // 14)
+    field = "".join(f"{value:.6e}\n" for value in samples).encode()
+
+    def run_command(command, work_dir):
+        symbols = dict(arg.split("=", 1) for arg in command.split()[2:])
+        prefix = os.path.join(work_dir, symbols["prefix"])
+        power = 0.4 + 0.001 * float(symbols["Lta"]) - 0.01 * float(symbols["wave"])
+        with open(prefix + ".mon", "w") as f:
+            for z in range(5):
+                f.write(f"{z} {power} {power * 0.9}\n")
+        with open(prefix + ".fld", "wb") as f:
+            f.write(field)
+        with open(prefix + ".pcs", "wb") as f:
+            f.write(field[:len(field) // 4])
+        with open(prefix + ".log", "w") as f:
+            f.write(command + "\n")
+        with open(prefix + "_power.txt", "w") as f:
+            f.write(f"{power}\n")
+    return run_command
+
+
+# === 扫描目录: 逐项 stat，返回 (文件数, 总字节数, 最大单目录条目数, 耗时) ===
+def scan(path):
+    start = time.perf_counter()
+    files, size, widest = 0, 0, 0
+    stack = [path]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            entries = list(entries)
+        widest = max(widest, len(entries))
+        for entry in entries:
+            if entry.is_dir():
+                stack.append(entry.path)
+            else:
+                files += 1
+                size += entry.stat().st_size
+    return files, size, widest, time.perf_counter() - start
+
+
+def run(directory, layout, retention, values, field_kb):
+    simulation = RsoftSimulation(directory, "test", 4, "off", desktop="headless")
+    simulation.run_command = standin(field_kb)
+    simulation.plot_mode = "off"
+    simulation.live_interval = 5.0
+    simulation.catalog = None
+    simulation.layout = layout
+    simulation.retention = retention
+    start = time.perf_counter()
+    simulation.Scan(["Lta", "wave"], values)
+    elapsed = time.perf_counter() - start
+    simulation.wait_completion()
+    run_path = os.path.join(directory, "test_Scan", f"Lta({values[0][0]}_{values[0][-1]})_wave({values[1][0]}_{values[1][-1]})")
+    files, size, widest, scan_time = scan(run_path)
+    if os.path.isfile(run_path + "_outputs.zip"):
+        size += os.path.getsize(run_path + "_outputs.zip")
+    return elapsed, files, size, widest, scan_time, RsoftData(run_path, lazy=True).output_matrix
+
+
+if __name__ == "__main__":
+    rows, cols, field_kb = [int(v) for v in sys.argv[1:4]] if len(sys.argv) == 4 else (500, 10, 64)
+    values = [list(range(100, 100 + rows)), np.round(np.linspace(1.26, 1.65, cols), 3).tolist()]
+    results = {}
+    for layout, retention in (("flat", "all"), ("flat", "mon"), ("flat", "archive"),
+                              ("sharded", "all"), ("sharded", "mon"), ("sharded", "top"), ("sharded", "archive")):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "test.ind"), "w") as f:
+                f.write("wave = 1.55\nLta = 100\n")
+            results[f"{layout}/{retention}"] = run(directory, layout, retention, values, field_kb)
+    print(f"{rows} × {cols} = {rows * cols} 个任务，每个任务 .mon + {field_kb} KB .fld + .pcs + .log + _power.txt")
+    reference = results["flat/all"][-1]
+    for label, (elapsed, files, size, widest, scan_time, output) in results.items():
+        assert np.array_equal(output, reference)
+        # "mon" / "archive" 只留下 .mon（研究目录中另有结果存储文件）
+        if label.endswith(("/mon", "/archive")):
+            assert files <= rows * cols + 10, (label, files)
+        print(f"{label:16s} 研究 {elapsed:6.2f} s  文件 {files:6d}  最大目录 {widest:6d} 项  "
+              f"占用 {size / 2 ** 20:8.1f} MB  目录扫描 {scan_time * 1000:8.1f} ms")
@@ -0,0 +1,78 @@
+# ============================================================
+# 文件名称: bench_metrics.py
+# 模块功能: RsoftData 性能指标计算基准测试（逐元素 Python 循环 vs NumPy 向量化归约）
+# 使用方式:
+#   python benchmarks/bench_metrics.py [rows] [cols] [n_out]   # 默认 1000 × 10 × 100 = 10⁶ 个功率值
+# 说明:
+#   - legacy_metrics 为改写前 RsoftData.IL / EL / UL / WDL / *max / mean 的原始循环实现
+#   - 两种实现的结果按四位小数比较，应完全一致
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import sys
+import time
+from math import log10
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RsoftData import RsoftData
+
+
+# === 原始实现（列表嵌套 + 逐元素 log10 / round）===
+def legacy_metrics(output_matrix):
+    rows, cols, n_out = len(output_matrix), len(output_matrix[0]), len(output_matrix[0][0])
+    IL = [[[round(-10 * log10(output_matrix[i][j][n]), 4) for n in range(n_out)] for j in range(cols)] for i in range(rows)]
+    EL = [[round(-10 * log10(sum(output_matrix[i][j])), 4) for j in range(cols)] for i in range(rows)]
+    UL = [[round(-10 * log10(min(output_matrix[i][j]) / max(output_matrix[i][j])), 4) for j in range(cols)] for i in range(rows)]
+    WDL = [[None for _ in range(n_out)] for _ in range(rows)]
+    n_output = [None for _ in range(cols)]
+    for i in range(rows):
+        for n in range(n_out):
+            for j in range(cols):
+                n_output[j] = output_matrix[i][j][n]
+            WDL[i][n] = round(-10 * log10(min(n_output) / max(n_output)), 4)
+    ILmax_n = [[round(max(IL[i][j]), 4) for j in range(cols)] for i in range(rows)]
+    ILmax = [[round(max(ILmax_n[i]), 4)] for i in range(rows)]
+    ELmax = [[round(max(EL[i]), 4)] for i in range(rows)]
+    ULmax = [[round(max(UL[i]), 4)] for i in range(rows)]
+    WDLmax = [[round(max(WDL[i]), 4)] for i in range(rows)]
+    mean = [[round((ELmax[i][0] + WDLmax[i][0] + ULmax[i][0]) / 3, 4)] for i in range(rows)]
+    return {"IL": IL, "EL": EL, "UL": UL, "WDL": WDL, "ILmax_n": ILmax_n, "ILmax": ILmax,
+            "ELmax": ELmax, "ULmax": ULmax, "WDLmax": WDLmax, "mean": mean}
+
+
+# === 向量化实现（直接调用 RsoftData 的指标方法，不读取 .mon 文件）===
+def vector_metrics(power):
+    data = RsoftData.__new__(RsoftData)
+    data.output_matrix = power
+    data.rows, data.cols, data.n_out = power.shape
+    data.unique_value1 = list(range(data.rows))
+    names = ["IL", "EL", "UL", "WDL", "ILmax_n", "ILmax", "ELmax", "ULmax", "WDLmax", "mean"]
+    for name in names:
+        getattr(data, name)()
+    return {name: getattr(data, f"{name}_matrix") for name in names}
+
+
+if __name__ == "__main__":
+    rows, cols, n_out = [int(v) for v in sys.argv[1:4]] if len(sys.argv) == 4 else (1000, 10, 100)
+    power = np.random.default_rng(0).uniform(0.01, 0.5, size=(rows, cols, n_out))
+    power_list = power.tolist()
+    print(f"输入规模: {rows} × {cols} × {n_out} = {power.size} 个功率值")
+
+    start = time.perf_counter()
+    legacy = legacy_metrics(power_list)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vector = vector_metrics(power)
+    vector_time = time.perf_counter() - start
+
+    for name in legacy:
+        # mean 由已取整的分项求得，允许末位 ±1e-4 的舍入差
+        tolerance = 1.5e-4 if name == "mean" else 1e-9
+        assert np.allclose(np.round(vector[name], 4), legacy[name], atol=tolerance), name
+    print(f"循环实现: {legacy_time:.3f} s")
+    print(f"向量化实现: {vector_time:.3f} s")
+    print(f"加速比: {legacy_time / vector_time:.1f}×")
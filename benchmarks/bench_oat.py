@@ -0,0 +1,103 @@
+# ============================================================
+# 文件名称: bench_oat.py
+# 模块功能: 正交表查询基准测试（逐行解析文本 + 线性查找 vs 编译索引 + 构造）
+#           冷启动为清空进程内缓存后从磁盘读取编译索引的耗时；进程内缓存命中单独列出
+# 使用方式:
+#   python benchmarks/bench_oat.py
+# 说明:
+#   - legacy_get 为改写前 OAT.get 的原始实现（逐表字符串包含判断 + dataSplit 逐字符转换）
+#   - 原始实现只做宽松的 >= m,n,k 判断，返回的正交表常与请求的水平不符（超出水平的取值在 genSets 中变为 None），
+#     此处统计其中不是所请求水平的均衡正交表的查询数；新实现的结果均须通过 checkOrthogonal，且行数不低于 minimumRuns
+#   - 新实现的 get() 分别统计正交表库命中与需要 constructDesign 构造的查询（首次查询，各缓存清空），以及重复查询
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import sys
+import time
+import itertools
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import OAT as oat_module
+from OAT import OAT, parseDesigns, compileDesigns, dataSplit, checkOrthogonal, minimumRuns
+
+OAFile = os.path.join(os.path.dirname(os.path.abspath(oat_module.__file__)), 'OED', 'ts723_Designs.txt')
+
+
+# === 原始实现 ===
+def legacy_get(designs, mk):
+    mk = sorted(mk, key=lambda i: i[0])
+    m = max([i[0] for i in mk])
+    k = sum([i[1] for i in mk])
+    n = sum([i[1] * (i[0] - 1) for i in mk]) + 1
+    query_key = ' '.join(['^'.join([str(j) for j in i]) for i in mk])
+    for data in designs:
+        if query_key in data[0]:
+            return dataSplit(data[1])
+        elif data[1]['n'] >= n and data[1]['mk'][0][0] >= m and data[1]['mk'][0][1] >= k:
+            return dataSplit(data[1])
+    return None
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat, result
+
+
+if __name__ == "__main__":
+    queries = [list(zip(ms, ks)) for r in (1, 2) for ms in itertools.combinations(range(2, 11), r)
+               for ks in itertools.product(range(1, 9), repeat=r)]
+
+    parse_time, designs = timed(lambda: parseDesigns(OAFile), 5)
+    compile_time, _ = timed(lambda: compileDesigns(OAFile), 5)
+    # 冷启动：每次清空进程内缓存，从磁盘读取编译索引
+    load_time, _ = timed(lambda: (oat_module.compiled_designs.clear(), OAT()), 20)
+    cached_time, oat = timed(OAT, 1000)
+
+    start = time.perf_counter()
+    legacy = [legacy_get(designs, mk) for mk in queries]
+    legacy_get_time = (time.perf_counter() - start) / len(queries)
+
+    def levels(mk):
+        return [m for m, k in sorted(mk) for _ in range(k)]
+
+    # 首次查询：清空查询结果与构造结果缓存，逐个计时并按是否调用了 constructDesign 分类
+    oat.index['selected'].clear()
+    oat_module.constructed_designs.clear()
+    indexed, table_times, construct_times = [], [], []
+    for mk in queries:
+        start = time.perf_counter()
+        indexed.append(oat.get(mk))
+        elapsed = time.perf_counter() - start
+        constructed = (tuple(levels(mk)), 2) in oat_module.constructed_designs
+        (construct_times if constructed else table_times).append(elapsed)
+    start = time.perf_counter()
+    for mk in queries:
+        oat.get(mk)
+    repeat_time = (time.perf_counter() - start) / len(queries)
+
+    def orthogonal(design, mk):
+        return design is not None and len(design[0]) == len(levels(mk)) and checkOrthogonal(design, levels(mk))
+
+    assert all(orthogonal(design, mk) for design, mk in zip(indexed, queries))
+    bounds = [minimumRuns(levels(mk)) for mk in queries]
+    assert all(len(design) >= bound for design, bound in zip(indexed, bounds))
+    # L18 (2^1 3^7) 由正交表库中的 3^6 6^1 n=18 得到（6 水平列分为相互正交的 2、3 水平列），须达到下界 18
+    assert len(oat.get([(2, 1), (3, 7)])) == minimumRuns(levels([(2, 1), (3, 7)])) == 18
+    at_bound = sum(len(design) == bound for design, bound in zip(indexed, bounds))
+    mismatched = sum(not orthogonal(design, mk) for design, mk in zip(legacy, queries))
+    smaller = sum(design is not None and len(design) < len(new) for design, new in zip(legacy, indexed))
+
+    print(f"正交表数: {len(designs)}，查询数: {len(queries)}")
+    print(f"OAT() 冷启动  逐行解析文本: {parse_time * 1e3:8.2f} ms  解析 + 编译索引: {compile_time * 1e3:6.2f} ms  "
+          f"读取编译索引: {load_time * 1e3:6.2f} ms")
+    print(f"OAT() 进程内缓存命中（与索引格式无关，不计入上行）: {cached_time * 1e6:6.2f} µs")
+    print(f"get() 平均  线性查找: {legacy_get_time * 1e6:8.1f} µs  "
+          f"正交表库命中: {sum(table_times) / max(len(table_times), 1) * 1e6:6.1f} µs ({len(table_times)} 次)  "
+          f"构造: {sum(construct_times) / max(len(construct_times), 1) * 1e3:6.2f} ms ({len(construct_times)} 次)  "
+          f"重复查询（含 tolist）: {repeat_time * 1e6:5.1f} µs")
+    print(f"行数达到下界 minimumRuns: {at_bound} / {len(queries)}")
+    print(f"原始实现返回非均衡 / 水平不符的正交表: {mismatched} / {len(queries)}（其中行数少于新结果: {smaller}）")
@@ -0,0 +1,94 @@
+# ============================================================
+# 文件名称: bench_optimize.py
+# 模块功能: 优化流程（Optimize）自定义 FOM 检查（流式汇总复用、当前最优点与 "top" 保留策略）
+# 使用方式:
+#   python benchmarks/bench_optimize.py [rows] [cols] [top]   # 默认每轮 20 × 5 个任务，保留最优 3 个设计
+# 说明:
+#   - 替身求解器在进程内运行（同 bench_layout），两个端口的功率使默认 mean 与 ELmax 的排序相反
+#   - 自定义 FOM 下每轮的分析应直接使用 LiveStudy.data（不重新读取结果存储），
+#     _live.json 报告的最优点应与 Optimize 写入 ind 文件的最优值一致
+#   - 保留策略为 "top"，留下 .fld 的前缀应正好是按该 FOM 排序的前 top 个设计
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RsoftSimulation import RsoftSimulation
+from RsoftData import RsoftData
+from RsoftLive import read_live
+
+fom = "ELmax"
+
+
+# === 替身求解器: Lta 越大总功率越高（ELmax 越小），但两端口越不均匀（ULmax 越大）===
+def run_command(command, work_dir):
+    symbols = dict(arg.split("=", 1) for arg in command.split()[2:])
+    prefix = os.path.join(work_dir, symbols["prefix"])
+    k = float(symbols["Lta"]) - 100
+    wave = float(symbols["wave"])
+    power = [0.30 + 0.004 * k - 0.01 * (wave - 1.26), 0.30 - 0.002 * k]
+    with open(prefix + ".mon", "w") as f:
+        for z in range(5):
+            f.write(f"{z} {power[0]} {power[1]}\n")
+    with open(prefix + ".fld", "w") as f:
+        f.write(f"{power[0]}\n{power[1]}\n")
+
+
+if __name__ == "__main__":
+    rows, cols, top = [int(v) for v in sys.argv[1:4]] if len(sys.argv) == 4 else (20, 5, 3)
+    values = [list(range(100, 100 + rows)), np.round(np.linspace(1.26, 1.65, cols), 3).tolist()]
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "test.ind"), "w") as f:
+            f.write("wave = 1.55\nLta = 100\n")
+        simulation = RsoftSimulation(directory, "test", 4, "off", desktop="headless")
+        simulation.run_command = run_command
+        simulation.plot_mode = "off"
+        simulation.live_interval = 5.0
+        simulation.catalog = None
+        simulation.retention = "top"
+        simulation.retention_top = top
+
+        # 记录每轮分析所用的结果对象及对应的流式汇总
+        rounds = []
+        study_data = simulation.study_data
+
+        def traced_study_data(run_path, fom=None):
+            live = simulation.live_done.get(run_path)
+            data = study_data(run_path, fom)
+            rounds.append((run_path, live, data))
+            return data
+        simulation.study_data = traced_study_data
+
+        start = time.perf_counter()
+        simulation.Optimize(["Lta", "wave"], values, fom=fom, report=False)
+        elapsed = time.perf_counter() - start
+        simulation.wait_completion()
+
+        assert len(rounds) == 1
+        run_path, live, data = rounds[0]
+        summary = read_live(run_path)
+        default_best = RsoftData(run_path, lazy=True).get_min_symbol()
+        print(f"{rows} × {cols} 个任务  优化 {elapsed:.2f} s  FOM {fom}")
+        print(f"最优 Lta: {data.get_min_symbol()}（_live.json: {summary['best']['value']}，默认 mean: {default_best}）")
+        # 流式汇总按同一 FOM 计算，分析直接复用其结果对象
+        assert live is not None and live.fom == fom and data is live.data
+        assert summary["fom"] == fom and summary["best"]["value"] == data.get_min_symbol()
+        assert data.get_min_symbol() != default_best
+        with open(simulation.Optimize_Rsoft, "r") as f:
+            assert f"Lta = {data.get_min_symbol()}" in f.read()
+
+        # "top" 保留策略: 按同一 FOM 排序，只有前 top 个设计保留 .fld
+        def top_prefixes(data):
+            order = np.argsort(np.asarray(data.mean_matrix, dtype=float)[:, 0])
+            return {prefix for i in order[:top] for prefix in data.prefix_matrix[i] if prefix is not None}
+        kept = {name[:-len(".fld")] for name in os.listdir(run_path) if name.endswith(".fld")}
+        expected = top_prefixes(RsoftData(run_path, fom=fom, lazy=True))
+        print(f"保留 .fld 的任务 {len(kept)} 个（最优 {top} 个设计 × {cols} 个波长）")
+        assert kept == expected and len(kept) == top * cols
+        assert kept != top_prefixes(RsoftData(run_path, lazy=True))
@@ -0,0 +1,66 @@
+# ============================================================
+# 文件名称: bench_plot.py
+# 模块功能: 绘图基准测试（主线程 600 dpi 逐个作图 vs 后台绘图服务预览 / 并发导出）
+# 使用方式:
+#   python benchmarks/bench_plot.py [studies] [rows] [cols] [n_out]   # 默认 4 个研究，每个 20 × 5 × 4
+# 说明:
+#   - 研究数据为随机功率，指标由 RsoftData 的向量化方法计算，图像写入临时目录
+#   - "主流程阻塞" 为提交全部作图任务所需时间，即仿真 / 分析流程等待绘图的时间
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from RsoftData import RsoftData
+from RsoftPlot import PlotService
+
+
+# === 构造只含指标矩阵的 RsoftData ===
+def study(file_path, power):
+    data = RsoftData.__new__(RsoftData)
+    data.file_path = file_path
+    data.fom = "(ELmax + WDLmax + ULmax) / 3"
+    data.output_matrix = power
+    data.rows, data.cols, data.n_out = power.shape
+    data.symbol1, data.symbol2 = "Lta", "wave"
+    data.unique_value1 = np.linspace(100, 800, data.rows).tolist()
+    data.unique_value2 = np.linspace(1.26, 1.65, data.cols).round(2).tolist()
+    return data
+
+
+if __name__ == "__main__":
+    studies, rows, cols, n_out = [int(v) for v in sys.argv[1:5]] if len(sys.argv) == 5 else (4, 20, 5, 4)
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as directory:
+        data_list = [study(os.path.join(directory, f"study{k}"), rng.uniform(0.01, 0.5, size=(rows, cols, n_out)))
+                     for k in range(studies)]
+        print(f"{studies} 个研究，每个 {rows} × {cols} × {n_out}")
+
+        start = time.perf_counter()
+        for data in data_list:
+            data.plot_all()
+        inline_time = time.perf_counter() - start
+
+        service = PlotService(max_workers=min(studies, os.cpu_count() or 1))
+        start = time.perf_counter()
+        for data in data_list:
+            service.submit(data, preview=True)
+        submit_time = time.perf_counter() - start
+        service.wait()
+        preview_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        service.export()
+        service.wait()
+        export_time = time.perf_counter() - start
+        service.shutdown()
+
+    print(f"主线程逐个作图 (600 dpi): {inline_time:.2f} s（主流程阻塞 {inline_time:.2f} s）")
+    print(f"绘图服务预览 ({service.preview_dpi} dpi): 主流程阻塞 {submit_time * 1e3:.1f} ms，全部完成 {preview_time:.2f} s")
+    print(f"绘图服务并发导出 ({service.dpi} dpi): {export_time:.2f} s")
@@ -0,0 +1,67 @@
+# ============================================================
+# 文件名称: bench_reanalysis.py
+# 模块功能: 增量重新分析基准测试（5000 点研究新增 10 个仿真点后重新分析）
+# 使用方式:
+#   python benchmarks/bench_reanalysis.py [rows] [cols] [nz]   # 默认 500 × 10 个 .mon 文件，每个 nz=200 条记录
+# 说明:
+#   - 在临时目录中写入 Lta(...)_wave(...).mon 文件（无清单的旧目录格式），分析采用惰性模式（只计算指标）
+#   - 每次分析前清空进程内缓存，模拟在新进程中重新分析
+#   - 增量分析与删除缓存后完整分析的指标应完全一致
+# 作者单位: 中南大学机电工程学院 郑煜教授课题组
+# 撰写作者: 2022届硕士研究生 万强伟
+# ============================================================
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import RsoftMon
+from RsoftData import RsoftData, metric_names
+
+
+def write_mon(path, rng, nz):
+    trace = np.column_stack([np.arange(nz), rng.uniform(0.1, 0.5, size=(nz, 2))])
+    np.savetxt(path, trace, fmt="%.6f")
+
+
+# === 分析一次（指标全部计算并保存，供下次增量分析）===
+def analyze(run_path):
+    RsoftMon.record_cache.clear()
+    start = time.perf_counter()
+    data = RsoftData(run_path, lazy=True)
+    data.mean_matrix
+    elapsed = time.perf_counter() - start
+    data.save_metrics()
+    return data, elapsed
+
+
+if __name__ == "__main__":
+    rows, cols, nz = [int(v) for v in sys.argv[1:4]] if len(sys.argv) == 4 else (500, 10, 200)
+    rng = np.random.default_rng(0)
+    waves = np.round(np.linspace(1.26, 1.65, cols), 3)
+    with tempfile.TemporaryDirectory() as run_path:
+        for L in range(rows):
+            for wave in waves:
+                write_mon(os.path.join(run_path, f"Lta({L:05d})_wave({wave:.3f}).mon"), rng, nz)
+        print(f"研究规模: {rows} × {cols} = {rows * cols} 个 .mon 文件")
+
+        _, full_time = analyze(run_path)
+        _, unchanged_time = analyze(run_path)
+        # 新增一行（10 个仿真点）
+        for wave in waves:
+            write_mon(os.path.join(run_path, f"Lta({rows:05d})_wave({wave:.3f}).mon"), rng, nz)
+        data, added_time = analyze(run_path)
+        reads = data.records.reads
+
+        os.remove(run_path + "_metrics.npz")
+        os.remove(run_path + "_records.npz")
+        reference, _ = analyze(run_path)
+        for name in metric_names:
+            assert np.array_equal(getattr(data, f"{name}_matrix"), getattr(reference, f"{name}_matrix"), equal_nan=True), name
+
+    print(f"首次完整分析: {full_time:.3f} s")
+    print(f"无变化重新分析: {unchanged_time:.3f} s")
+    print(f"新增 {cols} 点后重新分析: {added_time:.3f} s（读取 {reads} 个文件）")
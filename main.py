@@ -10,6 +10,9 @@ from RsoftCad import *          # 导入波导设计类
 from RsoftSimulation import *   # 导入仿真控制类
 from RsoftData import *         # 导入数据处理模块
 from RsoftMail import *         # 导入邮件通知模块
+from RsoftMode import *         # 导入模式求解模块
+from RsoftField import *        # 导入场文件指标模块
+from RsoftArchive import *      # 导入研究归档模块
 import numpy as np
 
 # === 初始化波导设计器 ===
@@ -97,6 +100,12 @@ launch1 = c.add_launch(pathway=pathway1, launch_type=launch_type.Computed_Mode)
 
 # === 初始化仿真控制器 ===
 s = RsoftSimulation(r'D:\work\Python', 'test', 6, "on")
+# s = RsoftSimulation(r'D:\work\Python', 'test', 6, desktop="headless")   # 无人值守 / 远程桌面运行: 不处理窗口与弹窗
+# s.store_traces = True   # 结果存储（{研究目录}_store.npz）中同时打包完整功率曲线
+# s.live_interval = 5.0   # 研究进行中每 5 s 更新 {研究目录}_live.json（其他进程可用 RsoftLive.read_live 查询进度与当前最优点）
+
+# === 网格收敛性研究Converge（选出误差 ≤ 0.05 dB 的最粗网格，写入 grid_cache.json 供后续仿真自动使用） ===
+grid = s.Converge([1.27, 1.55, 1.65], ladder=[1, 1.5, 2, 3], tolerance=0.05)
 
 # === 单次仿真调用Sim ===
 Sim1 = s.Sim('default', 'default')
@@ -112,6 +121,16 @@ Scan1 = s.Scan(['Lta', 'wave'], [Lta_list, [1.55]])
 Scan2 = s.Scan(['Ln', 'wave'], [Ln_list, [1.27, 1.55]])
 Scan3 = s.Scan(['Lta', 'wave'], [Lta_list, wave_list])
 
+# 短任务批量求解（每批一次求解器调用，分摊进程启动与许可证签出开销；仅限 RsoftBPM 等可读取任务文件的求解器，
+# bsimw32 每次调用只能运行一个任务，批量求解没有收益，batch_mode="on" 时报错）
+# s.batch_mode = "on"
+# Scan5 = s.Scan(['Lta', 'wave'], [Lta_list, wave_list])
+# s.batch_mode = "off"
+
+# 大规模扫描: 输出按前缀哈希分片到子目录，只保留 .mon（"top" 保留最优设计的场文件，"archive" 逐任务打包进 _outputs.zip）
+# s.layout = "sharded"
+# s.retention = "mon"
+
 # === 多参数优化仿真Optimize ===
 Lta_list = [200, 400, 600, 800]
 Wn_list = [4, 4.5, 5, 5.5]
@@ -121,6 +140,31 @@ Offset_list = [-0.4, 0, 0.4, 0.8, 1.2]
 
 o1 = s.Optimize(['Lta', 'Ln', 'Wn', 'Lb', 'wave'], [Lta_list, Ln_list, Wn_list, Lb_list, wave_list])
 o2 = s.Optimize(['R', 'Offset', 'wave'], [R_list, Offset_list, wave_list])
+# 自定义优化目标（FOM 表达式，见 RsoftFOM）：端口不均匀性超过 0.5 dB 时加罚
+o4 = s.Optimize(['R', 'Offset', 'wave'], [R_list, Offset_list, wave_list], fom="ELmax + 10 * penalty(ULmax, 0.5)")
+
+# === 优化前的参数筛选Screen（Morris 基本效应法，仿真数约为一次 Optimize 的 30%），返回剪枝后的参数与缩小的取值范围 ===
+screened = s.Screen(['Lta', 'Ln', 'Wn', 'Lb', 'wave'], [Lta_list, Ln_list, Wn_list, Lb_list, wave_list])
+o5 = s.Optimize(*screened)
+
+# === 多保真度筛选MultiFidelity（粗网格预扫全部候选，原网格确认前 top_k） ===
+MF1 = s.MultiFidelity(['Lta', 'wave'], [Lta_list, wave_list], coarsen=2, top_k=3)
+o3 = s.Optimize(['R', 'Offset', 'wave'], [R_list, Offset_list, wave_list], fidelity={"coarsen": 2, "top_k": 2})
+
+# === 工艺容差蒙特卡洛良率分析Yield（拉丁超立方抽样，置信区间宽度 ≤ target 时提前结束，样本目录完成即删除） ===
+# None 为 ind 文件中的名义值；指标上限: IL1 / IL2 ... / ILmax / EL / UL（各 wave 中的最坏情况）
+Y1 = s.Yield({'width': ('normal', None, 0.05), 'Gap': ('uniform', 1.4, 1.6), 'Wd': ('normal', None, 0.02)},
+             {'ILmax': 3.6, 'UL': 0.3}, wave_list=[1.31, 1.55], target=0.05)
+
+# === 二维有效折射率模型预筛（Reduce2D 后的仿真均在 test_2d.ind 上运行，Restore3D 恢复三维） ===
+s.Reduce2D(wave_list)
+Scan4 = s.Scan(['Lta', 'wave'], [Lta_list, wave_list])
+s.Restore3D()
+
+# === 模式求解RsoftMode（宽度 × 波长 neff 表；按截面缓存的入射场文件，设计中需 add_launch(..., launch_type.File, launch_file="$launch_file")） ===
+mode = RsoftMode(os.path.join(r'D:\work\Python', 'mode_cache'))
+neff = mode.neff_table(s.file, 'width', [5, 5.5, 6, 6.5, 7], wave_list)
+# s.job_hooks.append(mode.launch_hook())
 
 # === 多参数正交设计优化仿真OEDsim ===
 Lta_list = np.linspace(400, 800, 5)
@@ -131,10 +175,22 @@ Lt_list = np.linspace(80, 120, 5)
 wave_list = [1.27, 1.31, 1.49, 1.55, 1.65]
 
 OEDsim1 = s.OEDsim(['Lta', 'Ln', 'Wn', 'Lb', 'Lt', 'wave'], [Lta_list, Ln_list, Wn_list, Lb_list, Lt_list, wave_list])
+# 结果表格末尾附极差分析、方差分析与预测最优组合；按预测值验证前 confirm 个未试验组合，返回实测最优的 {参数名: 取值}
+# OEDsim2 = s.OEDsim(['Lta', 'Ln', 'Wn', 'Lb', 'Lt', 'wave'], [Lta_list, Ln_list, Wn_list, Lb_list, Lt_list, wave_list], metric="ELmax", confirm=2)
 
 
 # 等待仿真结束
 s.wait_completion()
+# 研究图像默认为后台生成的低分辨率预览图（*_preview.png），需要时导出全分辨率图（*_result.png）
+# s.export_plots()
+
+# 研究打包: 研究目录与研究文件打包为 {研究目录}.zip（带目录表，RsoftData / load_study 直接从归档随机读取）
+# pack_study(s.Optimize_path, fields=("*.fld",), remove=True)   # 命令行: python RsoftArchive.py pack 研究目录 --remove
+
+# 场文件指标: 研究内全部输出场对参考模式的重叠积分、各端口芯层功率占比与 XZ 等高线图的端口功率随 z 分布（工作进程并行，文本场解析一次后以 memmap 复用）
+# ports = port_windows(c.file)
+# fields = field_metrics(Sim1, modes=[RsoftMode().design_mode(c.file)], windows=ports)   # {"overlap": 轴 ..., mode; "power": 轴 ..., port}
+# maps = power_maps(Sim1, ports)   # 轴 ..., z, port（Scan 研究传入 test_Scan 下的研究子目录）
 
 # === 仿真数据处理 ===
 # Scan 与 Optimize 会自动处理数据